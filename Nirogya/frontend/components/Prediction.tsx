@@ -25,28 +25,22 @@ const Prediction = () => {
     disease: '',
     last_14_days_cases: Array(7).fill(0)
   })
-  const [availableRegions, setAvailableRegions] = useState<string[]>([])
+  const [regionMatches, setRegionMatches] = useState<string[]>([])
+  const [regionCount, setRegionCount] = useState(0)
   const [availableDiseases, setAvailableDiseases] = useState<string[]>([])
   const [mlPrediction, setMlPrediction] = useState<MLPredictionResponse | null>(null)
 
   const [isMlLoading, setIsMlLoading] = useState(false)
   const [mlError, setMlError] = useState<string | null>(null)
 
-  // Fetch available regions and diseases on component mount
+  // Fetch available diseases on component mount (regions are searched as you type)
   useEffect(() => {
     const fetchMetadata = async () => {
       try {
-        const [regionsRes, diseasesRes] = await Promise.all([
-          axios.get('http://localhost:8000/regions'),
-          axios.get('http://localhost:8000/diseases')
-        ])
-        setAvailableRegions(regionsRes.data.regions || [])
+        const diseasesRes = await axios.get('http://localhost:8000/diseases')
         setAvailableDiseases(diseasesRes.data.diseases || [])
 
-        // Set default values
-        if (regionsRes.data.regions?.length > 0) {
-          setMlFormData(prev => ({ ...prev, region: regionsRes.data.regions[0] }))
-        }
+        // Set default value
         if (diseasesRes.data.diseases?.length > 0) {
           setMlFormData(prev => ({ ...prev, disease: diseasesRes.data.diseases[0] }))
         }
@@ -57,6 +51,22 @@ const Prediction = () => {
     fetchMetadata()
   }, [])
 
+  // Region autocomplete: ask the API for the top matches of the typed prefix
+  useEffect(() => {
+    const timer = setTimeout(async () => {
+      try {
+        const res = await axios.get('http://localhost:8000/regions/search', {
+          params: { q: mlFormData.region, limit: 20 }
+        })
+        setRegionMatches(res.data.matches || [])
+        setRegionCount(res.data.candidates || 0)
+      } catch (err) {
+        console.error('Error searching regions:', err)
+      }
+    }, 150)
+    return () => clearTimeout(timer)
+  }, [mlFormData.region])
+
   const handleMlChange = (e: React.ChangeEvent<HTMLInputElement | HTMLSelectElement>) => {
     const { name, value } = e.target
     setMlFormData({ ...mlFormData, [name]: value })
@@ -142,23 +152,26 @@ const Prediction = () => {
                   </svg>
                   {t('prediction.region')}
                 </label>
-                <select
+                <input
                   name="region"
+                  list="region-matches"
                   value={mlFormData.region}
                   onChange={handleMlChange}
+                  placeholder="Type a state or district..."
+                  autoComplete="off"
                   required
                   className="w-full px-4 py-3 bg-white rounded-lg border-2 border-gray-300 focus:outline-none focus:ring-2 focus:ring-cyan-500 focus:border-transparent font-medium"
-                >
-                  <option value="">Choose a region...</option>
-                  {availableRegions.map((region) => (
-                    <option key={region} value={region}>{region}</option>
+                />
+                <datalist id="region-matches">
+                  {regionMatches.map((region) => (
+                    <option key={region} value={region} />
                   ))}
-                </select>
+                </datalist>
                 <p className="text-xs text-gray-600 mt-2 flex items-center gap-1">
                   <svg className="w-3 h-3" fill="currentColor" viewBox="0 0 20 20">
                     <path fillRule="evenodd" d="M18 10a8 8 0 11-16 0 8 8 0 0116 0zm-7-4a1 1 0 11-2 0 1 1 0 012 0zM9 9a1 1 0 000 2v3a1 1 0 001 1h1a1 1 0 100-2v-3a1 1 0 00-1-1H9z" clipRule="evenodd" />
                   </svg>
-                  {availableRegions.length} regions across India available
+                  {regionCount} regions across India available
                 </p>
               </div>
 
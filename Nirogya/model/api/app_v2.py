@@ -2,25 +2,186 @@
 FastAPI application for Disease Outbreak Prediction Model V2
 Uses the improved LSTM model with multi-head attention
 """
-from fastapi import FastAPI, HTTPException
+import time
+IMPORT_STARTED = time.perf_counter()  # startup timings include module imports (torch dominates)
+
+import asyncio
+from fastapi import FastAPI, HTTPException, Query, Request
+from fastapi.exceptions import RequestValidationError
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel, Field
-from typing import List, Optional
+from fastapi.responses import FileResponse, PlainTextResponse, Response, StreamingResponse
+from starlette.background import BackgroundTask
+from pydantic import BaseModel, Field, ValidationError
+from typing import Annotated, Dict, List, Optional
 import torch
 import numpy as np
-import pandas as pd
 import pickle
+import json
+import hashlib
+import hmac
 from datetime import datetime, timedelta
+import os
+import shutil
 import sys
+import tempfile
 import uvicorn
 sys.path.append('../notebooks')
 
-# Import improved model
-from improved_model_v2 import ImprovedDiseaseLSTM
+# Serving components (model code lives in ../notebooks)
+from preprocessing import (
+    SEQUENCE_LENGTH, HISTORY_VALUE_ERROR, Vocabulary, temporal_features, parse_date, encode_history,
+    valid_history, load_vocabularies, region_state
+)
+from batching import MicroBatcher
+from singleflight import SingleFlight
+from executor import InferenceExecutor
+from forecasting import rollout_forecast
+from cache import PredictionCache
+from model_loading import (
+    load_checkpoint_model, load_torchscript, load_mmap_model, quantize_dynamic_int8,
+    describe_model
+)
+from backends import TorchBackend, OnnxBackend, EnsembleBackend, predict_with_interval
+from ensemble import ENSEMBLE_MODES, load_ensemble
+from metrics import ServingMetrics, MetricsMiddleware
+from histories import DEFAULT_HISTORY_CSV, load_history_table
+from history_store import DEFAULT_HISTORY_STORE, HistoryStore, HistoryJournal
+from forecast_table import RANKINGS, ForecastTable
+from search_index import NameIndex
+from registry import DEFAULT_REGISTRY, ModelRegistry
+from bulk_scoring import DEFAULT_CHUNK_ROWS, FORMATS, MEDIA_TYPES, parquet_available, score_file
+from wire import MSGPACK_MEDIA_TYPE, decode_batch_request, encode_batch_response, is_msgpack, msgpack_available
+from autotune import DEFAULT_PROFILE, apply_serving_profile, ensure_profile, load_serving_profile
+from uncertainty import DEFAULT_QUANTILES, load_sampler, summarize_samples
+from cascade import DEFAULT_BASELINE, CascadeBaseline
+
+# Serving profile written by autotune.py: the backend, thread and batch settings
+# measured fastest on this machine become the defaults of the NIROGYA_* variables
+# below (variables set in the environment win). NIROGYA_AUTOTUNE=1 runs a quick
+# tuning first when there is no profile for this machine; an empty path disables it
+SERVING_PROFILE_PATH = os.environ.get('NIROGYA_SERVING_PROFILE', DEFAULT_PROFILE)
+if os.environ.get('NIROGYA_AUTOTUNE', '0') == '1' and SERVING_PROFILE_PATH:
+    serving_profile = ensure_profile(SERVING_PROFILE_PATH)
+else:
+    serving_profile = load_serving_profile(SERVING_PROFILE_PATH)
+if serving_profile is not None:
+    apply_serving_profile(serving_profile)
+# Profile settings in effect (set by this process, by serve.py, or equal to an explicit variable)
+profile_settings = {
+    name: value for name, value in (serving_profile or {}).get("settings", {}).items()
+    if os.environ.get(name) == value
+}
 
 # Load model and preprocessing artifacts
 device = torch.device('cuda' if torch.cuda.is_available() else 'cpu')
 
+CHECKPOINT_PATH = '../models/improved_lstm_v2_model5_best.pt'
+
+# Serve the trained members as one ensemble (NIROGYA_ENSEMBLE=1): prediction
+# intervals come from the member spread instead of the fixed ±30% band.
+# 'sequential' loops over the members; 'stacked' (opt-in) evaluates them in one
+# vectorized pass, which only pays off when single-model kernels leave cores idle
+ENSEMBLE_ENABLED = os.environ.get('NIROGYA_ENSEMBLE', '0') == '1'
+ENSEMBLE_MODE = os.environ.get('NIROGYA_ENSEMBLE_MODE', 'sequential').lower()
+ENSEMBLE_CHECKPOINTS = os.environ.get(
+    'NIROGYA_ENSEMBLE_CHECKPOINTS',
+    ','.join(f'../models/improved_lstm_v2_model{i}_best.pt' for i in range(1, 6))
+).split(',')
+
+# Inference runtime: 'torch' (default) or 'onnx' (ONNX Runtime, CPU)
+BACKEND = os.environ.get('NIROGYA_BACKEND', 'torch').lower()
+ONNX_PATH = os.environ.get('NIROGYA_ONNX_PATH', '../models/improved_lstm_v2_model5.onnx')
+
+# Frozen TorchScript artifact from export_model.py, used instead of the eager
+# model when present (set NIROGYA_TORCHSCRIPT=0 to force eager mode)
+TORCHSCRIPT_ENABLED = os.environ.get('NIROGYA_TORCHSCRIPT', '1') == '1'
+TORCHSCRIPT_PATH = os.environ.get('NIROGYA_TORCHSCRIPT_PATH', '../models/improved_lstm_v2_model5.torchscript.pt')
+
+# Deploy artifact from export_model.py --format npy: weights-only .npy files,
+# memory-mapped read-only and shared between workers (see serve.py), plus
+# vocabularies.json. Used when present (set NIROGYA_WEIGHTS_MMAP=0 to disable)
+WEIGHTS_MMAP = os.environ.get('NIROGYA_WEIGHTS_MMAP', '1') == '1'
+WEIGHTS_MMAP_PATH = os.environ.get('NIROGYA_WEIGHTS_MMAP_PATH', '../models/improved_lstm_v2_model5_weights')
+
+# Opt-in dynamic int8 quantization of the LSTM/Linear layers for CPU serving
+# (NIROGYA_QUANTIZE=int8); takes precedence over the TorchScript artifact
+QUANTIZE_MODE = os.environ.get('NIROGYA_QUANTIZE', '').lower()
+
+# Batch scoring limits: rows per forward pass and items per /predict_batch call
+MAX_FORWARD_BATCH = int(os.environ.get('NIROGYA_MAX_FORWARD_BATCH', 1024))
+MAX_BATCH_ITEMS = int(os.environ.get('NIROGYA_MAX_BATCH_ITEMS', 20000))
+MAX_FORECAST_HORIZON = 52
+
+# Latest observed histories, scored by /predict_stream (skipped when the file is missing)
+HISTORY_CSV_PATH = os.environ.get('NIROGYA_HISTORY_CSV', DEFAULT_HISTORY_CSV)
+
+# Rolling history store (history_store.py): the latest weeks of every pair, used
+# when /predict, /predict_batch or /forecast items omit their history. Seeded
+# from HISTORY_CSV_PATH, updated through POST /histories and persisted in
+# NIROGYA_HISTORY_STORE ('' = memory only) as a snapshot plus an append log,
+# compacted every NIROGYA_HISTORY_SNAPSHOT_EVERY records. Workers apply each
+# other's appends every NIROGYA_HISTORY_POLL_SECONDS (0 = never)
+HISTORY_STORE_PATH = os.environ.get('NIROGYA_HISTORY_STORE', DEFAULT_HISTORY_STORE)
+HISTORY_SNAPSHOT_EVERY = int(os.environ.get('NIROGYA_HISTORY_SNAPSHOT_EVERY', 10000))
+HISTORY_POLL_SECONDS = float(os.environ.get('NIROGYA_HISTORY_POLL_SECONDS', 5))
+STREAM_CHUNK_SIZE = int(os.environ.get('NIROGYA_STREAM_CHUNK_SIZE', 1024))
+
+# Precomputed forecasts of all observed pairs for /hotspots, rebuilt in the
+# background every NIROGYA_FORECAST_REFRESH_HOURS (0 = only at startup)
+FORECAST_TABLE_ENABLED = os.environ.get('NIROGYA_FORECAST_TABLE', '1') == '1'
+FORECAST_REFRESH_HOURS = float(os.environ.get('NIROGYA_FORECAST_REFRESH_HOURS', 24))
+MAX_HOTSPOTS = 1000
+
+MAX_SEARCH_RESULTS = 100
+
+# Bulk file scoring (/score_file): rows read per chunk and the upload size limit
+BULK_CHUNK_ROWS = int(os.environ.get('NIROGYA_BULK_CHUNK_ROWS', DEFAULT_CHUNK_ROWS))
+MAX_UPLOAD_MB = float(os.environ.get('NIROGYA_MAX_UPLOAD_MB', 2048))
+
+# Micro-batching of concurrent /predict calls (set NIROGYA_MICROBATCH=0 to disable)
+MICROBATCH_ENABLED = os.environ.get('NIROGYA_MICROBATCH', '1') == '1'
+MICROBATCH_MAX_SIZE = int(os.environ.get('NIROGYA_MICROBATCH_MAX_SIZE', 32))
+MICROBATCH_MAX_WAIT_MS = float(os.environ.get('NIROGYA_MICROBATCH_MAX_WAIT_MS', 2.0))
+
+# Cascade inference (cascade.py): histories whose log1p spread is at most
+# NIROGYA_CASCADE_MAX_SPREAD (0 = constant, e.g. all-zero) are answered by the
+# cheap baseline fitted into NIROGYA_CASCADE_BASELINE instead of the LSTM.
+# By default ('auto') it is on only when that file exists; NIROGYA_CASCADE=1
+# forces it on (window mean without the file), 0 sends every row to the model
+CASCADE_MODE = os.environ.get('NIROGYA_CASCADE', 'auto').lower()
+CASCADE_MAX_SPREAD = float(os.environ.get('NIROGYA_CASCADE_MAX_SPREAD', 0.0))
+CASCADE_BASELINE_PATH = os.environ.get('NIROGYA_CASCADE_BASELINE', DEFAULT_BASELINE)
+
+# Monte Carlo dropout sampling for /predict requests with `uncertainty`:
+# default and maximum number of samples per request
+MC_DROPOUT_SAMPLES = int(os.environ.get('NIROGYA_MC_SAMPLES', 50))
+MC_DROPOUT_MAX_SAMPLES = int(os.environ.get('NIROGYA_MC_MAX_SAMPLES', 1000))
+
+# Coalescing of identical /predict calls in flight at the same time (NIROGYA_COALESCE=0 to disable)
+COALESCE_ENABLED = os.environ.get('NIROGYA_COALESCE', '1') == '1'
+
+# Inference executor: concurrent forwards and torch intra-op threads per worker (0 = auto);
+# torch's thread count is process-wide, so it is set once to workers x threads
+INFERENCE_WORKERS = int(os.environ.get('NIROGYA_INFERENCE_WORKERS', 2))
+INFERENCE_THREADS = int(os.environ.get('NIROGYA_INFERENCE_THREADS', 0))
+
+# torch inter-op threads (0 = torch default); torch accepts this once, before any parallel work
+INTEROP_THREADS = int(os.environ.get('NIROGYA_INTEROP_THREADS', 0))
+
+# Versioned model registry (registry.py): the version named by its ACTIVE file
+# is served ahead of every option above. Workers poll ACTIVE every
+# NIROGYA_REGISTRY_POLL_SECONDS (0 = never) to follow swaps made elsewhere.
+REGISTRY_PATH = os.environ.get('NIROGYA_REGISTRY_PATH', DEFAULT_REGISTRY)
+REGISTRY_POLL_SECONDS = float(os.environ.get('NIROGYA_REGISTRY_POLL_SECONDS', 10))
+
+# Token expected in the X-Admin-Token header of /admin endpoints (unset = admin disabled)
+ADMIN_TOKEN = os.environ.get('NIROGYA_ADMIN_TOKEN', '')
+
+# Prediction result cache (set NIROGYA_CACHE=0 to disable)
+CACHE_ENABLED = os.environ.get('NIROGYA_CACHE', '1') == '1'
+CACHE_MAX_ENTRIES = int(os.environ.get('NIROGYA_CACHE_MAX_ENTRIES', 100000))
+CACHE_TTL_SECONDS = float(os.environ.get('NIROGYA_CACHE_TTL_SECONDS', 3600))
+
 # Initialize FastAPI
 app = FastAPI(
     title="Disease Outbreak Prediction API V2",
@@ -35,69 +196,488 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Model-Version", "X-Total-Items", "X-Scored-Items"],
 )
 
-# Global variables for model and encoders
-model = None
-region_encoder = None
-disease_encoder = None
+# Prometheus metrics (GET /metrics): request counts by outcome, per-stage and
+# forward latency histograms, batch sizes, process memory
+metrics = ServingMetrics()
+app.add_middleware(MetricsMiddleware, metrics=metrics)
+
+# Global variables for model and vocabularies
+backend = None
+previous_backend = None  # kept in memory for instant rollback
+region_vocab = None
+disease_vocab = None
 num_regions = 0
 num_diseases = 0
+batcher = None
+executor = None
+cache = None
+coalescer = None
+cascade = None
+mc_sampler = None
+mc_sampler_error = None  # (fingerprint, ValueError) of a backend that cannot be sampled
+histories = None
+history_journal = None
+history_task = None
+forecast_table = None
+forecast_task = None
+
+registry = ModelRegistry(REGISTRY_PATH)
+registry_task = None
+swap_lock = asyncio.Lock()
+history_lock = asyncio.Lock()  # one journal job (ingest or poll) at a time
+
+# Built once per vocabulary: autocomplete indexes and the /regions, /diseases
+# payloads as (JSON bytes, ETag)
+region_index = None
+disease_index = None
+regions_payload = None
+diseases_payload = None
+
+# Wall time (seconds) of each startup phase, reported on /health
+startup_timings = {}
+
+# Serving state read at scrape time
+metrics.registry.callback(
+    'nirogya_startup_phase_seconds', "Wall time of each startup phase",
+    lambda: {(name,): seconds for name, seconds in startup_timings.items()}, label_names=('phase',))
+metrics.registry.callback(
+    'nirogya_cache_lookups_total', "Result cache lookups by outcome",
+    lambda: {("hit",): cache.hits, ("miss",): cache.misses} if cache is not None else None,
+    type="counter", label_names=('outcome',))
+metrics.registry.callback(
+    'nirogya_cache_entries', "Entries in the result cache",
+    lambda: cache.stats()["entries"] if cache is not None else None)
+metrics.registry.callback(
+    'nirogya_forecast_table_age_seconds', "Time since the forecast table was computed",
+    lambda: forecast_table.stats()["age_seconds"] if forecast_table is not None else None)
+metrics.registry.callback(
+    'nirogya_executor_pending', "Jobs queued or running on the inference executor",
+    lambda: executor.pending if executor is not None else None)
+metrics.registry.callback(
+    'nirogya_coalesced_requests_total', "/predict calls answered by an identical call already in flight",
+    lambda: coalescer.coalesced if coalescer is not None else None, type="counter")
+metrics.registry.callback(
+    'nirogya_history_pairs', "Pairs with a history in the history store",
+    lambda: len(histories) if histories is not None else None)
+metrics.registry.callback(
+    'nirogya_history_records_total', "Weekly values appended to the history store",
+    lambda: histories.appended if histories is not None else None, type="counter")
+metrics.registry.callback(
+    'nirogya_cascade_rows_total', "Rows answered by each cascade tier (cache hits included)",
+    lambda: {("baseline",): cascade.baseline_rows, ("model",): cascade.model_rows} if cascade is not None else None,
+    type="counter", label_names=('tier',))
+metrics.registry.callback(
+    'nirogya_microbatch_requests_total', "Requests scored through the micro-batcher",
+    lambda: batcher.total_requests if batcher is not None else None, type="counter")
+metrics.registry.callback(
+    'nirogya_microbatch_batches_total', "Forward passes run by the micro-batcher",
+    lambda: batcher.total_batches if batcher is not None else None, type="counter")
 
 @app.on_event("startup")
 async def load_model():
-    """Load model and encoders on startup."""
-    global model, region_encoder, disease_encoder, num_regions, num_diseases
+    """Load model and vocabularies on startup, recording per-phase timings."""
+    global backend, region_vocab, disease_vocab, num_regions, num_diseases, batcher, executor, cache, histories
+    global coalescer, cascade, history_journal, history_task
+    global region_index, disease_index, regions_payload, diseases_payload, registry_task
     
     try:
-        # Load encoders
-        with open('../models/feature_encoders.pkl', 'rb') as f:
-            encoders = pickle.load(f)
-        
-        region_encoder = encoders['region']
-        disease_encoder = encoders['disease']
-        num_regions = len(region_encoder.classes_)
-        num_diseases = len(disease_encoder.classes_)
-        
-        # Initialize improved model
-        model = ImprovedDiseaseLSTM(
-            num_regions=num_regions,
-            num_diseases=num_diseases,
-            embedding_dim=64,
-            hidden_size=256,
-            num_layers=5,
-            num_heads=4,
-            dropout=0.3
-        ).to(device)
-        
-        # Load best model weights (Model 5 - best validation loss: 0.2355)
-        checkpoint = torch.load('../models/improved_lstm_v2_model5_best.pt', map_location=device)
-        
-        if 'model_state_dict' in checkpoint:
-            model.load_state_dict(checkpoint['model_state_dict'])
-        else:
-            model.load_state_dict(checkpoint)
+        started = time.perf_counter()
+        startup_timings["imports"] = started - IMPORT_STARTED
+        
+        if INTEROP_THREADS and torch.get_num_interop_threads() != INTEROP_THREADS:
+            try:
+                torch.set_num_interop_threads(INTEROP_THREADS)
+            except RuntimeError as e:
+                print(f"⚠️  Could not set {INTEROP_THREADS} inter-op threads ({e})")
+        
+        # Vocabularies and weights are independent files: read them concurrently
+        (region_vocab, disease_vocab), backend = await asyncio.gather(
+            asyncio.to_thread(timed_phase, "vocabularies", load_vocabulary_files),
+            asyncio.to_thread(timed_phase, "backend", load_backend)
+        )
+        num_regions = len(region_vocab)
+        num_diseases = len(disease_vocab)
+        
+        artifact_sizes = (backend.metadata.get('num_regions'), backend.metadata.get('num_diseases'))
+        if artifact_sizes != (num_regions, num_diseases):
+            raise ValueError(f"model vocabulary sizes {artifact_sizes} do not match "
+                             f"vocabularies ({num_regions}, {num_diseases})")
+        
+        region_index = NameIndex(region_vocab.classes, scope=region_state)
+        disease_index = NameIndex(disease_vocab.classes)
+        regions_payload = json_payload({"total": num_regions, "regions": sorted(region_vocab.classes)})
+        diseases_payload = json_payload({"total": num_diseases, "diseases": sorted(disease_vocab.classes)})
+        
+        histories = HistoryStore(num_regions, num_diseases)
+        if HISTORY_STORE_PATH:
+            history_journal = HistoryJournal(
+                HISTORY_STORE_PATH, histories, region_vocab, disease_vocab, HISTORY_SNAPSHOT_EVERY
+            )
+        await asyncio.to_thread(timed_phase, "histories", open_history_store)
+        
+        if CACHE_ENABLED:
+            cache = PredictionCache(max_entries=CACHE_MAX_ENTRIES, ttl_seconds=CACHE_TTL_SECONDS)
+            cache.set_model_version(backend.fingerprint)
+        if COALESCE_ENABLED:
+            coalescer = SingleFlight()
+        if CASCADE_MODE == '1' or (CASCADE_MODE == 'auto' and os.path.exists(CASCADE_BASELINE_PATH)):
+            cascade = CascadeBaseline.load(CASCADE_BASELINE_PATH, CASCADE_MAX_SPREAD)
+        
+        executor = InferenceExecutor(
+            num_workers=INFERENCE_WORKERS,
+            threads_per_worker=INFERENCE_THREADS or None
+        )
         
-        model.eval()
+        # One forward pass so the first request does not pay for lazy runtime setup
+        # (on the backend directly: the cascade would answer its all-zero input)
+        phase_started = time.perf_counter()
+        await executor.run(warm_up, backend)
+        startup_timings["warmup"] = time.perf_counter() - phase_started
         
-        print(f"✅ Model V2 loaded successfully on {device}")
+        if MICROBATCH_ENABLED:
+            batcher = MicroBatcher(
+                run_model_rows,
+                max_batch_size=MICROBATCH_MAX_SIZE,
+                max_wait_ms=MICROBATCH_MAX_WAIT_MS,
+                max_concurrent_batches=executor.num_workers
+            )
+            batcher.start()
+        
+        # First forecast table is built in the background; /hotspots is 503 until then
+        restart_forecast_table()
+        
+        if REGISTRY_POLL_SECONDS > 0:
+            registry_task = asyncio.create_task(follow_registry())
+        if history_journal is not None and HISTORY_POLL_SECONDS > 0:
+            history_task = asyncio.create_task(follow_histories())
+        
+        startup_timings["startup"] = time.perf_counter() - started
+        
+        print(f"✅ Model V2 loaded successfully on {device} ({backend.name}, version {served_version()})")
         print(f"📊 Model: ImprovedDiseaseLSTM (4.2M parameters)")
         print(f"📊 Regions: {num_regions}, Diseases: {num_diseases}")
         print(f"📊 Best validation loss: 0.2355")
         print(f"📊 Median error: 87.5% → Target: <50%")
+        print(f"⏱️  Startup: " + ", ".join(f"{name} {seconds * 1000:.0f} ms" for name, seconds in startup_timings.items()))
+        if profile_settings:
+            print(f"🔧 Serving profile {SERVING_PROFILE_PATH}: " + ", ".join(f"{k}={v}" for k, v in profile_settings.items()))
         
     except Exception as e:
         print(f"❌ Error loading model: {e}")
         raise
 
 
+def json_payload(data) -> tuple:
+    """Serialize a response once: (JSON bytes, strong ETag over the bytes)."""
+    body = json.dumps(data, ensure_ascii=False).encode('utf-8')
+    return body, '"' + hashlib.sha1(body).hexdigest()[:16] + '"'
+
+
+def cached_json_response(request: Request, payload) -> Response:
+    """Precomputed JSON payload, or 304 when the client already has this ETag."""
+    body, etag = payload
+    headers = {"ETag": etag, "Cache-Control": "public, no-cache"}
+    
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match:
+        tags = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+        if etag in tags or "*" in tags:
+            return Response(status_code=304, headers=headers)
+    
+    return Response(content=body, media_type="application/json", headers=headers)
+
+
+def timed_phase(name, fn, *args):
+    """Run one startup phase and record its wall time in `startup_timings`."""
+    phase_started = time.perf_counter()
+    result = fn(*args)
+    startup_timings[name] = time.perf_counter() - phase_started
+    return result
+
+
+def load_vocabulary_files():
+    """
+    Region and disease vocabularies, from the first available source.
+    
+    Order: the active registry version, vocabularies.json inside the deploy artifact, the one written by
+    prepare_training_data.py, and finally the pickled LabelEncoders (which
+    pull in sklearn/pandas, so they are only a fallback).
+    """
+    paths = ['../models/vocabularies.json']
+    if WEIGHTS_MMAP:
+        paths.insert(0, os.path.join(WEIGHTS_MMAP_PATH, 'vocabularies.json'))
+    active_version = registry.active()
+    if active_version is not None and registry.exists(active_version):
+        paths.insert(0, os.path.join(registry.path(active_version), 'vocabularies.json'))
+    
+    for path in paths:
+        if os.path.exists(path):
+            return load_vocabularies(path)
+    
+    with open('../models/feature_encoders.pkl', 'rb') as f:
+        encoders = pickle.load(f)
+    return Vocabulary(encoders['region'].classes_), Vocabulary(encoders['disease'].classes_)
+
+
+def load_backend():
+    """
+    Pick the inference backend from the environment.
+    
+    Order: active registry version, member ensemble (NIROGYA_ENSEMBLE=1),
+    ONNX Runtime (NIROGYA_BACKEND=onnx), int8 quantized eager
+    (NIROGYA_QUANTIZE=int8), memory-mapped deploy artifact, TorchScript
+    artifact, eager checkpoint. Each optional step falls back to the next one
+    if it is unavailable. Vocabulary sizes are checked by the caller.
+    """
+    active_version = registry.active()
+    if active_version is not None:
+        try:
+            return load_registry_backend(active_version)[0]
+        except Exception as e:
+            print(f"⚠️  Could not load registry version {active_version} ({e}), falling back")
+    
+    if ENSEMBLE_ENABLED:
+        try:
+            if ENSEMBLE_MODE not in ENSEMBLE_MODES:
+                raise ValueError(f"unknown NIROGYA_ENSEMBLE_MODE={ENSEMBLE_MODE}")
+            ensemble, metadata = load_ensemble(ENSEMBLE_CHECKPOINTS, ENSEMBLE_MODE, device=device)
+            return EnsembleBackend(ensemble, device, f"ensemble-{ENSEMBLE_MODE}",
+                                   metadata['weights_fingerprint'], metadata)
+        except Exception as e:
+            print(f"⚠️  Could not load ensemble ({e}), serving a single model")
+    
+    if BACKEND == 'onnx':
+        try:
+            return OnnxBackend(ONNX_PATH, intra_op_threads=INFERENCE_THREADS)
+        except Exception as e:
+            print(f"⚠️  Could not load ONNX backend ({e}), falling back to PyTorch")
+    elif BACKEND != 'torch':
+        print(f"⚠️  Unknown NIROGYA_BACKEND={BACKEND}, using PyTorch")
+    
+    if QUANTIZE_MODE == 'int8':
+        if device.type != 'cpu':
+            print(f"⚠️  int8 quantization is CPU-only, serving fp32 on {device}")
+        else:
+            eager = load_checkpoint_model(CHECKPOINT_PATH, device=device)
+            metadata = describe_model(eager)
+            fingerprint = metadata['weights_fingerprint'] + "-int8"
+            return TorchBackend(quantize_dynamic_int8(eager), device, "eager-int8", fingerprint, metadata)
+    elif QUANTIZE_MODE:
+        print(f"⚠️  Unknown NIROGYA_QUANTIZE={QUANTIZE_MODE}, serving fp32")
+    
+    if WEIGHTS_MMAP and os.path.exists(os.path.join(WEIGHTS_MMAP_PATH, 'manifest.json')):
+        try:
+            if device.type != 'cpu':
+                raise ValueError(f"memory-mapped weights are CPU-only, not {device}")
+            mapped, metadata = load_mmap_model(WEIGHTS_MMAP_PATH)
+            return TorchBackend(mapped, device, "eager-mmap", metadata['weights_fingerprint'], metadata)
+        except Exception as e:
+            print(f"⚠️  Could not load memory-mapped weights ({e}), falling back")
+    
+    if TORCHSCRIPT_ENABLED and os.path.exists(TORCHSCRIPT_PATH):
+        try:
+            scripted, metadata = load_torchscript(TORCHSCRIPT_PATH, device)
+            return TorchBackend(scripted, device, "torchscript", metadata['weights_fingerprint'], metadata)
+        except Exception as e:
+            print(f"⚠️  Could not load TorchScript artifact ({e}), falling back to eager model")
+    
+    # Improved model, best weights (Model 5 - best validation loss: 0.2355)
+    eager = load_checkpoint_model(CHECKPOINT_PATH, device=device)
+    metadata = describe_model(eager)
+    return TorchBackend(eager, device, "eager", metadata['weights_fingerprint'], metadata)
+
+
+def seed_histories():
+    """Latest observed weeks from the processed CSV, or None when it is missing."""
+    if not os.path.exists(HISTORY_CSV_PATH):
+        return None
+    return load_history_table(HISTORY_CSV_PATH, region_vocab, disease_vocab)
+
+
+def open_history_store():
+    """Fill the history store: from its snapshot and log, else seeded from the CSV."""
+    if history_journal is not None:
+        history_journal.open(seed_histories)
+        return
+    table = seed_histories()
+    if table is not None:
+        histories.seed(table)
+
+
+async def follow_histories():
+    """Apply the weekly values other workers appended to the shared log."""
+    while True:
+        await asyncio.sleep(HISTORY_POLL_SECONDS)
+        try:
+            # File locks and log replay block: run them off the event loop
+            async with history_lock:
+                await asyncio.to_thread(history_journal.poll)
+        except Exception as e:
+            print(f"⚠️  Could not follow the history log: {e}")
+
+
+def load_registry_backend(version):
+    """Memory-map a registry version: (backend, (region_vocab, disease_vocab))."""
+    if device.type != 'cpu':
+        raise ValueError(f"registry versions are memory-mapped and CPU-only, not {device}")
+    model, metadata, vocabularies = registry.load(version)
+    return TorchBackend(model, device, "eager-mmap", metadata['weights_fingerprint'], metadata), vocabularies
+
+
+def served_version(model=None) -> Optional[str]:
+    """Registry version of a backend (default: the serving one), else its weights fingerprint."""
+    model = model if model is not None else backend
+    if model is None:
+        return None
+    return model.metadata.get('registry_version') or model.fingerprint
+
+
+def warm_up(candidate):
+    """One forward pass on zeros before a backend takes traffic; raises on non-finite output."""
+    output = candidate.predict_log(
+        np.zeros((1, SEQUENCE_LENGTH), dtype=np.float32),
+        np.zeros(1, dtype=np.int64),
+        np.zeros(1, dtype=np.int64),
+        temporal_features(np.array([np.datetime64('today', 'D')]))
+    )
+    if not np.isfinite(output).all():
+        raise ValueError("warm-up produced non-finite predictions")
+
+
+def swap_backend(candidate):
+    """Make `candidate` the serving backend, keeping the current one for rollback."""
+    global backend, previous_backend
+    
+    # Forwards already running keep the backend they started with (run_model
+    # reads the global once); everything scheduled from here on uses the new one
+    previous_backend, backend = backend, candidate
+    if cache is not None:
+        cache.set_model_version(backend.fingerprint)
+    restart_forecast_table()
+    print(f"🔄 Serving model version {served_version()} (previous: {served_version(previous_backend)})")
+
+
+async def activate_version(version: str, persist: bool = True):
+    """
+    Load, warm up and swap in a registry version without pausing traffic.
+    
+    Loading and warm-up run in a background thread while the current version
+    keeps serving. Versions must use the serving vocabularies (changing them
+    needs a restart). With `persist`, ACTIVE is updated so other workers and
+    restarts follow.
+    """
+    async with swap_lock:
+        if served_version() != version:
+            candidate, (new_regions, new_diseases) = await asyncio.to_thread(load_registry_backend, version)
+            if new_regions.classes != region_vocab.classes or new_diseases.classes != disease_vocab.classes:
+                raise ValueError(f"version {version} uses different vocabularies; restart the server to serve it")
+            await asyncio.to_thread(warm_up, candidate)
+            swap_backend(candidate)
+        if persist:
+            registry.set_active(version)
+
+
+async def rollback_version(persist: bool = True):
+    """Swap back to the previously served backend (still in memory, so instant)."""
+    async with swap_lock:
+        if previous_backend is None:
+            raise LookupError("no previous model version to roll back to")
+        swap_backend(previous_backend)
+        if persist:
+            registry.set_active(backend.metadata.get('registry_version'))
+
+
+async def follow_registry():
+    """Keep this worker on the version named by ACTIVE (changed by another worker or the CLI)."""
+    failed_target = None
+    while True:
+        await asyncio.sleep(REGISTRY_POLL_SECONDS)
+        target = registry.active()
+        if target == backend.metadata.get('registry_version') or target == failed_target:
+            continue
+        try:
+            if previous_backend is not None and target == previous_backend.metadata.get('registry_version'):
+                await rollback_version(persist=False)
+            elif target is not None:
+                await activate_version(target, persist=False)
+            failed_target = None
+        except Exception as e:
+            failed_target = target
+            print(f"⚠️  Could not switch to registry version {target}: {e}")
+
+
+class ModelVersionHeader:
+    """
+    ASGI middleware adding X-Model-Version.
+    
+    Endpoints that score set the header themselves to the version that
+    produced their predictions; every other response gets the version
+    serving when it starts.
+    """
+    
+    def __init__(self, app):
+        self.app = app
+    
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+        
+        async def send_with_version(message):
+            if message['type'] == 'http.response.start' and backend is not None:
+                headers = list(message.get('headers', []))
+                if not any(name.lower() == b'x-model-version' for name, _ in headers):
+                    headers.append((b'x-model-version', served_version().encode()))
+                message['headers'] = headers
+            await send(message)
+        
+        await self.app(scope, receive, send_with_version)
+
+
+app.add_middleware(ModelVersionHeader)
+
+
+@app.on_event("shutdown")
+async def shutdown():
+    """Stop background serving tasks."""
+    for task in (forecast_task, registry_task, history_task):
+        if task is not None:
+            task.cancel()
+    if history_journal is not None:
+        history_journal.close()
+    if batcher is not None:
+        await batcher.stop()
+    if executor is not None:
+        executor.shutdown()
+
+
 # Pydantic models
+class UncertaintyOptions(BaseModel):
+    """Monte Carlo dropout sampling of one prediction."""
+    samples: int = Field(
+        MC_DROPOUT_SAMPLES, ge=2, le=MC_DROPOUT_MAX_SAMPLES,
+        description="Stochastic forward samples (dropout active), drawn in one batched forward"
+    )
+    quantiles: List[Annotated[float, Field(gt=0, lt=1)]] = Field(
+        list(DEFAULT_QUANTILES), min_length=1, max_length=99, description="Quantile levels to report"
+    )
+
+
 class PredictionRequest(BaseModel):
     """Request model for prediction endpoint."""
     region: str = Field(..., description="Region name (State_District format)")
     disease: str = Field(..., description="Disease name")
-    last_14_days_cases: List[float] = Field(..., description="List of 14 daily case counts", min_length=14, max_length=14)
+    last_14_days_cases: Optional[List[float]] = Field(
+        None, description="List of 14 daily case counts (default: the server's stored history)",
+        min_length=14, max_length=14
+    )
     prediction_date: Optional[str] = Field(None, description="Date for prediction (YYYY-MM-DD)")
+    uncertainty: Optional[UncertaintyOptions] = Field(
+        None, description="Estimate the interval from Monte Carlo dropout samples instead of ±30%"
+    )
     
     class Config:
         json_schema_extra = {
@@ -119,6 +699,428 @@ class PredictionResponse(BaseModel):
     disease: str
     prediction_date: str
     model_version: str
+    tier: str = Field("model", description="Cascade tier that answered: 'baseline' or 'model'")
+    quantiles: Optional[Dict[str, float]] = Field(
+        None, description="Predicted cases at each requested quantile level (uncertainty requests only)"
+    )
+    uncertainty_samples: Optional[int] = None
+
+
+class BatchPredictionItem(BaseModel):
+    """Single item of a batch prediction request.
+
+    Validation is done per item by the endpoint so one bad item does not
+    fail the whole batch.
+    """
+    region: str = Field(..., description="Region name (State_District format)")
+    disease: str = Field(..., description="Disease name")
+    last_14_days_cases: Optional[List[float]] = Field(
+        None, description="List of 14 daily case counts (default: the server's stored history)"
+    )
+    prediction_date: Optional[str] = Field(None, description="Date for prediction (YYYY-MM-DD)")
+
+
+class BatchPredictionRequest(BaseModel):
+    """Request model for batch prediction endpoint."""
+    items: List[BatchPredictionItem] = Field(..., min_length=1, max_length=MAX_BATCH_ITEMS)
+
+
+class BatchPredictionResult(BaseModel):
+    """Result for one item of a batch; `error` is set instead of the prediction on failure."""
+    index: int
+    region: str
+    disease: str
+    prediction_date: Optional[str] = None
+    predicted_cases: Optional[float] = None
+    confidence_interval_lower: Optional[float] = None
+    confidence_interval_upper: Optional[float] = None
+    tier: Optional[str] = None
+    error: Optional[str] = None
+
+
+class BatchPredictionResponse(BaseModel):
+    """Response model for batch prediction endpoint."""
+    total: int
+    succeeded: int
+    failed: int
+    results: List[BatchPredictionResult]
+    model_version: str
+
+
+class ForecastRequest(BaseModel):
+    """Request model for multi-step forecast endpoint.
+    
+    `prediction_date` of each item is the date of the first forecast step.
+    """
+    items: List[BatchPredictionItem] = Field(..., min_length=1, max_length=MAX_BATCH_ITEMS)
+    horizon: int = Field(4, ge=1, le=MAX_FORECAST_HORIZON, description="Number of weekly steps to forecast")
+
+
+class ForecastResult(BaseModel):
+    """Forecast for one series; `error` is set instead of the forecast on failure."""
+    index: int
+    region: str
+    disease: str
+    dates: Optional[List[str]] = None
+    predicted_cases: Optional[List[float]] = None
+    confidence_interval_lower: Optional[List[float]] = None
+    confidence_interval_upper: Optional[List[float]] = None
+    error: Optional[str] = None
+
+
+class ForecastResponse(BaseModel):
+    """Response model for multi-step forecast endpoint."""
+    total: int
+    succeeded: int
+    failed: int
+    horizon: int
+    results: List[ForecastResult]
+    model_version: str
+
+
+class StreamPredictionRequest(BaseModel):
+    """Request model for streaming scoring of region × disease pairs.
+    
+    Empty filters select everything; `states` matches the part of the region
+    name before the first underscore.
+    """
+    regions: Optional[List[str]] = Field(None, description="Region names to score (default: all)")
+    states: Optional[List[str]] = Field(None, description="States whose regions are scored (default: all)")
+    diseases: Optional[List[str]] = Field(None, description="Disease names to score (default: all)")
+    observed_only: bool = Field(False, description="Only score pairs present in the history data")
+    prediction_date: Optional[str] = Field(None, description="Date for all predictions (YYYY-MM-DD)")
+    chunk_size: int = Field(STREAM_CHUNK_SIZE, ge=1, le=MAX_BATCH_ITEMS, description="Pairs per forward pass")
+
+
+class HotspotResult(BaseModel):
+    """One precomputed forecast, as returned by /hotspots."""
+    region: str
+    state: str
+    disease: str
+    prediction_date: str
+    predicted_cases: float
+    confidence_interval_lower: float
+    confidence_interval_upper: float
+    last_observed_cases: float
+    growth_ratio: float
+
+
+class HotspotResponse(BaseModel):
+    """Response model for hotspot queries."""
+    rank_by: str
+    total: int
+    computed_at: str
+    results: List[HotspotResult]
+    model_version: str
+
+
+class HistoryRecord(BaseModel):
+    """One weekly case count of a (region, disease) pair."""
+    region: str = Field(..., description="Region name (State_District format)")
+    disease: str = Field(..., description="Disease name")
+    date: str = Field(..., description="Week of the count (YYYY-MM-DD)")
+    cases: float = Field(..., ge=0, description="Cases reported that week")
+
+
+class HistoryIngestRequest(BaseModel):
+    """Request model for history ingestion.
+    
+    Records are applied in order. A record for a pair's newest date replaces
+    that value; older dates are rejected.
+    """
+    records: List[HistoryRecord] = Field(..., min_length=1, max_length=MAX_BATCH_ITEMS)
+
+
+class HistoryIngestError(BaseModel):
+    """A rejected record."""
+    index: int
+    error: str
+
+
+class HistoryIngestResponse(BaseModel):
+    """Response model for history ingestion."""
+    total: int
+    accepted: int
+    rejected: int
+    errors: List[HistoryIngestError]
+
+
+class HistoryResponse(BaseModel):
+    """Stored history of one pair."""
+    region: str
+    disease: str
+    observed: bool
+    last_date: Optional[str] = None
+    last_14_days_cases: List[float]
+
+
+def no_history_error(region: str, disease: str) -> str:
+    return f"No stored history for {region} / {disease}. Send the last {SEQUENCE_LENGTH} case values."
+
+
+def stored_observed(region_idx, disease_idx) -> np.ndarray:
+    """Which pairs have a stored history (all False without a store)."""
+    if histories is None:
+        return np.zeros(len(region_idx), dtype=bool)
+    return histories.observed(region_idx, disease_idx)
+
+
+def encode_batch_items(items):
+    """
+    Validate and encode batch items in one go. Items without a history use
+    the stored one (looked up together).
+    
+    Args:
+        items: list of BatchPredictionItem
+    
+    Returns:
+        errors: per-item error message or None
+        valid: indices of the items that passed validation
+        inputs: (cases_log, region_idx, disease_idx, dates) arrays for the valid items,
+            dates as datetime64[D]
+    """
+    n = len(items)
+    errors = [None] * n
+    
+    # Vocabulary lookups in one pass (-1 = unknown)
+    region_idx = region_vocab.encode([item.region for item in items])
+    disease_idx = disease_vocab.encode([item.disease for item in items])
+    
+    # Known pairs sent without a history need one in the history store
+    from_store = np.array([item.last_14_days_cases is None for item in items], dtype=bool)
+    stored = np.flatnonzero(from_store & (region_idx >= 0) & (disease_idx >= 0))
+    missing_history = np.zeros(n, dtype=bool)
+    missing_history[stored] = ~stored_observed(region_idx[stored], disease_idx[stored])
+    
+    # Sent histories of the right length must hold finite, non-negative counts
+    full = [i for i, item in enumerate(items)
+            if item.last_14_days_cases is not None and len(item.last_14_days_cases) == SEQUENCE_LENGTH]
+    bad_values = np.zeros(n, dtype=bool)
+    if full:
+        bad_values[full] = ~valid_history([items[i].last_14_days_cases for i in full])
+    
+    # Parse each distinct date once
+    today = parse_date(None)
+    parsed_dates = {}
+    for date_str in {item.prediction_date for item in items if item.prediction_date}:
+        try:
+            parsed_dates[date_str] = parse_date(date_str)
+        except (ValueError, TypeError):
+            parsed_dates[date_str] = None
+    
+    pred_dates = []
+    for i, item in enumerate(items):
+        pred_date = parsed_dates[item.prediction_date] if item.prediction_date else today
+        pred_dates.append(pred_date)
+        
+        if region_idx[i] < 0:
+            errors[i] = f"Unknown region: {item.region}. Use /regions to see available options."
+        elif disease_idx[i] < 0:
+            errors[i] = f"Unknown disease: {item.disease}. Use /diseases to see available options."
+        elif missing_history[i]:
+            errors[i] = no_history_error(item.region, item.disease)
+        elif not from_store[i] and len(item.last_14_days_cases) != SEQUENCE_LENGTH:
+            errors[i] = f"Expected {SEQUENCE_LENGTH} case values, got {len(item.last_14_days_cases)}"
+        elif bad_values[i]:
+            errors[i] = HISTORY_VALUE_ERROR
+        elif pred_date is None:
+            errors[i] = f"Invalid prediction_date: {item.prediction_date}"
+    
+    valid = [i for i in range(n) if errors[i] is None]
+    if not valid:
+        return errors, valid, None
+    
+    valid_array = np.array(valid, dtype=np.int64)
+    cases_log = np.empty((len(valid), SEQUENCE_LENGTH), dtype=np.float32)
+    sent = ~from_store[valid_array]
+    if sent.any():
+        cases_log[sent] = encode_history([items[i].last_14_days_cases for i in valid_array[sent].tolist()])
+    if not sent.all():
+        looked_up = valid_array[~sent]
+        cases_log[~sent] = histories.lookup(region_idx[looked_up], disease_idx[looked_up])[0]
+    dates = np.array([pred_dates[i] for i in valid], dtype='datetime64[D]')
+    
+    return errors, valid, (cases_log, region_idx[valid], disease_idx[valid], dates)
+
+
+def run_model(cases_log, region_idx, disease_idx, temporal, model=None) -> tuple:
+    """
+    Run the model over encoded inputs in chunks of MAX_FORWARD_BATCH rows.
+    
+    With the cascade on, rows whose history passes its gate are answered by
+    the baseline tier and only the others are sent to the model.
+    
+    Args:
+        cases_log: (n, 14) log1p case history
+        region_idx: (n,) region indices
+        disease_idx: (n,) disease indices
+        temporal: (n, 5) temporal features
+        model: backend to run (default: the serving one)
+    
+    Returns:
+        ((n, 3) predicted cases, lower and upper interval bound, on the
+        natural scale; version of the backend that produced them)
+    """
+    cases_log = np.ascontiguousarray(cases_log, dtype=np.float32)
+    region_idx = np.ascontiguousarray(region_idx, dtype=np.int64)
+    disease_idx = np.ascontiguousarray(disease_idx, dtype=np.int64)
+    temporal = np.ascontiguousarray(temporal, dtype=np.float32)
+    
+    n = len(cases_log)
+    preds = np.empty((n, 3), dtype=np.float32)
+    model = model if model is not None else backend  # one version for the whole call, even if a swap happens meanwhile
+    
+    # Cascade: trivial histories get the baseline, the model sees the other rows
+    rows = None
+    if cascade is not None:
+        trivial = cascade.gate(cases_log)
+        cascade.record(int(trivial.sum()), n - int(trivial.sum()))
+        if trivial.any():
+            preds[trivial] = cascade.predict(cases_log[trivial])
+            rows = np.flatnonzero(~trivial)
+            cases_log, region_idx, disease_idx, temporal = (
+                array[rows] for array in (cases_log, region_idx, disease_idx, temporal)
+            )
+    
+    for start in range(0, len(cases_log), MAX_FORWARD_BATCH):
+        end = min(start + MAX_FORWARD_BATCH, len(cases_log))
+        forward_started = time.perf_counter()
+        preds[slice(start, end) if rows is None else rows[start:end]] = predict_with_interval(
+            model, cases_log[start:end], region_idx[start:end], disease_idx[start:end], temporal[start:end]
+        )
+        metrics.forward_seconds.observe(time.perf_counter() - forward_started)
+        metrics.forward_rows.observe(end - start)
+    
+    return preds, served_version(model)
+
+
+def baseline_rows(cases_log) -> np.ndarray:
+    """(n,) bool, True where the cascade's baseline tier answers (the gate `run_model` applies)."""
+    if cascade is None:
+        return np.zeros(len(cases_log), dtype=bool)
+    return cascade.gate(np.asarray(cases_log, dtype=np.float32))
+
+
+def run_mc_dropout(cases_log, region_idx, disease_idx, temporal, samples: int) -> tuple:
+    """
+    Monte Carlo dropout samples of encoded inputs: ((n, samples) log1p
+    predictions, version of the backend sampled).
+    
+    Each forward expands its rows `samples` times, so rows are chunked to
+    keep forwards near MAX_FORWARD_BATCH expanded rows. The sampler follows
+    the serving backend (rebuilt after a version swap); ValueError when the
+    backend has no eager weights to sample from.
+    """
+    global mc_sampler, mc_sampler_error
+    model = backend
+    sampler = mc_sampler
+    if sampler is None or sampler.fingerprint != model.fingerprint:
+        if mc_sampler_error is not None and mc_sampler_error[0] == model.fingerprint:
+            raise mc_sampler_error[1]
+        try:
+            sampler = mc_sampler = load_sampler(model, CHECKPOINT_PATH, device)
+        except ValueError as e:
+            mc_sampler_error = (model.fingerprint, e)
+            raise
+    
+    cases_log = np.ascontiguousarray(cases_log, dtype=np.float32)
+    region_idx = np.ascontiguousarray(region_idx, dtype=np.int64)
+    disease_idx = np.ascontiguousarray(disease_idx, dtype=np.int64)
+    temporal = np.ascontiguousarray(temporal, dtype=np.float32)
+    
+    n = len(cases_log)
+    rows = max(1, MAX_FORWARD_BATCH // samples)
+    out = np.empty((n, samples), dtype=np.float32)
+    for start in range(0, n, rows):
+        end = min(start + rows, n)
+        forward_started = time.perf_counter()
+        out[start:end] = sampler.sample_log(
+            cases_log[start:end], region_idx[start:end], disease_idx[start:end], temporal[start:end], samples
+        )
+        metrics.forward_seconds.observe(time.perf_counter() - forward_started)
+        metrics.forward_rows.observe((end - start) * samples)
+    
+    return out, served_version(model)
+
+
+def record_items(endpoint, total, succeeded):
+    """Batch size and per-item outcomes of a batch/forecast request."""
+    metrics.request_items.observe(total, endpoint)
+    metrics.items.inc(endpoint, "success", amount=succeeded)
+    if total > succeeded:
+        metrics.items.inc(endpoint, "invalid", amount=total - succeeded)
+
+
+async def run_model_async(cases_log, region_idx, disease_idx, temporal, model=None) -> tuple:
+    """Await `run_model` on the inference executor so the event loop stays free."""
+    return await executor.run(run_model, cases_log, region_idx, disease_idx, temporal, model)
+
+
+def run_forecast(cases_log, region_idx, disease_idx, start_dates, horizon: int) -> tuple:
+    """`rollout_forecast` with every step on one backend: (predictions, dates, version)."""
+    model = backend
+    preds, pred_dates = rollout_forecast(
+        lambda *inputs: run_model(*inputs, model=model)[0], temporal_features,
+        cases_log, region_idx, disease_idx, start_dates, horizon
+    )
+    return preds, pred_dates, served_version(model)
+
+
+async def run_model_rows(cases_log, region_idx, disease_idx, temporal) -> list:
+    """`run_model_async` for the micro-batcher: one (prediction row, version) pair per input."""
+    preds, version = await run_model_async(cases_log, region_idx, disease_idx, temporal)
+    return [(pred, version) for pred in preds]
+
+
+async def predict_cached(cases_log, region_idx, disease_idx, dates) -> tuple:
+    """
+    Score encoded inputs, answering repeated inputs from the result cache.
+    
+    Only cache misses are sent to the model. Cached entries belong to the
+    serving version at lookup time; if a swap lands while the misses are
+    scored, the whole batch is rescored so every row comes from one version.
+    Entries keep the cascade tier that scored them, and hits count towards
+    that tier's rows like scored rows do.
+    
+    Returns:
+        ((n, 3) predictions, (n,) bool True where the cascade's baseline tier
+        answered, version that produced them)
+    """
+    if cache is None:
+        preds, version = await run_model_async(cases_log, region_idx, disease_idx, temporal_features(dates))
+        return preds, baseline_rows(cases_log), version
+    
+    keys = cache.make_keys(region_idx, disease_idx, cases_log, dates)
+    cache_version = cache.model_version
+    version = served_version()
+    preds = np.empty((len(keys), 3), dtype=np.float32)
+    baseline = np.zeros(len(keys), dtype=bool)
+    misses = []
+    for j, key in enumerate(keys):
+        value = cache.get(key)
+        if value is None:
+            misses.append(j)
+        else:
+            preds[j], baseline[j] = value
+    hit_baseline = int(baseline.sum())
+    
+    if misses:
+        m = np.array(misses)
+        preds[m], miss_version = await run_model_async(
+            cases_log[m], region_idx[m], disease_idx[m], temporal_features(dates[m])
+        )
+        if miss_version != version and len(misses) < len(keys):
+            preds, version = await run_model_async(cases_log, region_idx, disease_idx, temporal_features(dates))
+            return preds, baseline_rows(cases_log), version
+        version = miss_version
+        baseline[m] = baseline_rows(cases_log[m])
+        for j in misses:
+            if np.isfinite(preds[j]).all():
+                cache.put(keys[j], (tuple(preds[j].tolist()), bool(baseline[j])), cache_version)
+    
+    if cascade is not None:
+        cascade.record(hit_baseline, len(keys) - len(misses) - hit_baseline)
+    return preds, baseline, version
 
 
 @app.get("/")
@@ -152,119 +1154,251 @@ async def health_check():
     """Health check endpoint."""
     return {
         "status": "healthy",
-        "model_loaded": model is not None,
+        "model_loaded": backend is not None,
         "device": str(device),
+        "backend": backend.name if backend is not None else None,
+        "model_version_served": served_version(),
+        "previous_model_version": served_version(previous_backend) if previous_backend is not None else None,
+        "worker_pid": os.getpid(),
+        "startup_timings_ms": {name: round(seconds * 1000, 1) for name, seconds in startup_timings.items()},
+        "serving_profile": {
+            "path": SERVING_PROFILE_PATH,
+            "created_at": serving_profile.get("created_at"),
+            "settings_in_effect": profile_settings
+        } if serving_profile is not None else None,
         "num_regions": num_regions,
         "num_diseases": num_diseases,
         "model_version": "V2 - ImprovedDiseaseLSTM"
     }
 
 
+@app.get("/stats")
+async def get_stats():
+    """Serving statistics: micro-batching, inference executor and result cache."""
+    return {
+        "batching": batcher.stats() if batcher is not None else {"enabled": False},
+        "executor": executor.stats() if executor is not None else None,
+        "cache": cache.stats() if cache is not None else {"enabled": False},
+        "coalescing": coalescer.stats() if coalescer is not None else {"enabled": False},
+        "cascade": cascade.stats() if cascade is not None else {"enabled": False},
+        "histories": {
+            **histories.stats(),
+            "persistence": history_journal.stats() if history_journal is not None else None
+        } if histories is not None else None
+    }
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def get_metrics():
+    """Serving metrics in the Prometheus text exposition format."""
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+
 @app.get("/regions")
-async def get_regions():
-    """Get list of available regions."""
-    if region_encoder is None:
+async def get_regions(request: Request):
+    """Get list of available regions (precomputed, with ETag revalidation)."""
+    if regions_payload is None:
+        raise HTTPException(status_code=500, detail="Model not loaded")
+    
+    return cached_json_response(request, regions_payload)
+
+
+@app.get("/regions/search")
+async def search_regions(
+    q: str = Query("", description="Case-insensitive prefix of the region, state or district name"),
+    state: Optional[str] = Query(None, description="Only regions of this state"),
+    limit: int = Query(10, ge=1, le=MAX_SEARCH_RESULTS, description="Maximum number of matches")
+):
+    """Autocomplete region names, optionally within one state."""
+    if region_index is None:
         raise HTTPException(status_code=500, detail="Model not loaded")
     
-    regions = region_encoder.classes_.tolist()
     return {
-        "total": len(regions),
-        "regions": sorted(regions)
+        "query": q,
+        "state": state,
+        "candidates": region_index.scope_size(state),
+        "matches": region_index.search(q, limit, scope=state)
     }
 
 
 @app.get("/diseases")
-async def get_diseases():
-    """Get list of available diseases."""
-    if disease_encoder is None:
+async def get_diseases(request: Request):
+    """Get list of available diseases (precomputed, with ETag revalidation)."""
+    if diseases_payload is None:
+        raise HTTPException(status_code=500, detail="Model not loaded")
+    
+    return cached_json_response(request, diseases_payload)
+
+
+@app.get("/diseases/search")
+async def search_diseases(
+    q: str = Query("", description="Case-insensitive prefix of the disease name"),
+    limit: int = Query(10, ge=1, le=MAX_SEARCH_RESULTS, description="Maximum number of matches")
+):
+    """Autocomplete disease names."""
+    if disease_index is None:
         raise HTTPException(status_code=500, detail="Model not loaded")
     
-    diseases = disease_encoder.classes_.tolist()
     return {
-        "total": len(diseases),
-        "diseases": sorted(diseases)
+        "query": q,
+        "candidates": len(disease_index),
+        "matches": disease_index.search(q, limit)
     }
 
 
 @app.post("/predict", response_model=PredictionResponse)
-async def predict(request: PredictionRequest):
+async def predict(request: PredictionRequest, response: Response):
     """
     Predict disease outbreak cases for the next day.
     
+    With `uncertainty`, the interval and quantiles come from Monte Carlo
+    dropout samples (one batched forward) instead of the fixed ±30% band.
+    `model_version` and X-Model-Version name the version that answered.
+    
     Args:
         request: Prediction request with region, disease, and last 14 days cases
+        response: Outgoing response (for the X-Model-Version header)
     
     Returns:
         Prediction with confidence intervals
     """
-    if model is None:
+    if backend is None:
         raise HTTPException(status_code=500, detail="Model not loaded")
     
+    stages = metrics.stage_timer("/predict")
     try:
-        # Validate region and disease
-        if request.region not in region_encoder.classes_:
+        # Validate and encode region and disease
+        region_idx = region_vocab.index(request.region)
+        if region_idx is None:
             raise HTTPException(
                 status_code=400,
                 detail=f"Unknown region: {request.region}. Use /regions to see available options."
             )
         
-        if request.disease not in disease_encoder.classes_:
+        disease_idx = disease_vocab.index(request.disease)
+        if disease_idx is None:
             raise HTTPException(
                 status_code=400,
                 detail=f"Unknown disease: {request.disease}. Use /diseases to see available options."
             )
         
-        # Encode region and disease
-        region_idx = region_encoder.transform([request.region])[0]
-        disease_idx = disease_encoder.transform([request.disease])[0]
-        
         # Parse prediction date
-        if request.prediction_date:
-            pred_date = pd.to_datetime(request.prediction_date)
+        try:
+            pred_date = parse_date(request.prediction_date)
+        except ValueError:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Invalid prediction_date: {request.prediction_date}. Use YYYY-MM-DD."
+            )
+        
+        stages.mark("validate")
+        
+        # Temporal features from the precomputed per-date table
+        temporal = temporal_features(pred_date)
+        
+        # Log transform cases, or take the pair's window from the history store
+        # (copied: ingestion may move the ring before the forward runs)
+        if request.last_14_days_cases is not None:
+            if not valid_history(request.last_14_days_cases):
+                raise HTTPException(status_code=400, detail=HISTORY_VALUE_ERROR)
+            cases_log = encode_history(request.last_14_days_cases)[None, :]
+        elif stored_observed([region_idx], [disease_idx])[0]:
+            cases_log = histories.window(region_idx, disease_idx)[None, :]
         else:
-            pred_date = pd.Timestamp.now()
-        
-        # Extract temporal features
-        month = pred_date.month
-        day_of_year = pred_date.dayofyear
-        year = pred_date.year
-        
-        # Cyclical encoding
-        month_sin = np.sin(2 * np.pi * month / 12)
-        month_cos = np.cos(2 * np.pi * month / 12)
-        day_sin = np.sin(2 * np.pi * day_of_year / 365)
-        day_cos = np.cos(2 * np.pi * day_of_year / 365)
-        year_norm = (year - 2009) / 16
-        
-        temporal_features = np.array([month_sin, month_cos, day_sin, day_cos, year_norm], dtype=np.float32)
-        
-        # Log transform cases
-        cases_log = np.log1p(request.last_14_days_cases)
-        
-        # Prepare tensors
-        x = torch.FloatTensor(cases_log).unsqueeze(0).to(device)
-        region_t = torch.LongTensor([region_idx]).to(device)
-        disease_t = torch.LongTensor([disease_idx]).to(device)
-        temporal_t = torch.FloatTensor(temporal_features).unsqueeze(0).to(device)
-        
-        # Make prediction
-        with torch.no_grad():
-            pred_log = model(x, region_t, disease_t, temporal_t)
-            pred_cases = np.expm1(pred_log.cpu().numpy()[0, 0])
-        
-        # Confidence intervals (simple approach: ±30% based on model uncertainty)
-        ci_lower = max(0, pred_cases * 0.7)
-        ci_upper = pred_cases * 1.3
-        
-        return PredictionResponse(
-            predicted_cases=float(pred_cases),
-            confidence_interval_lower=float(ci_lower),
-            confidence_interval_upper=float(ci_upper),
+            raise HTTPException(status_code=404, detail=no_history_error(request.region, request.disease))
+        stages.mark("encode")
+        
+        # Monte Carlo dropout: stochastic samples, so no cache, batching or coalescing
+        if request.uncertainty is not None:
+            options = request.uncertainty
+            try:
+                samples_log, version = await executor.run(
+                    run_mc_dropout, cases_log, [region_idx], [disease_idx], temporal, options.samples
+                )
+            except ValueError as e:
+                raise HTTPException(status_code=501, detail=f"Uncertainty sampling unavailable: {e}")
+            (pred_cases, ci_lower, ci_upper), levels = (
+                part[0].tolist() for part in summarize_samples(samples_log, options.quantiles)
+            )
+            stages.mark("inference")
+            response.headers["X-Model-Version"] = version
+            return PredictionResponse(
+                predicted_cases=pred_cases,
+                confidence_interval_lower=ci_lower,
+                confidence_interval_upper=ci_upper,
+                region=request.region,
+                disease=request.disease,
+                prediction_date=str(pred_date),
+                model_version=version,
+                quantiles={f"{q:g}": value for q, value in zip(options.quantiles, levels)},
+                uncertainty_samples=options.samples
+            )
+        
+        # Trivial histories are answered by the cascade's baseline tier on the
+        # spot; other inputs may be repeats answered from the result cache
+        # (which only holds entries of the version serving right now)
+        cache_key = None
+        pred = None
+        version = served_version()
+        tier = "model"
+        scored = False
+        if baseline_rows(cases_log)[0]:
+            pred = tuple(cascade.predict(cases_log)[0].tolist())
+            tier = "baseline"
+            stages.mark("baseline")
+        else:
+            if cache is not None:
+                cache_key = cache.make_keys(
+                    [region_idx], [disease_idx], cases_log, [pred_date]
+                )[0]
+                cache_version = cache.model_version
+                value = cache.get(cache_key)
+                if value is not None:
+                    pred, baseline = value
+                    tier = "baseline" if baseline else "model"
+            stages.mark("cache")
+        
+        # Make prediction; identical inputs already in flight share one computation
+        if pred is None:
+            async def infer():
+                nonlocal scored
+                scored = True  # run_model records the tier of the rows it scores
+                if batcher is not None:
+                    result, result_version = await batcher.submit(cases_log[0], region_idx, disease_idx, temporal[0])
+                else:
+                    preds, result_version = await run_model_async(cases_log, [region_idx], [disease_idx], temporal)
+                    result = preds[0]
+                result = tuple(result.tolist())
+                if cache_key is not None and np.isfinite(result).all():
+                    cache.put(cache_key, (result, False), cache_version)
+                return result, result_version
+            
+            if coalescer is not None:
+                flight_key = (region_idx, disease_idx, cases_log.tobytes(), int(pred_date.astype(np.int64)))
+                pred, version = await coalescer.run(flight_key, infer)
+            else:
+                pred, version = await infer()
+            stages.mark("inference")
+        if cascade is not None and not scored:
+            # Answered on the spot, from the cache or by joining another call's forward
+            cascade.record(int(tier == "baseline"), int(tier == "model"))
+        
+        # Point prediction with its interval (ensemble member spread or ±30%)
+        pred_cases, ci_lower, ci_upper = pred
+        
+        response.headers["X-Model-Version"] = version
+        result = PredictionResponse(
+            predicted_cases=pred_cases,
+            confidence_interval_lower=ci_lower,
+            confidence_interval_upper=ci_upper,
             region=request.region,
             disease=request.disease,
-            prediction_date=pred_date.strftime("%Y-%m-%d"),
-            model_version="ImprovedDiseaseLSTM V2.0 (4.2M params, Best: Model 5)"
+            prediction_date=str(pred_date),
+            model_version=version,
+            tier=tier
         )
+        stages.mark("response")
+        return result
         
     except HTTPException:
         raise
@@ -272,6 +1406,680 @@ async def predict(request: PredictionRequest):
         raise HTTPException(status_code=500, detail=f"Prediction error: {str(e)}")
 
 
+def batch_request_body() -> dict:
+    """OpenAPI request body of /predict_batch (parsed by hand to negotiate the format)."""
+    schema = BatchPredictionRequest.model_json_schema(ref_template='#/components/schemas/{model}')
+    schema.pop('$defs', None)
+    return {"requestBody": {"required": True, "content": {
+        "application/json": {"schema": schema},
+        MSGPACK_MEDIA_TYPE: {"schema": {"type": "string", "format": "binary"}}
+    }}}
+
+
+def parse_batch_json(body: bytes):
+    """Items of a JSON batch, with FastAPI's usual 422 on invalid bodies."""
+    try:
+        return BatchPredictionRequest.model_validate_json(body).items
+    except ValidationError as e:
+        raise RequestValidationError(
+            [{**error, "loc": ("body", *error["loc"])} for error in e.errors(include_url=False)]
+        )
+
+
+def vocab_names(vocab, idx) -> List[str]:
+    """Names of indices, the index itself where it is out of range."""
+    return [vocab.classes[i] if 0 <= i < len(vocab) else str(i) for i in idx.tolist()]
+
+
+@app.post(
+    "/predict_batch",
+    response_model=BatchPredictionResponse,
+    openapi_extra=batch_request_body(),
+    responses={200: {"content": {MSGPACK_MEDIA_TYPE: {}}}}
+)
+async def predict_batch(request: Request, response: Response):
+    """
+    Predict next-step cases for many (region, disease, history, date) items.
+    
+    All valid items are encoded together and scored with chunked forward
+    passes. Invalid items are reported inline with an `error` message
+    instead of failing the whole batch.
+    
+    The body is a `BatchPredictionRequest` in JSON or, with Content-Type:
+    application/msgpack, the columnar format described in wire.py. Send
+    Accept: application/msgpack to get columnar results back.
+    `model_version` and X-Model-Version name the version that answered.
+    
+    Args:
+        request: Batch of prediction items
+        response: Outgoing response (for the X-Model-Version header)
+    
+    Returns:
+        Per-item predictions or errors, in request order
+    """
+    if backend is None:
+        raise HTTPException(status_code=500, detail="Model not loaded")
+    
+    stages = metrics.stage_timer("/predict_batch")
+    body = await request.body()
+    
+    items = None
+    if is_msgpack(request.headers.get('content-type')):
+        if not msgpack_available():
+            raise HTTPException(status_code=415, detail="MessagePack bodies need the msgpack package on the server")
+        try:
+            batch = decode_batch_request(body, region_vocab, disease_vocab, MAX_BATCH_ITEMS)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        n, errors = batch["n"], batch["errors"]
+        if batch["cases"] is None:
+            # No histories sent: every item uses its stored one
+            pending = np.setdiff1d(np.arange(n), list(errors), assume_unique=True)
+            observed = stored_observed(batch["region_idx"][pending], batch["disease_idx"][pending])
+            regions = batch["regions"] or vocab_names(region_vocab, batch["region_idx"])
+            diseases = batch["diseases"] or vocab_names(disease_vocab, batch["disease_idx"])
+            for i in pending[~observed].tolist():
+                errors[i] = no_history_error(regions[i], diseases[i])
+            errors = dict(sorted(errors.items()))
+        valid = np.setdiff1d(np.arange(n), list(errors), assume_unique=True)
+        if batch["cases"] is None:
+            cases_log = histories.lookup(batch["region_idx"][valid], batch["disease_idx"][valid])[0]
+        else:
+            cases_log = encode_history(batch["cases"][valid])
+        inputs = (cases_log, batch["region_idx"][valid], batch["disease_idx"][valid], batch["dates"][valid])
+    else:
+        items = parse_batch_json(body)
+        n = len(items)
+        error_list, valid, inputs = encode_batch_items(items)
+        errors = {i: error for i, error in enumerate(error_list) if error is not None}
+        valid = np.array(valid, dtype=np.int64)
+    
+    record_items("/predict_batch", n, len(valid))
+    stages.mark("encode")
+    preds = np.empty((0, 3), dtype=np.float32)
+    pred_dates = np.empty(0, dtype='datetime64[D]')
+    version = served_version()
+    baseline = np.zeros(0, dtype=bool)
+    
+    if len(valid):
+        cases_log, region_idx, disease_idx, pred_dates = inputs
+        try:
+            preds, baseline, version = await predict_cached(cases_log, region_idx, disease_idx, pred_dates)
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=f"Prediction error: {str(e)}")
+        stages.mark("inference")
+    
+    if is_msgpack(request.headers.get('accept')) and msgpack_available():
+        content = encode_batch_response(n, valid, preds, pred_dates, errors, version, baseline)
+        stages.mark("response")
+        return Response(content, media_type=MSGPACK_MEDIA_TYPE, headers={"X-Model-Version": version})
+    
+    if items is not None:
+        regions = [item.region for item in items]
+        diseases = [item.disease for item in items]
+    else:
+        regions = batch["regions"] or vocab_names(region_vocab, batch["region_idx"])
+        diseases = batch["diseases"] or vocab_names(disease_vocab, batch["disease_idx"])
+    
+    results = [
+        BatchPredictionResult(index=i, region=region, disease=disease, error=errors.get(i))
+        for i, (region, disease) in enumerate(zip(regions, diseases))
+    ]
+    for j, i in enumerate(valid.tolist()):
+        result = results[i]
+        result.predicted_cases, result.confidence_interval_lower, result.confidence_interval_upper = preds[j].tolist()
+        result.prediction_date = str(pred_dates[j])
+        result.tier = "baseline" if baseline[j] else "model"
+    
+    response.headers["X-Model-Version"] = version
+    result = BatchPredictionResponse(
+        total=n,
+        succeeded=len(valid),
+        failed=n - len(valid),
+        results=results,
+        model_version=version
+    )
+    stages.mark("response")
+    return result
+
+
+@app.post("/forecast", response_model=ForecastResponse)
+async def forecast(request: ForecastRequest, response: Response):
+    """
+    Forecast several weekly steps ahead for many series.
+    
+    The rollout runs on the server: each step scores all series together,
+    feeds the predictions back into the 14-value windows and recomputes the
+    temporal features for the next week. Invalid items are reported inline.
+    All steps run on the same model version, named by `model_version`.
+    
+    Args:
+        request: Series to forecast and the horizon in weeks
+        response: Outgoing response (for the X-Model-Version header)
+    
+    Returns:
+        Per-series forecasts or errors, in request order
+    """
+    if backend is None:
+        raise HTTPException(status_code=500, detail="Model not loaded")
+    
+    items = request.items
+    n = len(items)
+    stages = metrics.stage_timer("/forecast")
+    errors, valid, inputs = encode_batch_items(items)
+    record_items("/forecast", n, len(valid))
+    stages.mark("encode")
+    forecasts = {}
+    version = served_version()
+    
+    if valid:
+        cases_log, region_idx, disease_idx, start_dates = inputs
+        try:
+            # The whole rollout is one job on the inference executor
+            preds, pred_dates, version = await executor.run(
+                run_forecast, cases_log, region_idx, disease_idx, start_dates, request.horizon
+            )
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=f"Forecast error: {str(e)}")
+        stages.mark("inference")
+        
+        for j, i in enumerate(valid):
+            forecasts[i] = ForecastResult(
+                index=i,
+                region=items[i].region,
+                disease=items[i].disease,
+                dates=[str(d) for d in pred_dates[j]],
+                predicted_cases=preds[j, :, 0].tolist(),
+                confidence_interval_lower=preds[j, :, 1].tolist(),
+                confidence_interval_upper=preds[j, :, 2].tolist()
+            )
+    
+    results = [
+        forecasts.get(i) or ForecastResult(index=i, region=item.region, disease=item.disease, error=errors[i])
+        for i, item in enumerate(items)
+    ]
+    
+    response.headers["X-Model-Version"] = version
+    result = ForecastResponse(
+        total=n,
+        succeeded=len(valid),
+        failed=n - len(valid),
+        horizon=request.horizon,
+        results=results,
+        model_version=version
+    )
+    stages.mark("response")
+    return result
+
+
+
+def select_indices(vocab, names, kind) -> np.ndarray:
+    """Sorted indices of `names` in `vocab` (all when None); unknown names are a 400."""
+    if names is None:
+        return np.arange(len(vocab))
+    idx = vocab.encode(names)
+    if (idx < 0).any():
+        unknown = [name for name, i in zip(names, idx) if i < 0]
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unknown {kind}: {', '.join(unknown[:10])}. Use /{kind}s to see available options."
+        )
+    return np.unique(idx)
+
+
+def stream_pairs(request: StreamPredictionRequest):
+    """
+    Pairs selected by a stream request, in chunks of `chunk_size`.
+    
+    Returns:
+        total: number of pairs
+        chunks: iterator of (region_idx, disease_idx) arrays, region-major;
+            pairs are generated per chunk, never materialized all at once
+    """
+    regions = select_indices(region_vocab, request.regions, "region")
+    if request.states is not None:
+        states = set(request.states)
+        in_states = np.array([region_state(region_vocab.classes[i]) in states for i in regions], dtype=bool)
+        regions = regions[in_states]
+    diseases = select_indices(disease_vocab, request.diseases, "disease")
+    chunk_size = request.chunk_size
+    
+    if request.observed_only:
+        region_idx, disease_idx = histories.observed_pairs()  # region-major already
+        keep = np.isin(region_idx, regions) & np.isin(disease_idx, diseases)
+        region_idx, disease_idx = region_idx[keep], disease_idx[keep]
+        total = len(region_idx)
+        chunks = (
+            (region_idx[start:start + chunk_size], disease_idx[start:start + chunk_size])
+            for start in range(0, total, chunk_size)
+        )
+        return total, chunks
+    
+    total = len(regions) * len(diseases)
+    chunks = (
+        (regions[flat // len(diseases)], diseases[flat % len(diseases)])
+        for flat in (np.arange(start, min(start + chunk_size, total)) for start in range(0, total, chunk_size))
+    )
+    return total, chunks
+
+
+async def stream_predictions(chunks, pred_date, model):
+    """Score each chunk on `model` with one batched forward and yield its results as NDJSON lines."""
+    region_names = [json.dumps(name) for name in region_vocab.classes]
+    disease_names = [json.dumps(name) for name in disease_vocab.classes]
+    date_str = str(pred_date)
+    version = json.dumps(served_version(model))
+    
+    for region_idx, disease_idx in chunks:
+        stages = metrics.stage_timer("/predict_stream")
+        cases_log, observed = histories.lookup(region_idx, disease_idx)
+        temporal = temporal_features(np.full(len(region_idx), pred_date))
+        stages.mark("encode")
+        
+        try:
+            preds, _ = await run_model_async(cases_log, region_idx, disease_idx, temporal, model)
+        except Exception as e:
+            # The 200 status is already sent: report the failure in-band and stop
+            yield json.dumps({"error": f"Prediction error: {str(e)}"}) + "\n"
+            return
+        stages.mark("inference")
+        
+        lines = [
+            f'{{"region":{region_names[r]},"disease":{disease_names[d]},"prediction_date":"{date_str}",'
+            f'"observed":{"true" if seen else "false"},"predicted_cases":{pred},'
+            f'"confidence_interval_lower":{lower},"confidence_interval_upper":{upper},"model_version":{version}}}\n'
+            for r, d, seen, (pred, lower, upper) in zip(
+                region_idx.tolist(), disease_idx.tolist(), observed.tolist(), preds.tolist()
+            )
+        ]
+        stages.mark("response")
+        metrics.items.inc("/predict_stream", "success", amount=len(lines))
+        yield "".join(lines)
+
+
+@app.post("/predict_stream")
+async def predict_stream(request: StreamPredictionRequest):
+    """
+    Score every region × disease pair (or a filtered subset) as NDJSON.
+    
+    Histories are the latest weeks in the history store (zeros for pairs
+    never observed). Pairs are generated, scored and serialized
+    one chunk at a time, so server memory stays flat and the client can
+    consume results while later chunks are still being scored. Results
+    bypass the result cache.
+    
+    Args:
+        request: Region/state/disease filters, prediction date and chunk size
+    
+    Returns:
+        One JSON object per line; the total pair count is in `X-Total-Items`
+    """
+    if backend is None:
+        raise HTTPException(status_code=500, detail="Model not loaded")
+    if histories is None:
+        raise HTTPException(status_code=503, detail=f"History data not loaded ({HISTORY_CSV_PATH})")
+    
+    try:
+        pred_date = parse_date(request.prediction_date)
+    except ValueError:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Invalid prediction_date: {request.prediction_date}. Use YYYY-MM-DD."
+        )
+    
+    total, chunks = stream_pairs(request)
+    metrics.request_items.observe(total, "/predict_stream")
+    model = backend  # every chunk on one version, even if a swap lands mid-stream
+    
+    return StreamingResponse(
+        stream_predictions(chunks, pred_date, model),
+        media_type="application/x-ndjson",
+        headers={"X-Total-Items": str(total), "X-Model-Version": served_version(model)}
+    )
+
+
+async def build_forecast_table() -> ForecastTable:
+    """
+    Forecast the week after the newest observation of every observed pair.
+    
+    Each chunk is its own job on the inference executor, so interactive
+    requests keep being served while the table is built.
+    """
+    table_histories = histories.table()  # a copy: ingestion goes on while the table is built
+    n = len(table_histories)
+    windows = table_histories.windows
+    dates = table_histories.last_dates + np.timedelta64(7, 'D')
+    preds = np.empty((n, 3), dtype=np.float32)
+    model = backend  # every chunk on the version the table is stamped with
+    
+    for start in range(0, n, STREAM_CHUNK_SIZE):
+        end = min(start + STREAM_CHUNK_SIZE, n)
+        preds[start:end], _ = await executor.run(
+            run_model, windows[start:end], table_histories.region_idx[start:end],
+            table_histories.disease_idx[start:end], temporal_features(dates[start:end]), model
+        )
+    
+    return ForecastTable(
+        table_histories.region_idx, table_histories.disease_idx, preds,
+        np.expm1(windows[:, -1]), dates, region_vocab.classes, served_version(model)
+    )
+
+
+def restart_forecast_table():
+    """(Re)start the background forecast table job, e.g. after a model swap."""
+    global forecast_task
+    if forecast_task is not None:
+        forecast_task.cancel()
+    if FORECAST_TABLE_ENABLED and histories is not None:
+        forecast_task = asyncio.create_task(refresh_forecast_table())
+
+
+async def refresh_forecast_table():
+    """Rebuild the forecast table now and then every FORECAST_REFRESH_HOURS."""
+    global forecast_table
+    
+    while True:
+        started = time.perf_counter()
+        try:
+            # Readers hold the reference they started with; the swap is one assignment
+            forecast_table = await build_forecast_table()
+            print(f"✅ Forecast table: {len(forecast_table)} pairs in {time.perf_counter() - started:.1f}s")
+        except Exception as e:
+            print(f"❌ Forecast table refresh failed: {e}")
+        
+        if FORECAST_REFRESH_HOURS <= 0:
+            return
+        await asyncio.sleep(FORECAST_REFRESH_HOURS * 3600)
+
+
+@app.get("/hotspots", response_model=HotspotResponse)
+async def hotspots(
+    response: Response,
+    rank_by: str = Query("cases", description="Rank by predicted cases or growth ratio (cases|growth)"),
+    k: int = Query(10, ge=1, le=MAX_HOTSPOTS, description="Number of results"),
+    state: Optional[str] = Query(None, description="Only regions of this state"),
+    disease: Optional[str] = Query(None, description="Only this disease")
+):
+    """
+    Top-K latest forecasts from the precomputed forecast table.
+    
+    `growth` ranks by (predicted + 1) / (last observed week + 1), i.e.
+    where cases are rising fastest.
+    
+    Returns:
+        Up to k forecasts, highest first, and the number matching the filters
+    """
+    table = forecast_table
+    if table is None:
+        raise HTTPException(status_code=503, detail="Forecast table not computed yet")
+    if rank_by not in RANKINGS:
+        raise HTTPException(status_code=400, detail=f"rank_by must be one of {', '.join(RANKINGS)}")
+    if state is not None and not table.has_state(state):
+        raise HTTPException(status_code=400, detail=f"Unknown state: {state}")
+    
+    disease_idx = None
+    if disease is not None:
+        disease_idx = disease_vocab.index(disease)
+        if disease_idx is None:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Unknown disease: {disease}. Use /diseases to see available options."
+            )
+    
+    rows, total = table.top(rank_by, k, state, disease_idx)
+    # The table's version, not the serving one: after a swap it is served until rebuilt
+    response.headers["X-Model-Version"] = table.model_version
+    results = []
+    for row in rows.tolist():
+        region = region_vocab.classes[table.region_idx[row]]
+        results.append(HotspotResult(
+            region=region,
+            state=region_state(region),
+            disease=disease_vocab.classes[table.disease_idx[row]],
+            prediction_date=str(table.prediction_dates[row]),
+            predicted_cases=float(table.predicted[row]),
+            confidence_interval_lower=float(table.lower[row]),
+            confidence_interval_upper=float(table.upper[row]),
+            last_observed_cases=float(table.last_cases[row]),
+            growth_ratio=float(table.growth[row])
+        ))
+    
+    return HotspotResponse(
+        rank_by=rank_by,
+        total=total,
+        computed_at=datetime.fromtimestamp(table.computed_at).isoformat(timespec='seconds'),
+        results=results,
+        model_version=table.model_version
+    )
+
+
+@app.post(
+    "/score_file",
+    response_class=FileResponse,
+    openapi_extra={"requestBody": {"required": True, "content": {
+        media_type: {"schema": {"type": "string", "format": "binary"}} for media_type in MEDIA_TYPES.values()
+    }}}
+)
+async def score_uploaded_file(
+    request: Request,
+    input_format: Optional[str] = Query(None, description="csv or parquet (default: from Content-Type)"),
+    output_format: Optional[str] = Query(None, description="csv or parquet (default: the input format)"),
+    chunk_rows: int = Query(BULK_CHUNK_ROWS, ge=1, le=1_000_000, description="Rows read and scored at a time")
+):
+    """
+    Score a weekly case file and return it with next-week forecasts appended.
+    
+    The body is the raw file (CSV or Parquet) in the shape of the processed
+    weekly data. It is spooled to disk, then read, windowed and scored one
+    chunk at a time (see bulk_scoring.py), so memory stays bounded however
+    large the file is. Results bypass the result cache.
+    
+    Returns:
+        The scored file; row counts are in `X-Total-Items` / `X-Scored-Items`
+    """
+    if backend is None:
+        raise HTTPException(status_code=500, detail="Model not loaded")
+    
+    content_type = request.headers.get('content-type', '').lower()
+    input_format = (input_format or ('parquet' if 'parquet' in content_type else 'csv')).lower()
+    output_format = (output_format or input_format).lower()
+    for fmt in (input_format, output_format):
+        if fmt not in FORMATS:
+            raise HTTPException(status_code=400, detail=f"Unknown format: {fmt}. Use one of {', '.join(FORMATS)}.")
+    if 'parquet' in (input_format, output_format) and not parquet_available():
+        raise HTTPException(status_code=415, detail="Parquet files need the pyarrow package on the server")
+    
+    directory = tempfile.mkdtemp(prefix='nirogya-score-')
+    source = os.path.join(directory, f'input.{input_format}')
+    target = os.path.join(directory, f'scored.{output_format}')
+    loop = asyncio.get_running_loop()
+    model = backend  # every chunk on one version, even if a swap lands mid-file
+    
+    def predict(cases_log, region_idx, disease_idx, temporal):
+        # Called from the scoring thread; forwards still run on the inference executor
+        return asyncio.run_coroutine_threadsafe(
+            executor.run(run_model, cases_log, region_idx, disease_idx, temporal, model), loop
+        ).result()[0]
+    
+    try:
+        size = 0
+        with open(source, 'wb') as f:
+            async for part in request.stream():
+                size += len(part)
+                if size > MAX_UPLOAD_MB * 1024 * 1024:
+                    raise HTTPException(status_code=413, detail=f"File larger than {MAX_UPLOAD_MB:g} MB")
+                f.write(part)
+        
+        stats = await asyncio.to_thread(
+            score_file, source, target, predict, region_vocab, disease_vocab,
+            input_format, output_format, chunk_rows
+        )
+    except ValueError as e:
+        shutil.rmtree(directory, ignore_errors=True)
+        raise HTTPException(status_code=400, detail=f"Could not score file: {e}")
+    except BaseException:
+        shutil.rmtree(directory, ignore_errors=True)
+        raise
+    
+    record_items("/score_file", stats["rows"], stats["scored"])
+    return FileResponse(
+        target,
+        media_type=MEDIA_TYPES[output_format],
+        filename=f"scored.{output_format}",
+        headers={"X-Total-Items": str(stats["rows"]), "X-Scored-Items": str(stats["scored"]),
+                 "X-Model-Version": served_version(model)},
+        background=BackgroundTask(shutil.rmtree, directory, ignore_errors=True)
+    )
+
+
+def ingest_histories(region_idx, disease_idx, dates, cases) -> np.ndarray:
+    """Append weekly values to the store (and its log); returns which records were accepted."""
+    if history_journal is not None:
+        return history_journal.append(region_idx, disease_idx, dates, cases)
+    ok = histories.check(region_idx, disease_idx, dates)
+    histories.append(region_idx[ok], disease_idx[ok], dates[ok], encode_history(cases[ok]))
+    return ok
+
+
+@app.post("/histories", response_model=HistoryIngestResponse)
+async def add_histories(request: HistoryIngestRequest, http_request: Request):
+    """
+    Ingest new weekly case counts into the history store (admin token required).
+    
+    Each accepted record becomes the newest value of its pair's window and is
+    used by later /predict, /predict_batch and /forecast calls that omit the
+    history. Invalid records are reported inline. Logging (file lock, fsync,
+    compaction) runs on a worker thread, one ingestion or log poll at a time;
+    the store applies a batch under its lock, so requests never see a
+    half-applied batch.
+    
+    Args:
+        request: Weekly counts to append, in order
+    
+    Returns:
+        Accepted and rejected counts with the reason of each rejection
+    """
+    require_admin(http_request)
+    if histories is None:
+        raise HTTPException(status_code=500, detail="Model not loaded")
+    
+    records = request.records
+    n = len(records)
+    region_idx = region_vocab.encode([record.region for record in records])
+    disease_idx = disease_vocab.encode([record.disease for record in records])
+    dates = np.full(n, np.datetime64('NaT'), dtype='datetime64[D]')
+    errors = {}
+    for i, record in enumerate(records):
+        if region_idx[i] < 0:
+            errors[i] = f"Unknown region: {record.region}. Use /regions to see available options."
+        elif disease_idx[i] < 0:
+            errors[i] = f"Unknown disease: {record.disease}. Use /diseases to see available options."
+        else:
+            try:
+                dates[i] = parse_date(record.date)
+            except ValueError:
+                errors[i] = f"Invalid date: {record.date}"
+    
+    candidates = np.setdiff1d(np.arange(n), list(errors), assume_unique=True)
+    cases = np.array([records[i].cases for i in candidates.tolist()], dtype=np.float64)
+    try:
+        async with history_lock:
+            accepted = await asyncio.to_thread(
+                ingest_histories, region_idx[candidates], disease_idx[candidates], dates[candidates], cases
+            )
+    except OSError as e:
+        raise HTTPException(status_code=500, detail=f"Could not persist histories: {str(e)}")
+    for i in candidates[~accepted].tolist():
+        errors[i] = f"Older than the newest stored week of {records[i].region} / {records[i].disease}"
+    
+    return HistoryIngestResponse(
+        total=n,
+        accepted=n - len(errors),
+        rejected=len(errors),
+        errors=[HistoryIngestError(index=i, error=errors[i]) for i in sorted(errors)]
+    )
+
+
+@app.get("/histories", response_model=HistoryResponse)
+async def get_history(
+    region: str = Query(..., description="Region name (State_District format)"),
+    disease: str = Query(..., description="Disease name")
+):
+    """Stored weekly history of one pair (zeros when it was never observed)."""
+    if histories is None:
+        raise HTTPException(status_code=500, detail="Model not loaded")
+    region_idx = region_vocab.index(region)
+    if region_idx is None:
+        raise HTTPException(status_code=400, detail=f"Unknown region: {region}. Use /regions to see available options.")
+    disease_idx = disease_vocab.index(disease)
+    if disease_idx is None:
+        raise HTTPException(status_code=400, detail=f"Unknown disease: {disease}. Use /diseases to see available options.")
+    
+    pair = histories.pair_ids(region_idx, disease_idx)
+    with histories.lock:  # the date and the window of the same ingested batch
+        last_date = histories.last_dates[pair]
+        window = histories.window(region_idx, disease_idx)
+    return HistoryResponse(
+        region=region,
+        disease=disease,
+        observed=not np.isnat(last_date),
+        last_date=None if np.isnat(last_date) else str(last_date),
+        last_14_days_cases=np.round(np.expm1(window.astype(np.float64)), 3).tolist()
+    )
+
+
+def require_admin(request: Request):
+    """Reject the request unless it carries the configured admin token."""
+    if not ADMIN_TOKEN:
+        raise HTTPException(status_code=403, detail="Admin endpoints are disabled (set NIROGYA_ADMIN_TOKEN)")
+    if not hmac.compare_digest(request.headers.get('x-admin-token', ''), ADMIN_TOKEN):
+        raise HTTPException(status_code=401, detail="Invalid admin token")
+
+
+def model_versions_status() -> dict:
+    return {
+        "serving": served_version(),
+        "previous": served_version(previous_backend) if previous_backend is not None else None,
+        "active": registry.active(),
+        "versions": registry.versions()
+    }
+
+
+@app.get("/admin/models")
+async def list_model_versions(request: Request):
+    """Registered versions, the serving one and the rollback target."""
+    require_admin(request)
+    return model_versions_status()
+
+
+@app.post("/admin/models/{version}/activate")
+async def activate_model_version(version: str, request: Request):
+    """Load a registry version in the background, warm it up and swap it in."""
+    require_admin(request)
+    if backend is None:
+        raise HTTPException(status_code=500, detail="Model not loaded")
+    if not registry.exists(version):
+        raise HTTPException(status_code=404, detail=f"Unknown model version: {version}")
+    
+    try:
+        await activate_version(version)
+    except ValueError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Could not activate {version}: {str(e)}")
+    return model_versions_status()
+
+
+@app.post("/admin/models/rollback")
+async def rollback_model_version(request: Request):
+    """Swap back to the previously served version."""
+    require_admin(request)
+    try:
+        await rollback_version()
+    except LookupError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    return model_versions_status()
+
 if __name__ == "__main__":
     print("🚀 Starting Disease Outbreak Prediction API V2...")
     print(f"📊 Model: ImprovedDiseaseLSTM (4.2M parameters)")
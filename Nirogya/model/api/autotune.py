@@ -0,0 +1,421 @@
+"""
+Serving profile autotuner
+
+Benchmarks ImprovedDiseaseLSTM on this machine across the available backends,
+inference worker / intra-op thread splits, inter-op thread counts and batch
+sizes, and writes the fastest configuration as a serving profile. app_v2.py
+applies the profile at import: its NIROGYA_* settings become the defaults,
+variables set in the environment still take precedence.
+
+Usage:
+    cd api
+    python autotune.py                         # writes ../models/serving_profile.json
+    python autotune.py --quick                 # smaller grid
+    python autotune.py --server-workers 4      # cores shared by 4 uvicorn workers (serve.py)
+    python autotune.py --latency-budget-ms 50 --allow-int8
+    python serve.py --workers 4 --autotune     # tune if needed, then serve
+
+Every inter-op thread count is measured in its own subprocess: torch only
+lets it be set once per process, before any parallel work.
+"""
+import argparse
+import itertools
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Optional
+
+import numpy as np
+import torch
+sys.path.append('../notebooks')
+
+from model_loading import (
+    load_checkpoint_model, load_mmap_model, load_torchscript, quantize_dynamic_int8,
+    describe_model, example_inputs
+)
+from backends import TorchBackend, OnnxBackend
+
+DEFAULT_PROFILE = '../models/serving_profile.json'
+PROFILE_FORMAT = 1
+
+DEFAULT_BATCH_SIZES = (1, 8, 32, 128, 512, 1024)
+QUICK_BATCH_SIZES = (1, 32, 256)
+
+# A batch size this close to the best throughput is big enough for micro-batching:
+# larger batches only add latency
+MICROBATCH_THROUGHPUT_FRACTION = 0.9
+
+CONFIG_KEYS = ("backend", "interop_threads", "inference_workers", "inference_threads")
+
+# NIROGYA_* settings selecting each backend in app_v2.load_backend
+BACKEND_SETTINGS = {
+    "eager": {"NIROGYA_BACKEND": "torch", "NIROGYA_QUANTIZE": "", "NIROGYA_WEIGHTS_MMAP": "0",
+              "NIROGYA_TORCHSCRIPT": "0"},
+    "eager-mmap": {"NIROGYA_BACKEND": "torch", "NIROGYA_QUANTIZE": "", "NIROGYA_WEIGHTS_MMAP": "1",
+                   "NIROGYA_TORCHSCRIPT": "0"},
+    "torchscript": {"NIROGYA_BACKEND": "torch", "NIROGYA_QUANTIZE": "", "NIROGYA_WEIGHTS_MMAP": "0",
+                    "NIROGYA_TORCHSCRIPT": "1"},
+    "eager-int8": {"NIROGYA_BACKEND": "torch", "NIROGYA_QUANTIZE": "int8"},
+    "onnxruntime": {"NIROGYA_BACKEND": "onnx"}
+}
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Measure the fastest serving configuration on this machine")
+    parser.add_argument('--output', default=DEFAULT_PROFILE, help="serving profile to write")
+    parser.add_argument('--checkpoint', default='../models/improved_lstm_v2_model5_best.pt')
+    parser.add_argument('--weights', default='../models/improved_lstm_v2_model5_weights')
+    parser.add_argument('--torchscript', default='../models/improved_lstm_v2_model5.torchscript.pt')
+    parser.add_argument('--onnx', default='../models/improved_lstm_v2_model5.onnx')
+    parser.add_argument('--backends', nargs='+', default=None, choices=list(BACKEND_SETTINGS),
+                        help="backends to try (default: all whose artifacts exist)")
+    parser.add_argument('--allow-int8', action='store_true',
+                        help="also try dynamic int8 quantization (changes predictions slightly)")
+    parser.add_argument('--server-workers', type=int, default=1,
+                        help="uvicorn worker processes sharing the cores")
+    parser.add_argument('--inference-workers', type=int, nargs='+', default=None,
+                        help="concurrent forwards per process to try (default: divisors of the core budget)")
+    parser.add_argument('--interop-threads', type=int, nargs='+', default=None,
+                        help="torch inter-op thread counts to try (default: 1 and the core budget)")
+    parser.add_argument('--batch-sizes', type=int, nargs='+', default=None)
+    parser.add_argument('--latency-budget-ms', type=float, default=100.0,
+                        help="largest acceptable median forward time")
+    parser.add_argument('--seconds', type=float, default=None, help="measuring time per trial")
+    parser.add_argument('--quick', action='store_true', help="smaller grid and shorter trials")
+    # Internal: measure one inter-op setting and write the trials to this file
+    parser.add_argument('--measure-into', default=None, help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.batch_sizes is None:
+        args.batch_sizes = list(QUICK_BATCH_SIZES if args.quick else DEFAULT_BATCH_SIZES)
+    if args.seconds is None:
+        args.seconds = 0.3 if args.quick else 1.0
+    return args
+
+
+def core_budget(server_workers: int) -> int:
+    """Cores available to one server process."""
+    return max(1, (os.cpu_count() or 1) // max(1, server_workers))
+
+
+def thread_splits(cores: int, inference_workers=None) -> list:
+    """(inference workers, intra-op threads per worker) pairs using the whole core budget."""
+    if inference_workers is None:
+        inference_workers = [w for w in range(1, min(cores, 8) + 1) if cores % w == 0]
+    return [(w, max(1, cores // w)) for w in sorted(set(inference_workers))]
+
+
+def machine_info(server_workers: int) -> dict:
+    return {
+        "cpu_count": os.cpu_count(),
+        "server_workers": server_workers,
+        "platform": platform.platform(),
+        "processor": platform.processor() or platform.machine(),
+        "torch": torch.__version__
+    }
+
+
+# --- Measuring ---------------------------------------------------------------
+
+def candidate_backends(args) -> dict:
+    """name -> factory(intra_op_threads) for every backend whose artifact is present."""
+    wanted = args.backends or [name for name in BACKEND_SETTINGS if name != "eager-int8" or args.allow_int8]
+    candidates = {}
+
+    def torch_backend(name, load):
+        loaded = {}
+
+        def factory(threads):
+            if not loaded:
+                module, metadata = load()
+                loaded["backend"] = TorchBackend(module, torch.device('cpu'), name,
+                                                 metadata['weights_fingerprint'], metadata)
+            return loaded["backend"]
+        return factory
+
+    def eager():
+        model = load_checkpoint_model(args.checkpoint, device='cpu')
+        return model, describe_model(model)
+
+    def int8():
+        model = load_checkpoint_model(args.checkpoint, device='cpu')
+        return quantize_dynamic_int8(model), describe_model(model)
+
+    if "eager" in wanted and os.path.exists(args.checkpoint):
+        candidates["eager"] = torch_backend("eager", eager)
+    if "eager-mmap" in wanted and os.path.exists(os.path.join(args.weights, 'manifest.json')):
+        candidates["eager-mmap"] = torch_backend("eager-mmap", lambda: load_mmap_model(args.weights))
+    if "torchscript" in wanted and os.path.exists(args.torchscript):
+        candidates["torchscript"] = torch_backend(
+            "torchscript", lambda: load_torchscript(args.torchscript, torch.device('cpu')))
+    if "eager-int8" in wanted and os.path.exists(args.checkpoint):
+        candidates["eager-int8"] = torch_backend("eager-int8", int8)
+    if "onnxruntime" in wanted and os.path.exists(args.onnx):
+        try:
+            import onnxruntime  # noqa: F401  (optional dependency)
+            # ONNX Runtime sessions fix their thread count when created
+            candidates["onnxruntime"] = lambda threads: OnnxBackend(args.onnx, intra_op_threads=threads)
+        except ImportError:
+            print("⚠️  onnxruntime not installed, skipping the ONNX backend")
+    return candidates
+
+
+def measure(backend, pool: ThreadPoolExecutor, workers: int, inputs, seconds: float) -> dict:
+    """
+    Run `workers` concurrent forward loops on `inputs` for about `seconds`.
+
+    Returns:
+        {"rows_per_second", "forward_ms_p50", "forward_ms_p95", "forwards"}
+    """
+    batch_size = len(inputs[0])
+
+    def loop(deadline):
+        latencies = []
+        while len(latencies) < 2 or time.perf_counter() < deadline:
+            start = time.perf_counter()
+            backend.predict_log(*inputs)
+            latencies.append(time.perf_counter() - start)
+        return latencies
+
+    list(pool.map(lambda _: backend.predict_log(*inputs), range(workers)))  # warm-up
+    started = time.perf_counter()
+    runs = [pool.submit(loop, started + seconds) for _ in range(workers)]
+    latencies = np.concatenate([run.result() for run in runs]) * 1000
+    elapsed = time.perf_counter() - started
+
+    return {
+        "rows_per_second": len(latencies) * batch_size / elapsed,
+        "forward_ms_p50": float(np.percentile(latencies, 50)),
+        "forward_ms_p95": float(np.percentile(latencies, 95)),
+        "forwards": len(latencies)
+    }
+
+
+def measure_grid(args, interop_threads: int) -> list:
+    """Trials of every backend x thread split x batch size, in this process."""
+    torch.set_num_interop_threads(interop_threads)
+    candidates = candidate_backends(args)
+    trials = []
+
+    for workers, threads in thread_splits(core_budget(args.server_workers), args.inference_workers):
+        # Process-wide, as InferenceExecutor sets it: the workers share one intra-op pool
+        torch.set_num_threads(workers * threads)
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            for name, factory in candidates.items():
+                try:
+                    backend = factory(threads)
+                except Exception as e:
+                    print(f"⚠️  Could not load {name} ({e}), skipping")
+                    continue
+                num_regions, num_diseases = backend.metadata['num_regions'], backend.metadata['num_diseases']
+                for batch_size in args.batch_sizes:
+                    inputs = [t.numpy() for t in example_inputs(num_regions, num_diseases, batch_size)]
+                    result = measure(backend, pool, workers, inputs, args.seconds)
+                    trials.append({
+                        "backend": name, "interop_threads": interop_threads,
+                        "inference_workers": workers, "inference_threads": threads,
+                        "batch_size": batch_size, **result
+                    })
+                    print(f"   {name:>12s} interop {interop_threads:2d} workers {workers:2d} x {threads:2d} threads "
+                          f"batch {batch_size:5d}: {result['rows_per_second']:9.0f} rows/s, "
+                          f"p50 {result['forward_ms_p50']:8.2f} ms")
+    return trials
+
+
+def run_trials(args) -> list:
+    """Measure every inter-op thread count in a fresh subprocess."""
+    cores = core_budget(args.server_workers)
+    interop_counts = sorted(set(args.interop_threads or (1, cores)))
+    trials = []
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for interop in interop_counts:
+            path = os.path.join(tmp, f"trials_{interop}.json")
+            command = [sys.executable, os.path.abspath(__file__), *sys.argv[1:],
+                       '--interop-threads', str(interop), '--measure-into', path]
+            print(f"🔬 Inter-op threads: {interop}")
+            subprocess.run(command, check=True, cwd=os.path.dirname(os.path.abspath(__file__)))
+            with open(path) as f:
+                trials.extend(json.load(f))
+    return trials
+
+
+# --- Choosing ----------------------------------------------------------------
+
+def choose(trials: list, latency_budget_ms: float) -> dict:
+    """
+    Pick the serving configuration.
+
+    The backend / thread split / inter-op setting is the one with the highest
+    throughput among trials within the latency budget (the fastest batch-1 trial
+    if none is). For that configuration, the forward batch limit is the batch
+    size with the highest throughput at any latency (it only bounds bulk and
+    batch scoring), and the micro-batch size the smallest batch within the
+    budget reaching MICROBATCH_THROUGHPUT_FRACTION of the best one there.
+
+    Returns:
+        {CONFIG_KEYS..., "max_forward_batch", "microbatch_max_size",
+         "online": best trial within the budget, "bulk": best trial overall}
+    """
+    if not trials:
+        raise ValueError("no trials to choose from")
+    eligible = [t for t in trials if t["forward_ms_p50"] <= latency_budget_ms]
+    if eligible:
+        online = max(eligible, key=lambda t: (t["rows_per_second"], -t["batch_size"]))
+    else:
+        online = min(trials, key=lambda t: (t["batch_size"], t["forward_ms_p50"]))
+
+    same_config = sorted((t for t in trials if all(t[k] == online[k] for k in CONFIG_KEYS)),
+                         key=lambda t: t["batch_size"])
+    bulk = max(same_config, key=lambda t: (t["rows_per_second"], -t["batch_size"]))
+    within_budget = [t for t in same_config if t["forward_ms_p50"] <= latency_budget_ms] or [online]
+    microbatch = next(t["batch_size"] for t in within_budget
+                      if t["rows_per_second"] >= MICROBATCH_THROUGHPUT_FRACTION * online["rows_per_second"])
+
+    return {
+        **{k: online[k] for k in CONFIG_KEYS},
+        "max_forward_batch": bulk["batch_size"],
+        "microbatch_max_size": microbatch,
+        "online": online,
+        "bulk": bulk
+    }
+
+
+def profile_settings(best: dict) -> dict:
+    """NIROGYA_* environment settings of a chosen configuration (strings, as in os.environ)."""
+    return {
+        **BACKEND_SETTINGS[best["backend"]],
+        "NIROGYA_INFERENCE_WORKERS": str(best["inference_workers"]),
+        "NIROGYA_INFERENCE_THREADS": str(best["inference_threads"]),
+        "NIROGYA_INTEROP_THREADS": str(best["interop_threads"]),
+        "NIROGYA_MAX_FORWARD_BATCH": str(best["max_forward_batch"]),
+        "NIROGYA_MICROBATCH_MAX_SIZE": str(best["microbatch_max_size"])
+    }
+
+
+# --- Profiles ----------------------------------------------------------------
+
+def load_serving_profile(path: str, server_workers: Optional[int] = None) -> Optional[dict]:
+    """
+    Serving profile at `path`, or None when there is none or it was measured
+    for a different machine shape (core count, or `server_workers` if given).
+    """
+    if not path or not os.path.exists(path):
+        return None
+    try:
+        with open(path) as f:
+            profile = json.load(f)
+        machine = profile["machine"]
+        profile["settings"]
+    except (OSError, ValueError, KeyError) as e:
+        print(f"⚠️  Ignoring unreadable serving profile {path} ({e})")
+        return None
+
+    if profile.get("format") != PROFILE_FORMAT:
+        print(f"⚠️  Ignoring serving profile {path}: format {profile.get('format')}, expected {PROFILE_FORMAT}")
+        return None
+    if machine.get("cpu_count") != os.cpu_count():
+        print(f"⚠️  Ignoring serving profile {path}: measured on {machine.get('cpu_count')} cores, "
+              f"this machine has {os.cpu_count()} (re-run autotune.py)")
+        return None
+    if server_workers is not None and machine.get("server_workers") != server_workers:
+        print(f"⚠️  Serving profile {path} was measured for {machine.get('server_workers')} server worker(s), "
+              f"not {server_workers}")
+        return None
+    return profile
+
+
+def apply_serving_profile(profile: dict, environ=os.environ) -> dict:
+    """Set the profile's settings where the environment does not; returns the ones applied."""
+    applied = {}
+    for name, value in profile["settings"].items():
+        if name not in environ:
+            environ[name] = value
+            applied[name] = value
+    return applied
+
+
+def ensure_profile(path: str = DEFAULT_PROFILE, server_workers: Optional[int] = None,
+                   quick: bool = True) -> Optional[dict]:
+    """
+    Profile at `path`, running the tuner first if it is missing or was measured
+    for another machine shape (or another `server_workers`, when given).
+    """
+    profile = load_serving_profile(path, server_workers)
+    if profile is not None:
+        return profile
+    print(f"🔬 No serving profile for this machine, tuning ({path})")
+    here = os.path.dirname(os.path.abspath(__file__))
+    command = [sys.executable, os.path.join(here, 'autotune.py'),
+               '--output', os.path.abspath(path), '--server-workers', str(server_workers or 1)]
+    if quick:
+        command.append('--quick')
+    try:
+        subprocess.run(command, check=True, cwd=here)
+    except subprocess.CalledProcessError as e:
+        print(f"⚠️  Autotuning failed ({e}), serving with the default settings")
+        return None
+    return load_serving_profile(path, server_workers)
+
+
+def main():
+    args = parse_args()
+
+    if args.measure_into:
+        trials = measure_grid(args, args.interop_threads[0])
+        with open(args.measure_into, 'w') as f:
+            json.dump(trials, f)
+        return
+
+    cores = core_budget(args.server_workers)
+    print(f"🔬 Autotuning on {os.cpu_count()} cores ({cores} per server worker), torch {torch.__version__}")
+    print(f"   batch sizes {args.batch_sizes}, latency budget {args.latency_budget_ms:g} ms")
+    started = time.perf_counter()
+    trials = run_trials(args)
+    if not trials:
+        print("❌ No backend could be measured (missing model artifacts?)")
+        sys.exit(1)
+
+    best = choose(trials, args.latency_budget_ms)
+    profile = {
+        "format": PROFILE_FORMAT,
+        "created_at": datetime.now().isoformat(timespec='seconds'),
+        "machine": machine_info(args.server_workers),
+        "latency_budget_ms": args.latency_budget_ms,
+        "tuning_seconds": round(time.perf_counter() - started, 1),
+        "best": best,
+        "settings": profile_settings(best),
+        "trials": trials
+    }
+
+    online, bulk = best["online"], best["bulk"]
+    print(f"\n🏆 Best: {best['backend']}, {best['inference_workers']} worker(s) x {best['inference_threads']} "
+          f"thread(s), inter-op {best['interop_threads']}")
+    print(f"   micro-batch {best['microbatch_max_size']}: batch {online['batch_size']} runs at "
+          f"{online['rows_per_second']:.0f} rows/s, p50 {online['forward_ms_p50']:.2f} ms")
+    print(f"   forward batch {best['max_forward_batch']}: {bulk['rows_per_second']:.0f} rows/s, "
+          f"p50 {bulk['forward_ms_p50']:.2f} ms")
+    print("   Runners-up within the latency budget:")
+    top = sorted((t for t in trials if t["forward_ms_p50"] <= args.latency_budget_ms),
+                 key=lambda t: -t["rows_per_second"])
+    for t in itertools.islice((t for t in top if t is not online), 5):
+        print(f"   {t['backend']:>12s} {t['inference_workers']} x {t['inference_threads']} "
+              f"interop {t['interop_threads']} batch {t['batch_size']:5d}: {t['rows_per_second']:9.0f} rows/s, "
+              f"p50 {t['forward_ms_p50']:8.2f} ms")
+
+    os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+    with open(args.output, 'w') as f:
+        json.dump(profile, f, indent=2)
+    print(f"\n✅ Serving profile saved to {args.output}")
+    for name, value in profile["settings"].items():
+        print(f"   {name}={value}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+"""
+Pluggable inference backends
+Every backend scores numpy inputs and returns log-scale predictions, so the
+API, batching and forecasting code do not depend on the runtime in use
+"""
+import json
+from typing import Optional
+
+import numpy as np
+import torch
+
+ENSEMBLE_INTERVAL_PERCENTILES = (5, 95)  # as in EnsembleModel.predict
+
+
+class TorchBackend:
+    """PyTorch module (eager, TorchScript or dynamically quantized)."""
+
+    def __init__(self, module, device, name: str = "eager", fingerprint: Optional[str] = None,
+                 metadata: Optional[dict] = None):
+        """
+        Args:
+            module: eval-mode model taking (x, region_idx, disease_idx, temporal)
+            device: torch device the module lives on
+            name: label reported on /health
+            fingerprint: weights fingerprint used to invalidate cached predictions
+            metadata: artifact metadata (num_regions / num_diseases are checked at startup)
+        """
+        self.module = module
+        self.device = device
+        self.name = name
+        self.fingerprint = fingerprint
+        self.metadata = metadata or {}
+
+    def predict_log(self, cases_log, region_idx, disease_idx, temporal) -> np.ndarray:
+        """
+        Args:
+            cases_log: (n, 14) float32 log1p case history
+            region_idx: (n,) int64 region indices
+            disease_idx: (n,) int64 disease indices
+            temporal: (n, 5) float32 temporal features
+
+        Returns:
+            (n,) float32 log1p predictions
+        """
+        with torch.no_grad():
+            out = self.module(
+                torch.from_numpy(cases_log).to(self.device),
+                torch.from_numpy(region_idx).to(self.device),
+                torch.from_numpy(disease_idx).to(self.device),
+                torch.from_numpy(temporal).to(self.device)
+            )
+        return out[:, 0].cpu().numpy()
+
+
+class OnnxBackend:
+    """ONNX Runtime CPU session over a model written by `export_onnx`."""
+
+    def __init__(self, path: str, intra_op_threads: int = 0):
+        """
+        Args:
+            path: .onnx file
+            intra_op_threads: ONNX Runtime intra-op threads (0 = runtime default)
+        """
+        import onnxruntime as ort  # optional dependency, only needed for this backend
+
+        options = ort.SessionOptions()
+        options.intra_op_num_threads = intra_op_threads
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+
+        self.session = ort.InferenceSession(path, options, providers=['CPUExecutionProvider'])
+        self.metadata = json.loads(self.session.get_modelmeta().custom_metadata_map.get('nirogya', '{}'))
+        self.name = "onnxruntime"
+        self.fingerprint = self.metadata.get('weights_fingerprint')
+
+    def predict_log(self, cases_log, region_idx, disease_idx, temporal) -> np.ndarray:
+        """Same contract as `TorchBackend.predict_log`."""
+        out = self.session.run(['pred_log'], {
+            'x': cases_log,
+            'region_idx': region_idx,
+            'disease_idx': disease_idx,
+            'temporal': temporal
+        })[0]
+        return out[:, 0]
+
+
+class EnsembleBackend(TorchBackend):
+    """
+    Ensemble module returning (members, n) outputs (see ensemble.py).
+
+    `predict_log` is the member mean (the ensemble point prediction);
+    `predict_members_log` exposes every member for prediction intervals.
+    """
+
+    def __init__(self, module, device, name: str = "ensemble", fingerprint: Optional[str] = None,
+                 metadata: Optional[dict] = None):
+        super().__init__(module, device, name, fingerprint, metadata)
+        self.num_members = module.num_members
+
+    def predict_members_log(self, cases_log, region_idx, disease_idx, temporal) -> np.ndarray:
+        """(members, n) float32 log1p predictions of every member."""
+        with torch.no_grad():
+            out = self.module(
+                torch.from_numpy(cases_log).to(self.device),
+                torch.from_numpy(region_idx).to(self.device),
+                torch.from_numpy(disease_idx).to(self.device),
+                torch.from_numpy(temporal).to(self.device)
+            )
+        return out.cpu().numpy()
+
+    def predict_log(self, cases_log, region_idx, disease_idx, temporal) -> np.ndarray:
+        """Same contract as `TorchBackend.predict_log` (mean over members)."""
+        return self.predict_members_log(cases_log, region_idx, disease_idx, temporal).mean(axis=0)
+
+
+def predict_with_interval(model, cases_log, region_idx, disease_idx, temporal) -> np.ndarray:
+    """
+    One forward pass → (n, 3) predicted cases, lower and upper bound.
+
+    An ensemble backend predicts the member mean with a percentile interval
+    over its members (in log space, as EnsembleModel.predict does); a single
+    model gets a simple ±30% band.
+    """
+    if isinstance(model, EnsembleBackend):
+        members_log = model.predict_members_log(cases_log, region_idx, disease_idx, temporal)
+        lower_log, upper_log = np.percentile(members_log, ENSEMBLE_INTERVAL_PERCENTILES, axis=0)
+        pred = np.expm1(members_log.mean(axis=0))
+        lower, upper = np.expm1(lower_log), np.expm1(upper_log)
+    else:
+        pred = np.expm1(model.predict_log(cases_log, region_idx, disease_idx, temporal))
+        lower, upper = pred * 0.7, pred * 1.3
+
+    return np.stack([pred, np.maximum(0, lower), upper], axis=1)
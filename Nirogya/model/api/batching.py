@@ -0,0 +1,150 @@
+"""
+Dynamic micro-batching for concurrent /predict calls
+Collects single requests for up to `max_wait_ms` (or until `max_batch_size`
+requests are queued) and scores them with one forward pass
+"""
+import asyncio
+from collections import Counter
+from typing import Awaitable, Callable, Optional
+
+import numpy as np
+
+
+class MicroBatcher:
+    """
+    In-process request batcher in front of the model.
+
+    Callers `await submit(...)` with one encoded input and get back their own
+    prediction. A background task groups queued inputs and awaits `process_fn`
+    once per group with stacked arrays. At most `max_concurrent_batches` groups
+    are in flight; while they run, new requests keep queueing and form the next
+    (larger) batch.
+    """
+
+    def __init__(
+        self,
+        process_fn: Callable[..., Awaitable[np.ndarray]],
+        max_batch_size: int = 32,
+        max_wait_ms: float = 2.0,
+        max_concurrent_batches: int = 1
+    ):
+        """
+        Args:
+            process_fn: async fn(cases_log, region_idx, disease_idx, temporal) -> n predictions
+                (one row or value per input)
+            max_batch_size: flush as soon as this many requests are queued
+            max_wait_ms: longest time the first request of a batch waits for company
+            max_concurrent_batches: batches allowed in flight at once
+        """
+        self.process_fn = process_fn
+        self.max_batch_size = max_batch_size
+        self.max_wait_ms = max_wait_ms
+        self.max_concurrent_batches = max_concurrent_batches
+
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._inflight = set()
+
+        self.total_requests = 0
+        self.total_batches = 0
+        self.batch_sizes = Counter()
+
+    def start(self):
+        """Start the batching loop on the running event loop."""
+        self._queue = asyncio.Queue()
+        self._slots = asyncio.Semaphore(self.max_concurrent_batches)
+        self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        """Cancel the batching loop."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def submit(self, cases_log, region_idx, disease_idx, temporal):
+        """
+        Queue one encoded input and wait for its prediction.
+
+        Args:
+            cases_log: (14,) log1p case history
+            region_idx: encoded region
+            disease_idx: encoded disease
+            temporal: (5,) temporal features
+
+        Returns:
+            This input's row of the `process_fn` output
+        """
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((cases_log, region_idx, disease_idx, temporal, future))
+        return await future
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        max_wait = self.max_wait_ms / 1000
+
+        while True:
+            await self._slots.acquire()
+            batch = [await self._queue.get()]
+            deadline = loop.time() + max_wait
+
+            while len(batch) < self.max_batch_size:
+                # Take whatever is already queued before waiting on the clock
+                if not self._queue.empty():
+                    batch.append(self._queue.get_nowait())
+                    continue
+
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+
+            task = loop.create_task(self._dispatch(batch))
+            self._inflight.add(task)
+            task.add_done_callback(self._inflight.discard)
+
+    async def _dispatch(self, batch):
+        futures = [item[4] for item in batch]
+
+        self.total_requests += len(batch)
+        self.total_batches += 1
+        self.batch_sizes[len(batch)] += 1
+
+        try:
+            preds = await self.process_fn(
+                np.stack([item[0] for item in batch]),
+                np.array([item[1] for item in batch], dtype=np.int64),
+                np.array([item[2] for item in batch], dtype=np.int64),
+                np.stack([item[3] for item in batch])
+            )
+        except Exception as e:
+            for future in futures:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        finally:
+            self._slots.release()
+
+        for future, pred in zip(futures, preds):
+            if not future.done():
+                future.set_result(pred)
+
+    def stats(self) -> dict:
+        """Batching configuration and observed batch sizes."""
+        return {
+            "enabled": True,
+            "max_batch_size": self.max_batch_size,
+            "max_wait_ms": self.max_wait_ms,
+            "max_concurrent_batches": self.max_concurrent_batches,
+            "total_requests": self.total_requests,
+            "total_batches": self.total_batches,
+            "mean_batch_size": self.total_requests / self.total_batches if self.total_batches else 0.0,
+            "batch_size_histogram": {str(size): count for size, count in sorted(self.batch_sizes.items())}
+        }
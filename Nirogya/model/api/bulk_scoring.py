@@ -0,0 +1,332 @@
+"""
+Bulk scoring of weekly case files (CSV or Parquet)
+
+Reads a file in the shape of disease_outbreaks_weekly_clean.csv (state_ut,
+district, disease_clean, date_final, num_cases) one chunk at a time. Each
+row gets the 14-week window of its (region, disease) pair that ends at that
+row; the windows are scored in batches and the rows are written back with
+the forecast for the following week appended. Only the last 13 weeks of
+every pair are carried from one chunk to the next, so memory depends on the
+chunk size and the vocabularies, not on the size of the file.
+
+Rows of a pair may be spread over the file, but a pair's rows in one chunk
+must not be older than its rows in earlier chunks: sort by date, or group
+by pair and sort by date within each group (as the processed CSV is).
+
+Usage:
+    cd api
+    python bulk_scoring.py extract.csv extract_scored.csv
+    python bulk_scoring.py extract.parquet scored.parquet --chunk-rows 200000
+    python bulk_scoring.py extract.csv scored.csv --checkpoint ../models/improved_lstm_v2_model5_best.pt
+"""
+import argparse
+import os
+import sys
+import time
+from typing import TYPE_CHECKING, Callable, Iterator
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+sys.path.append('../notebooks')
+
+from preprocessing import SEQUENCE_LENGTH, Vocabulary, encode_history, temporal_features
+
+if TYPE_CHECKING:
+    import pandas as pd  # imported where used: app_v2 imports this module and must not load pandas
+
+INPUT_COLUMNS = ('state_ut', 'district', 'disease_clean', 'date_final', 'num_cases')
+OUTPUT_COLUMNS = ('prediction_date', 'predicted_cases', 'confidence_interval_lower',
+                  'confidence_interval_upper', 'history_weeks')
+FORMATS = ('csv', 'parquet')
+MEDIA_TYPES = {'csv': 'text/csv', 'parquet': 'application/vnd.apache.parquet'}
+DEFAULT_CHUNK_ROWS = 50000
+FORECAST_STEP = np.timedelta64(7, 'D')  # one week after the newest value of the window
+
+
+def file_format(name: str) -> str:
+    """'parquet' for .parquet / .pq files, else 'csv'."""
+    return 'parquet' if os.path.splitext(name or '')[1].lower() in ('.parquet', '.pq') else 'csv'
+
+
+def _parquet():
+    import pyarrow  # optional dependency
+    import pyarrow.parquet
+    return pyarrow
+
+
+def parquet_available() -> bool:
+    try:
+        _parquet()
+    except ImportError:
+        return False
+    return True
+
+
+def read_chunks(source, fmt: str, chunk_rows: int = DEFAULT_CHUNK_ROWS) -> Iterator["pd.DataFrame"]:
+    """
+    DataFrames of at most `chunk_rows` rows from a path or binary file object.
+
+    Raises ValueError if a required column is missing, ImportError for
+    Parquet without pyarrow.
+    """
+    if fmt == 'parquet':
+        parquet_file = _parquet().parquet.ParquetFile(source)
+        missing = set(INPUT_COLUMNS) - set(parquet_file.schema_arrow.names)
+        if missing:
+            raise ValueError(f"missing columns: {', '.join(sorted(missing))}")
+        for batch in parquet_file.iter_batches(batch_size=chunk_rows):
+            yield batch.to_pandas()
+        return
+
+    import pandas as pd
+
+    text_columns = {column: str for column in INPUT_COLUMNS[:4]}
+    with pd.read_csv(source, chunksize=chunk_rows, dtype=text_columns, keep_default_na=False) as reader:
+        for chunk in reader:
+            missing = set(INPUT_COLUMNS) - set(chunk.columns)
+            if missing:
+                raise ValueError(f"missing columns: {', '.join(sorted(missing))}")
+            yield chunk
+
+
+class ChunkWriter:
+    """Appends DataFrames to one CSV or Parquet file."""
+
+    def __init__(self, target, fmt: str):
+        """
+        Args:
+            target: path or binary file object
+        """
+        self.target = target
+        self.fmt = fmt
+        self._parquet_writer = None
+        self._header = True
+
+    def write(self, chunk: "pd.DataFrame"):
+        if self.fmt == 'parquet':
+            pyarrow = _parquet()
+            table = pyarrow.Table.from_pandas(chunk, preserve_index=False)
+            if self._parquet_writer is None:
+                self._parquet_writer = pyarrow.parquet.ParquetWriter(self.target, table.schema)
+            self._parquet_writer.write_table(table.cast(self._parquet_writer.schema))
+        else:
+            text = chunk.to_csv(index=False, header=self._header)
+            if isinstance(self.target, str):
+                with open(self.target, 'w' if self._header else 'a', newline='', encoding='utf-8') as f:
+                    f.write(text)
+            else:
+                self.target.write(text.encode('utf-8'))
+        self._header = False
+
+    def close(self):
+        if self._parquet_writer is not None:
+            self._parquet_writer.close()
+
+
+class WindowBuilder:
+    """
+    Rolling SEQUENCE_LENGTH-week windows of every row, across chunks.
+
+    Keeps the last SEQUENCE_LENGTH - 1 weekly values, the number of weeks seen
+    and the newest date of every (region, disease) pair. Pairs start from
+    zeros, like `HistoryTable` windows of pairs with a short history.
+    """
+
+    def __init__(self, region_vocab: Vocabulary, disease_vocab: Vocabulary):
+        self.region_vocab = region_vocab
+        self.disease_vocab = disease_vocab
+        pairs = len(region_vocab) * len(disease_vocab)
+        self._carry = np.zeros((pairs, SEQUENCE_LENGTH - 1), dtype=np.float64)
+        self._weeks = np.zeros(pairs, dtype=np.int64)
+        self._last_date = np.full(pairs, np.datetime64('NaT'), dtype='datetime64[D]')
+
+    def build(self, chunk: "pd.DataFrame") -> dict:
+        """
+        Windows of the rows of `chunk` with a known region, disease and date.
+
+        Returns:
+            {"rows": (m,) positions in `chunk`, "region_idx", "disease_idx",
+             "windows": (m, SEQUENCE_LENGTH) case counts, oldest first,
+             "dates": (m,) datetime64[D], "history_weeks": (m,) real
+             (not zero-padded) weeks in each window}
+        """
+        import pandas as pd
+
+        regions = (chunk['state_ut'].astype(str) + '_' + chunk['district'].astype(str)).tolist()
+        region_idx = self.region_vocab.encode(regions)
+        disease_idx = self.disease_vocab.encode(chunk['disease_clean'].astype(str).tolist())
+        dates = pd.to_datetime(chunk['date_final'], errors='coerce').to_numpy().astype('datetime64[D]')
+        cases = pd.to_numeric(chunk['num_cases'], errors='coerce').fillna(0).to_numpy(dtype=np.float64)
+
+        rows = np.flatnonzero((region_idx >= 0) & (disease_idx >= 0) & ~np.isnat(dates))
+        if not len(rows):
+            return {"rows": rows, "region_idx": region_idx[rows], "disease_idx": disease_idx[rows],
+                    "windows": np.empty((0, SEQUENCE_LENGTH)), "dates": dates[rows],
+                    "history_weeks": np.empty(0, dtype=np.int64)}
+        pairs = region_idx[rows] * len(self.disease_vocab) + disease_idx[rows]
+        # Sorted by pair, then date; lexsort is stable, so same-date rows keep file order
+        order = np.lexsort((dates[rows], pairs))
+        sorted_pairs, sorted_dates, sorted_cases = pairs[order], dates[rows][order], cases[rows][order]
+        m = len(rows)
+
+        starts = np.flatnonzero(np.r_[True, sorted_pairs[1:] != sorted_pairs[:-1]])
+        counts = np.diff(np.r_[starts, m])
+        group_pairs = sorted_pairs[starts]
+
+        stale = sorted_dates[starts] < self._last_date[group_pairs]
+        if stale.any():
+            pair = int(group_pairs[np.argmax(stale)])
+            region, disease = divmod(pair, len(self.disease_vocab))
+            raise ValueError(
+                f"rows of {self.region_vocab.classes[region]} / {self.disease_vocab.classes[disease]} "
+                f"are older than rows of an earlier chunk; sort the file by date or by pair and date"
+            )
+
+        # One buffer holding each group's carried weeks followed by its rows;
+        # every row's window is the SEQUENCE_LENGTH values ending at the row
+        k = SEQUENCE_LENGTH - 1
+        groups = np.repeat(np.arange(len(starts)), counts)
+        buffer = np.empty(m + k * len(starts), dtype=np.float64)
+        offsets = starts + k * np.arange(len(starts))
+        buffer[offsets[:, None] + np.arange(k)] = self._carry[group_pairs]
+        value_pos = np.arange(m) + k * (groups + 1)
+        buffer[value_pos] = sorted_cases
+        windows = sliding_window_view(buffer, SEQUENCE_LENGTH)[value_pos - k]
+        weeks = np.minimum(self._weeks[group_pairs][groups] + np.arange(m) - starts[groups] + 1, SEQUENCE_LENGTH)
+
+        last = value_pos[starts + counts - 1]
+        self._carry[group_pairs] = buffer[(last - k + 1)[:, None] + np.arange(k)]
+        self._weeks[group_pairs] += counts
+        self._last_date[group_pairs] = sorted_dates[starts + counts - 1]
+
+        inverse = np.empty_like(order)
+        inverse[order] = np.arange(m)
+        return {
+            "rows": rows,
+            "region_idx": region_idx[rows],
+            "disease_idx": disease_idx[rows],
+            "windows": windows[inverse],
+            "dates": dates[rows],
+            "history_weeks": weeks[inverse]
+        }
+
+
+def score_chunk(chunk: "pd.DataFrame", builder: WindowBuilder, predict: Callable) -> "pd.DataFrame":
+    """
+    `chunk` with the OUTPUT_COLUMNS appended; rows that cannot be scored
+    (unknown region or disease, invalid date) get empty predictions.
+
+    Args:
+        predict: (cases_log, region_idx, disease_idx, temporal) -> (n, 3)
+            predicted cases, lower and upper bound
+    """
+    windows = builder.build(chunk)
+    rows = windows["rows"]
+    n = len(chunk)
+
+    preds = np.full((n, 3), np.nan, dtype=np.float32)
+    pred_dates = np.full(n, np.datetime64('NaT'), dtype='datetime64[D]')
+    weeks = np.zeros(n, dtype=np.int64)
+    if len(rows):
+        pred_dates[rows] = windows["dates"] + FORECAST_STEP
+        weeks[rows] = windows["history_weeks"]
+        preds[rows] = predict(
+            encode_history(windows["windows"]), windows["region_idx"], windows["disease_idx"],
+            temporal_features(pred_dates[rows])
+        )
+
+    scored = chunk.copy()
+    scored['prediction_date'] = np.where(np.isnat(pred_dates), '', pred_dates.astype(str))
+    scored['predicted_cases'] = preds[:, 0]
+    scored['confidence_interval_lower'] = preds[:, 1]
+    scored['confidence_interval_upper'] = preds[:, 2]
+    scored['history_weeks'] = weeks
+    return scored
+
+
+def score_file(source, target, predict: Callable, region_vocab: Vocabulary, disease_vocab: Vocabulary,
+               input_format: str = 'csv', output_format: str = 'csv',
+               chunk_rows: int = DEFAULT_CHUNK_ROWS) -> dict:
+    """
+    Score every row of `source` and write the result to `target`.
+
+    Returns:
+        {"rows", "scored", "skipped", "chunks", "seconds"}
+    """
+    started = time.perf_counter()
+    builder = WindowBuilder(region_vocab, disease_vocab)
+    writer = ChunkWriter(target, output_format)
+    stats = {"rows": 0, "scored": 0, "skipped": 0, "chunks": 0}
+    try:
+        for chunk in read_chunks(source, input_format, chunk_rows):
+            scored = score_chunk(chunk, builder, predict)
+            writer.write(scored)
+            stats["rows"] += len(scored)
+            stats["scored"] += int((scored['prediction_date'] != '').sum())
+            stats["chunks"] += 1
+    finally:
+        writer.close()
+    stats["skipped"] = stats["rows"] - stats["scored"]
+    stats["seconds"] = time.perf_counter() - started
+    return stats
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Append next-week forecasts to a weekly case file")
+    parser.add_argument('input', help="CSV or Parquet file (by extension)")
+    parser.add_argument('output', help="scored CSV or Parquet file (by extension)")
+    parser.add_argument('--chunk-rows', type=int, default=DEFAULT_CHUNK_ROWS, help="rows read per chunk")
+    parser.add_argument('--batch-size', type=int, default=1024, help="rows per forward pass")
+    parser.add_argument('--registry', default=None, help="model registry (default: ../models/registry)")
+    parser.add_argument('--version', default=None, help="registry version (default: the active one)")
+    parser.add_argument('--checkpoint', default='../models/improved_lstm_v2_model5_best.pt',
+                        help="used when the registry has no active version")
+    parser.add_argument('--vocab', default='../models/vocabularies.json')
+    return parser.parse_args()
+
+
+def load_cli_backend(args):
+    """(backend, (region_vocab, disease_vocab)): a registry version if there is one, else the checkpoint."""
+    import torch
+    from backends import TorchBackend
+    from model_loading import load_checkpoint_model
+    from preprocessing import load_vocabularies
+    from registry import DEFAULT_REGISTRY, ModelRegistry
+
+    registry = ModelRegistry(args.registry or DEFAULT_REGISTRY)
+    version = args.version or registry.active()
+    if version is not None:
+        model, metadata, vocabularies = registry.load(version)
+        print(f"📦 Registry version {version}")
+        return TorchBackend(model, torch.device('cpu'), "eager-mmap", metadata['weights_fingerprint'], metadata), vocabularies
+
+    region_vocab, disease_vocab = load_vocabularies(args.vocab)
+    model = load_checkpoint_model(args.checkpoint, len(region_vocab), len(disease_vocab), torch.device('cpu'))
+    print(f"📦 Checkpoint {args.checkpoint}")
+    return TorchBackend(model, torch.device('cpu')), (region_vocab, disease_vocab)
+
+
+def main():
+    args = parse_args()
+    from backends import predict_with_interval
+
+    backend, (region_vocab, disease_vocab) = load_cli_backend(args)
+
+    def predict(cases_log, region_idx, disease_idx, temporal):
+        preds = np.empty((len(cases_log), 3), dtype=np.float32)
+        for start in range(0, len(cases_log), args.batch_size):
+            end = start + args.batch_size
+            preds[start:end] = predict_with_interval(
+                backend, cases_log[start:end], region_idx[start:end], disease_idx[start:end], temporal[start:end]
+            )
+        return preds
+
+    print(f"🚀 Scoring {args.input} in chunks of {args.chunk_rows} rows")
+    stats = score_file(args.input, args.output, predict, region_vocab, disease_vocab,
+                       file_format(args.input), file_format(args.output), args.chunk_rows)
+    print(f"✅ {stats['rows']} rows ({stats['scored']} scored, {stats['skipped']} skipped) "
+          f"in {stats['seconds']:.1f}s → {args.output}")
+
+
+if __name__ == "__main__":
+    main()
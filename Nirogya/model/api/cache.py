@@ -0,0 +1,130 @@
+"""
+Prediction result cache
+Bounded LRU cache with TTL, keyed on encoded inputs and tied to the
+fingerprint of the loaded model weights
+"""
+import time
+from collections import OrderedDict
+from typing import Optional
+
+import numpy as np
+
+
+class PredictionCache:
+    """
+    LRU + TTL cache of predictions (predicted cases with interval bounds,
+    and whether the cascade's baseline tier produced them).
+
+    Keys are built from the encoded region/disease indices, the case history
+    in counts rounded to `quantum` cases and the prediction date. Histories
+    whose counts all agree within half a quantum share an entry; any two
+    different integer counts never do, however large. (A quantum in log1p
+    space would merge neighbouring counts above ~1000, where log1p steps
+    fall below it.) The cache is cleared whenever the model version
+    (weights fingerprint) changes.
+    """
+
+    def __init__(self, max_entries: int = 100000, ttl_seconds: float = 3600, quantum: float = 0.01):
+        """
+        Args:
+            max_entries: entries kept before the least recently used is evicted
+            ttl_seconds: entry lifetime
+            quantum: resolution of the case counts in the key, in cases
+        """
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.quantum = quantum
+        self.model_version: Optional[str] = None
+
+        self._entries = OrderedDict()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    def make_keys(self, region_idx, disease_idx, cases_log, dates) -> list:
+        """
+        Build cache keys for a batch of encoded inputs.
+
+        Args:
+            region_idx: (n,) region indices
+            disease_idx: (n,) disease indices
+            cases_log: (n, 14) log1p case history
+            dates: (n,) datetime64[D] prediction dates
+
+        Returns:
+            list of n hashable keys
+        """
+        counts = np.expm1(np.asarray(cases_log, dtype=np.float64))
+        quantized = np.round(counts / self.quantum).astype(np.int64)
+        days = np.asarray(dates, dtype='datetime64[D]').astype(np.int64)
+
+        return [
+            (int(r), int(d), q.tobytes(), int(day))
+            for r, d, q, day in zip(region_idx, disease_idx, quantized, days)
+        ]
+
+    def get(self, key) -> Optional[tuple]:
+        """Cached prediction for `key`, or None on miss/expiry."""
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+
+        value, expires_at = entry
+        if expires_at < time.monotonic():
+            del self._entries[key]
+            self.expirations += 1
+            self.misses += 1
+            return None
+
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def put(self, key, value: tuple, model_version: Optional[str] = None):
+        """
+        Store a prediction, evicting the least recently used entries if full.
+
+        `model_version` is the version current when the value was looked up;
+        the value is dropped if the model was swapped since then.
+        """
+        if model_version is not None and model_version != self.model_version:
+            return
+        self._entries[key] = (value, time.monotonic() + self.ttl_seconds)
+        self._entries.move_to_end(key)
+
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def set_model_version(self, version: str):
+        """Record the serving weights; drops all entries if they changed."""
+        if version != self.model_version:
+            if self.model_version is not None:
+                self.invalidations += 1
+            self.clear()
+            self.model_version = version
+
+    def clear(self):
+        """Drop all entries."""
+        self._entries.clear()
+
+    def stats(self) -> dict:
+        """Cache configuration and counters."""
+        lookups = self.hits + self.misses
+        return {
+            "enabled": True,
+            "model_version": self.model_version,
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "ttl_seconds": self.ttl_seconds,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "invalidations": self.invalidations
+        }
@@ -0,0 +1,230 @@
+"""
+Cascade inference: a cheap baseline tier in front of the LSTM
+Histories that are all zero or nearly flat are answered by a tiny linear
+model over the window's level; only the remaining rows reach the LSTM
+
+Fitting the baseline (optional: without it the tier predicts the window mean):
+    cd api
+    python cascade.py
+    python cascade.py --max-spread 0.5 --until 2020-01-01 --output ../models/cascade_baseline.json
+"""
+import argparse
+import json
+import os
+import sys
+import threading
+from datetime import datetime
+from typing import Optional
+
+import numpy as np
+sys.path.append('../notebooks')
+
+from preprocessing import SEQUENCE_LENGTH, encode_history
+
+DEFAULT_BASELINE = '../models/cascade_baseline.json'
+BASELINE_FORMAT = 1
+FEATURES = ("mean", "last", "bias")
+WINDOW_MEAN = (1.0, 0.0, 0.0)  # coefficients used when no baseline was fitted
+BASELINE_INTERVAL = (0.7, 1.3)  # same ±30% band as a single model
+MIN_FIT_ROWS = 10
+RIDGE = 1.0  # pull towards WINDOW_MEAN, so levels missing from the fit keep the window mean
+DEFAULT_FIT_FRACTION = 0.8  # fit on the first 80% of the weeks, as the training split
+
+
+def window_spread(cases_log: np.ndarray) -> np.ndarray:
+    """(n,) max - min of each log1p window: 0 for all-zero and constant histories."""
+    return cases_log.max(axis=1) - cases_log.min(axis=1)
+
+
+def window_features(cases_log: np.ndarray) -> np.ndarray:
+    """(n, len(FEATURES)) level features of log1p windows."""
+    return np.stack([
+        cases_log.mean(axis=1), cases_log[:, -1], np.ones(len(cases_log), dtype=cases_log.dtype)
+    ], axis=1)
+
+
+class CascadeBaseline:
+    """
+    Gate plus cheap tier of the cascade.
+
+    A window is trivial when its log1p spread is at most `max_spread` (0 =
+    only constant windows, all-zero ones included). Trivial windows are
+    predicted as a linear function of their mean and last value, in log space.
+    Tier counters are updated from the inference threads, under a lock.
+    """
+
+    def __init__(self, coefficients=WINDOW_MEAN, max_spread: float = 0.0, source: Optional[str] = None):
+        """
+        Args:
+            coefficients: weights of FEATURES (default: the window mean)
+            max_spread: largest log1p spread counted as trivial
+            source: baseline file the coefficients come from (None = window mean)
+        """
+        self.coefficients = np.asarray(coefficients, dtype=np.float32)
+        self.max_spread = max_spread
+        self.source = source
+        self.baseline_rows = 0
+        self.model_rows = 0
+        self._lock = threading.Lock()
+
+    @classmethod
+    def load(cls, path: str, max_spread: float = 0.0) -> "CascadeBaseline":
+        """Coefficients written by `fit_baseline` when the file exists, else the window mean."""
+        if not path or not os.path.exists(path):
+            return cls(WINDOW_MEAN, max_spread)
+        with open(path) as f:
+            data = json.load(f)
+        if data.get("format") != BASELINE_FORMAT or tuple(data.get("features", ())) != FEATURES:
+            raise ValueError(f"{path} is not a format {BASELINE_FORMAT} cascade baseline")
+        return cls(data["coefficients"], max_spread, path)
+
+    def gate(self, cases_log: np.ndarray) -> np.ndarray:
+        """(n,) bool, True where the baseline answers instead of the model."""
+        return window_spread(cases_log) <= self.max_spread
+
+    def predict_log(self, cases_log: np.ndarray) -> np.ndarray:
+        """(n,) float32 log1p predictions of the baseline (never below zero cases)."""
+        return np.maximum(0, window_features(cases_log) @ self.coefficients).astype(np.float32)
+
+    def predict(self, cases_log: np.ndarray) -> np.ndarray:
+        """(n, 3) predicted cases, lower and upper bound, like `predict_with_interval`."""
+        pred = np.expm1(self.predict_log(cases_log))
+        return np.stack([pred, pred * BASELINE_INTERVAL[0], pred * BASELINE_INTERVAL[1]], axis=1)
+
+    def record(self, baseline_rows: int, model_rows: int):
+        with self._lock:
+            self.baseline_rows += baseline_rows
+            self.model_rows += model_rows
+
+    def stats(self) -> dict:
+        """Gate setting, coefficient source and rows answered by each tier."""
+        total = self.baseline_rows + self.model_rows
+        return {
+            "enabled": True,
+            "max_spread": self.max_spread,
+            "baseline": self.source or "window mean",
+            "baseline_rows": self.baseline_rows,
+            "model_rows": self.model_rows,
+            "baseline_ratio": self.baseline_rows / total if total else 0.0
+        }
+
+
+def csv_windows(path: str, until: Optional[str] = None, after: Optional[str] = None) -> dict:
+    """
+    Every SEQUENCE_LENGTH-week window of the processed weekly CSV and its next week.
+
+    Unlike prepare_training_data.py, all-zero windows are kept: they are the
+    inputs the baseline exists for. `until` / `after` select windows by the
+    date of their target week (exclusive / inclusive bounds).
+
+    Returns:
+        dict of regions, diseases (names), windows (n, 14) and targets (n,)
+        log1p, target_dates (n,) datetime64[D]
+    """
+    import pandas as pd
+    from numpy.lib.stride_tricks import sliding_window_view
+
+    df = pd.read_csv(path, usecols=['state_ut', 'district', 'disease_clean', 'date_final', 'num_cases'])
+    df['region'] = df['state_ut'].astype(str) + '_' + df['district'].astype(str)
+    df['date'] = pd.to_datetime(df['date_final']).values.astype('datetime64[D]')
+    df = df.sort_values(['region', 'disease_clean', 'date'], kind='stable')
+
+    parts = {"regions": [], "diseases": [], "windows": [], "targets": [], "target_dates": []}
+    for (region, disease), group in df.groupby(['region', 'disease_clean'], sort=False):
+        cases = encode_history(group['num_cases'].fillna(0).to_numpy())
+        if len(cases) <= SEQUENCE_LENGTH:
+            continue
+        n = len(cases) - SEQUENCE_LENGTH
+        parts["regions"] += [region] * n
+        parts["diseases"] += [disease] * n
+        parts["windows"].append(sliding_window_view(cases, SEQUENCE_LENGTH)[:n])
+        parts["targets"].append(cases[SEQUENCE_LENGTH:])
+        parts["target_dates"].append(group['date'].to_numpy()[SEQUENCE_LENGTH:].astype('datetime64[D]'))
+
+    windows = {
+        "regions": np.array(parts["regions"], dtype=object),
+        "diseases": np.array(parts["diseases"], dtype=object),
+        "windows": np.concatenate(parts["windows"]).astype(np.float32),
+        "targets": np.concatenate(parts["targets"]).astype(np.float32),
+        "target_dates": np.concatenate(parts["target_dates"])
+    }
+    keep = np.ones(len(windows["targets"]), dtype=bool)
+    if until is not None:
+        keep &= windows["target_dates"] < np.datetime64(until, 'D')
+    if after is not None:
+        keep &= windows["target_dates"] >= np.datetime64(after, 'D')
+    return {name: values[keep] for name, values in windows.items()}
+
+
+def split_date(path: str, fraction: float = DEFAULT_FIT_FRACTION) -> str:
+    """Date separating the first `fraction` of the CSV's weeks from the rest."""
+    import pandas as pd
+
+    dates = np.sort(pd.to_datetime(pd.read_csv(path, usecols=['date_final'])['date_final']).unique())
+    return str(dates[int(len(dates) * fraction)])[:10]
+
+
+def fit_baseline(windows: np.ndarray, targets: np.ndarray, max_spread: float) -> tuple:
+    """
+    Least-squares coefficients of FEATURES over the windows the gate lets through.
+
+    Ridge-regularized towards WINDOW_MEAN: with max_spread 0 the trivial
+    training windows may all be zero, and a plain fit would then predict a
+    constant for every flat history.
+
+    Returns:
+        (coefficients, rows used); the window mean when fewer than
+        MIN_FIT_ROWS windows pass the gate
+    """
+    trivial = window_spread(windows) <= max_spread
+    if trivial.sum() < MIN_FIT_ROWS:
+        return WINDOW_MEAN, int(trivial.sum())
+    features = window_features(windows[trivial]).astype(np.float64)
+    prior = np.array(WINDOW_MEAN)
+    coefficients = prior + np.linalg.solve(
+        features.T @ features + RIDGE * np.eye(len(FEATURES)),
+        features.T @ (targets[trivial] - features @ prior)
+    )
+    return tuple(float(c) for c in coefficients), int(trivial.sum())
+
+
+def parse_args():
+    from histories import DEFAULT_HISTORY_CSV
+
+    parser = argparse.ArgumentParser(description="Fit the cascade's baseline tier")
+    parser.add_argument('--csv', default=DEFAULT_HISTORY_CSV, help="processed weekly CSV")
+    parser.add_argument('--max-spread', type=float, default=0.0,
+                        help="gate: largest log1p spread of a trivial window (as NIROGYA_CASCADE_MAX_SPREAD)")
+    parser.add_argument('--until', default=None,
+                        help="fit on windows whose target week is before this date (default: first 80%% of weeks)")
+    parser.add_argument('--output', default=DEFAULT_BASELINE)
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    until = args.until or split_date(args.csv)
+    data = csv_windows(args.csv, until=until)
+    coefficients, rows = fit_baseline(data["windows"], data["targets"], args.max_spread)
+
+    baseline = {
+        "format": BASELINE_FORMAT,
+        "created_at": datetime.now().isoformat(timespec='seconds'),
+        "features": list(FEATURES),
+        "coefficients": list(coefficients),
+        "max_spread": args.max_spread,
+        "fitted_rows": rows,
+        "fitted_until": until
+    }
+    with open(args.output, 'w') as f:
+        json.dump(baseline, f, indent=2)
+
+    print(f"📐 {rows} of {len(data['windows'])} windows before {until} pass the gate (spread <= {args.max_spread:g})")
+    if coefficients == WINDOW_MEAN:
+        print(f"⚠️  Fewer than {MIN_FIT_ROWS} windows to fit, keeping the window mean")
+    print("   log1p prediction = " + " + ".join(f"{c:.3f}·{name}" for c, name in zip(coefficients, FEATURES)))
+    print(f"✅ Baseline saved to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,199 @@
+"""
+Vectorized ensemble of ImprovedDiseaseLSTM members
+All members are evaluated together in one forward pass: their parameters are
+stacked along a leading member axis and every layer runs as a batched matmul
+"""
+import hashlib
+from typing import List
+
+import numpy as np
+import torch
+import torch.nn as nn
+import torch.nn.functional as F
+from torch.func import stack_module_state
+
+from improved_model_v2 import ImprovedDiseaseLSTM
+from model_loading import load_checkpoint_model, weights_fingerprint
+
+
+class StackedEnsemble(nn.Module):
+    """
+    Eval-mode ensemble computing every member's output in a single pass.
+
+    `torch.func.vmap` has no batching rule for `nn.LSTM`, so the forward pass
+    is written out with the member axis explicit: the LSTM runs as batched
+    matmuls (both directions of a layer at once), the attention Q/K/V
+    projections are fused and BatchNorm is folded into the preceding Linear.
+    Dropout is omitted (inference only).
+
+    Returns (members, batch) log1p predictions, matching each member's
+    `forward(...)[:, 0]`.
+    """
+
+    def __init__(self, models: List[ImprovedDiseaseLSTM]):
+        super().__init__()
+        reference = models[0]
+        params, buffers = stack_module_state([m.eval() for m in models])
+        p = {name: tensor.detach() for name, tensor in {**params, **buffers}.items()}
+
+        self.num_members = len(models)
+        self.num_layers = reference.num_layers
+        self.hidden_size = H = reference.hidden_size
+        self.num_heads = reference.attention.num_heads
+        self.negative_slope = reference.activation.negative_slope
+        self.layer_norm_eps = reference.layer_norm.eps
+
+        self.register_buffer('region_embedding', p['region_embedding.weight'])  # (M, regions, E)
+        self.register_buffer('disease_embedding', p['disease_embedding.weight'])
+
+        # LSTM gates reordered from (i, f, g, o) to (i, f, o, g) so one sigmoid
+        # covers the first 3H columns; forward and reverse directions are
+        # stacked along the member axis (2M).
+        order = torch.cat([torch.arange(0, 2 * H), torch.arange(3 * H, 4 * H), torch.arange(2 * H, 3 * H)])
+        for layer in range(self.num_layers):
+            suffixes = (f'l{layer}', f'l{layer}_reverse')
+            w_ih = torch.cat([p[f'lstm.weight_ih_{s}'] for s in suffixes])[:, order]
+            w_hh = torch.cat([p[f'lstm.weight_hh_{s}'] for s in suffixes])[:, order]
+            bias = torch.cat([p[f'lstm.bias_ih_{s}'] + p[f'lstm.bias_hh_{s}'] for s in suffixes])[:, order]
+            self.register_buffer(f'lstm_w_ih_{layer}', w_ih.transpose(1, 2).contiguous())  # (2M, in, 4H)
+            self.register_buffer(f'lstm_w_hh_{layer}', w_hh.transpose(1, 2).contiguous())  # (2M, H, 4H)
+            self.register_buffer(f'lstm_bias_{layer}', bias.unsqueeze(1))                  # (2M, 1, 4H)
+
+        self.register_buffer('ln_weight', p['layer_norm.weight'][:, None, None, :])
+        self.register_buffer('ln_bias', p['layer_norm.bias'][:, None, None, :])
+
+        qkv = ('attention.query', 'attention.key', 'attention.value')
+        self.register_buffer('qkv_weight', torch.cat([p[f'{n}.weight'] for n in qkv], 1).transpose(1, 2).contiguous())
+        self.register_buffer('qkv_bias', torch.cat([p[f'{n}.bias'] for n in qkv], 1).unsqueeze(1))
+        self.register_buffer('attn_out_weight', p['attention.fc_out.weight'].transpose(1, 2).contiguous())
+        self.register_buffer('attn_out_bias', p['attention.fc_out.bias'].unsqueeze(1))
+
+        # FC head with eval-mode BatchNorm folded into each Linear
+        for i in range(1, 5):
+            bn = getattr(reference, f'bn{i}')
+            scale = p[f'bn{i}.weight'] / torch.sqrt(p[f'bn{i}.running_var'] + bn.eps)
+            weight = p[f'fc{i}.weight'] * scale[:, :, None]
+            bias = (p[f'fc{i}.bias'] - p[f'bn{i}.running_mean']) * scale + p[f'bn{i}.bias']
+            self.register_buffer(f'fc{i}_weight', weight.transpose(1, 2).contiguous())
+            self.register_buffer(f'fc{i}_bias', bias.unsqueeze(1))
+        self.register_buffer('fc_out_weight', p['fc_out.weight'].transpose(1, 2).contiguous())
+        self.register_buffer('fc_out_bias', p['fc_out.bias'].unsqueeze(1))
+
+        self.eval()
+
+    @staticmethod
+    def _linear(x, weight, bias):
+        """Per-member Linear: x (M, ..., in) @ weight (M, in, out) + bias (M, 1, out)."""
+        shape = x.shape
+        out = torch.baddbmm(bias, x.reshape(shape[0], -1, shape[-1]), weight)
+        return out.view(*shape[:-1], weight.shape[-1])
+
+    def _lstm_layer(self, inputs, layer):
+        """One bidirectional LSTM layer for all members, time-major: (M, T, B, in) -> (M, T, B, 2H)."""
+        M, T, B, _ = inputs.shape
+        H = self.hidden_size
+        w_hh = getattr(self, f'lstm_w_hh_{layer}')
+
+        # Input projections for every step at once; the reverse direction reads time backwards
+        both = torch.cat([inputs, inputs.flip(1)])
+        projected = self._linear(both, getattr(self, f'lstm_w_ih_{layer}'), getattr(self, f'lstm_bias_{layer}'))
+
+        h = inputs.new_zeros(2 * M, B, H)
+        c = inputs.new_zeros(2 * M, B, H)
+        outputs = inputs.new_empty(2 * M, T, B, H)
+        for t in range(T):
+            gates = torch.baddbmm(projected[:, t], h, w_hh)
+            ifo = torch.sigmoid(gates[..., :3 * H])
+            g = torch.tanh(gates[..., 3 * H:])
+            c = ifo[..., H:2 * H] * c + ifo[..., :H] * g
+            h = ifo[..., 2 * H:] * torch.tanh(c)
+            outputs[:, t] = h
+
+        return torch.cat([outputs[:M], outputs[M:].flip(1)], dim=-1)
+
+    def forward(self, x, region_idx, disease_idx, temporal_features):
+        """
+        Args:
+            x: (batch, seq_len) log1p case history
+            region_idx: (batch,) region indices
+            disease_idx: (batch,) disease indices
+            temporal_features: (batch, temporal_dim)
+
+        Returns:
+            (members, batch) log1p predictions
+        """
+        M = self.num_members
+        B, T = x.shape
+
+        static = torch.cat([
+            self.region_embedding[:, region_idx],
+            self.disease_embedding[:, disease_idx],
+            temporal_features.unsqueeze(0).expand(M, -1, -1)
+        ], dim=-1)  # (M, B, 2E + temporal_dim)
+
+        # Sequence activations are kept time-major (M, T, B, features) so each
+        # recurrence step reads a contiguous block per member
+        out = torch.cat([
+            x.t()[None, :, :, None].expand(M, -1, -1, 1),
+            static.unsqueeze(1).expand(-1, T, -1, -1)
+        ], dim=-1)
+        for layer in range(self.num_layers):
+            out = self._lstm_layer(out, layer)
+
+        out = F.layer_norm(out, out.shape[-1:], eps=self.layer_norm_eps) * self.ln_weight + self.ln_bias
+
+        # Multi-head attention over time (fused Q/K/V projection)
+        D = out.shape[-1]
+        head_dim = D // self.num_heads
+        q, k, v = self._linear(out, self.qkv_weight, self.qkv_bias).chunk(3, dim=-1)
+        q, k, v = (t.reshape(M, T, B, self.num_heads, head_dim).permute(0, 2, 3, 1, 4) for t in (q, k, v))
+        weights = torch.softmax(torch.matmul(q, k.transpose(-2, -1)) / np.sqrt(head_dim), dim=-1)
+        attended = torch.matmul(weights, v).permute(0, 1, 3, 2, 4).reshape(M, B, T, D)
+        attended = self._linear(attended, self.attn_out_weight, self.attn_out_bias)
+
+        context = (attended.mean(dim=2) + attended.amax(dim=2)) / 2
+        h = torch.cat([context, static], dim=-1)
+
+        for i in range(1, 5):
+            h = F.leaky_relu(
+                torch.baddbmm(getattr(self, f'fc{i}_bias'), h, getattr(self, f'fc{i}_weight')),
+                self.negative_slope
+            )
+        return torch.baddbmm(self.fc_out_bias, h, self.fc_out_weight)[..., 0]
+
+
+class SequentialEnsemble(nn.Module):
+    """Reference ensemble: members evaluated one after another (same output as `StackedEnsemble`)."""
+
+    def __init__(self, models: List[ImprovedDiseaseLSTM]):
+        super().__init__()
+        self.members = nn.ModuleList(m.eval() for m in models)
+        self.num_members = len(models)
+
+    def forward(self, x, region_idx, disease_idx, temporal_features):
+        """(members, batch) log1p predictions."""
+        return torch.stack([m(x, region_idx, disease_idx, temporal_features)[:, 0] for m in self.members])
+
+
+ENSEMBLE_MODES = {"stacked": StackedEnsemble, "sequential": SequentialEnsemble}
+
+
+def load_ensemble(paths: List[str], mode: str = "sequential", num_regions: int = None,
+                  num_diseases: int = None, device='cpu'):
+    """
+    Load member checkpoints into a `StackedEnsemble` or `SequentialEnsemble`.
+
+    Returns:
+        (ensemble, metadata) where metadata holds the vocabulary sizes, the
+        member count and a fingerprint over all members' weights
+    """
+    models = [load_checkpoint_model(path, num_regions, num_diseases, device) for path in paths]
+
+    fingerprint = hashlib.sha1(" ".join(weights_fingerprint(m) for m in models).encode()).hexdigest()[:12]
+    metadata = {
+        "num_regions": models[0].region_embedding.num_embeddings,
+        "num_diseases": models[0].disease_embedding.num_embeddings,
+        "num_members": len(models),
+        "weights_fingerprint": f"ensemble-{fingerprint}"
+    }
+    return ENSEMBLE_MODES[mode](models).to(device), metadata
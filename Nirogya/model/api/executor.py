@@ -0,0 +1,64 @@
+"""
+Dedicated inference executor
+Runs torch forwards on a pool of worker threads so async handlers can await
+them without blocking the uvicorn event loop
+"""
+import asyncio
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Optional
+
+import torch
+
+
+class InferenceExecutor:
+    """
+    Thread pool for model inference.
+
+    torch's intra-op thread count is a process-wide setting, not a per-thread
+    one: it is set once, when the executor is created, to the total budget
+    `num_workers * threads_per_worker` (roughly the available cores), and
+    concurrent forwards share that pool. Anything else calling
+    `torch.set_num_threads` in the process changes it for every worker.
+    The model is shared read-only across workers (eval mode, no grad); torch
+    releases the GIL inside its kernels, so forwards run in parallel.
+    """
+
+    def __init__(self, num_workers: int = 2, threads_per_worker: Optional[int] = None):
+        """
+        Args:
+            num_workers: number of concurrent forwards
+            threads_per_worker: share of the torch intra-op threads per worker
+                (default: available cores split evenly across workers)
+        """
+        self.num_workers = max(1, num_workers)
+        self.threads_per_worker = threads_per_worker or max(1, (os.cpu_count() or 1) // self.num_workers)
+        self.intra_op_threads = self.num_workers * self.threads_per_worker
+        torch.set_num_threads(self.intra_op_threads)
+
+        self._pool = ThreadPoolExecutor(max_workers=self.num_workers, thread_name_prefix="inference")
+        self.pending = 0
+        self.completed = 0
+
+    async def run(self, fn: Callable, *args):
+        """Run `fn(*args)` on a worker thread and await its result."""
+        self.pending += 1
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self._pool, fn, *args)
+        finally:
+            self.pending -= 1
+            self.completed += 1
+
+    def shutdown(self):
+        """Wait for running forwards and stop the workers."""
+        self._pool.shutdown(wait=True)
+
+    def stats(self) -> dict:
+        """Executor configuration and load."""
+        return {
+            "num_workers": self.num_workers,
+            "threads_per_worker": self.threads_per_worker,
+            "intra_op_threads": self.intra_op_threads,
+            "pending": self.pending,
+            "completed": self.completed
+        }
@@ -0,0 +1,108 @@
+"""
+Export a trained checkpoint to optimized inference artifacts
+
+Usage:
+    cd api
+    python export_model.py                      # TorchScript
+    python export_model.py --format onnx        # ONNX (for NIROGYA_BACKEND=onnx)
+    python export_model.py --format npy         # deploy artifact: mmap-able weights + vocabularies
+    python export_model.py --format npy --fp16  # same, half the size on disk
+    python export_model.py --format all --checkpoint ../models/improved_lstm_v2_model5_best.pt
+
+The API loads the TorchScript artifact in place of the eager model when it
+exists (see NIROGYA_TORCHSCRIPT_PATH in app_v2.py), the ONNX model when
+NIROGYA_BACKEND=onnx. The .npy deploy artifact (weights only, no optimizer
+state or pickles) takes precedence over both when present.
+"""
+import argparse
+import os
+import sys
+
+import numpy as np
+import torch
+sys.path.append('../notebooks')
+
+from preprocessing import load_vocabularies, save_vocabularies
+from model_loading import (
+    load_checkpoint_model, export_torchscript, export_onnx, export_npy_weights,
+    load_torchscript, load_mmap_model, example_inputs
+)
+from backends import TorchBackend, OnnxBackend
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Export ImprovedDiseaseLSTM for serving")
+    parser.add_argument('--checkpoint', default='../models/improved_lstm_v2_model5_best.pt')
+    parser.add_argument('--vocab', default='../models/vocabularies.json')
+    parser.add_argument('--format', choices=['torchscript', 'onnx', 'npy', 'all'], default='torchscript')
+    parser.add_argument('--torchscript-output', default='../models/improved_lstm_v2_model5.torchscript.pt')
+    parser.add_argument('--onnx-output', default='../models/improved_lstm_v2_model5.onnx')
+    parser.add_argument('--npy-output', default='../models/improved_lstm_v2_model5_weights')
+    parser.add_argument('--fp16', action='store_true', help="store the .npy weights in half precision")
+    parser.add_argument('--tolerance', type=float, default=1e-4,
+                        help="max abs difference (log scale) allowed between eager and exported outputs")
+    parser.add_argument('--fp16-tolerance', type=float, default=0.05,
+                        help="tolerance used instead of --tolerance for --fp16 weights")
+    return parser.parse_args()
+
+
+def check_parity(reference, candidate, num_regions, num_diseases, tolerance) -> float:
+    """Max abs difference on a batch size different from the export batch; exits on failure."""
+    inputs = [t.numpy() for t in example_inputs(num_regions, num_diseases, batch_size=33)]
+    max_diff = float(np.abs(reference.predict_log(*inputs) - candidate.predict_log(*inputs)).max())
+
+    if max_diff > tolerance:
+        print(f"❌ Exported model differs from eager model (max diff {max_diff:.2e})")
+        sys.exit(1)
+    return max_diff
+
+
+def artifact_size(path) -> int:
+    """Size in bytes of an artifact file or directory."""
+    if os.path.isdir(path):
+        return sum(os.path.getsize(os.path.join(path, name)) for name in os.listdir(path))
+    return os.path.getsize(path)
+
+
+def main():
+    args = parse_args()
+    device = torch.device('cpu')
+
+    region_vocab, disease_vocab = load_vocabularies(args.vocab)
+    num_regions, num_diseases = len(region_vocab), len(disease_vocab)
+    model = load_checkpoint_model(args.checkpoint, num_regions, num_diseases, device)
+    reference = TorchBackend(model, device)
+    metadata = {"checkpoint": os.path.basename(args.checkpoint)}
+
+    exports = []
+    if args.format in ('torchscript', 'all'):
+        print(f"📦 Exporting {args.checkpoint} → {args.torchscript_output}")
+        metadata = export_torchscript(model, args.torchscript_output, metadata)
+        scripted, _ = load_torchscript(args.torchscript_output, device)
+        candidate = TorchBackend(scripted, device, "torchscript")
+        exports.append(("TorchScript", args.torchscript_output, candidate, args.tolerance))
+
+    if args.format in ('onnx', 'all'):
+        print(f"📦 Exporting {args.checkpoint} → {args.onnx_output}")
+        metadata = export_onnx(model, args.onnx_output, metadata)
+        exports.append(("ONNX", args.onnx_output, OnnxBackend(args.onnx_output), args.tolerance))
+
+    if args.format in ('npy', 'all'):
+        print(f"📦 Exporting {args.checkpoint} → {args.npy_output}/")
+        metadata = export_npy_weights(model, args.npy_output, metadata, fp16=args.fp16)
+        save_vocabularies(os.path.join(args.npy_output, 'vocabularies.json'),
+                          region_vocab.classes, disease_vocab.classes)
+        mapped, _ = load_mmap_model(args.npy_output)
+        tolerance = args.fp16_tolerance if args.fp16 else args.tolerance
+        exports.append(("deploy (.npy)", args.npy_output, TorchBackend(mapped, device, "eager-mmap"), tolerance))
+
+    for name, path, candidate, tolerance in exports:
+        max_diff = check_parity(reference, candidate, num_regions, num_diseases, tolerance)
+        size_mb = artifact_size(path) / (1024 * 1024)
+        print(f"✅ Exported {name} artifact ({size_mb:.1f} MB, max diff {max_diff:.2e})")
+
+    print(f"   Weights fingerprint: {metadata['weights_fingerprint']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+"""
+Precomputed table of the latest forecasts with top-K hotspot indexes
+Built from one scoring run over every observed (region, disease) pair and
+replaced as a whole when a new run finishes, so readers never see a
+partially updated table.
+"""
+import time
+
+import numpy as np
+
+from preprocessing import region_state
+
+RANKINGS = ("cases", "growth")
+
+
+def _group_index(values: np.ndarray, groups: np.ndarray):
+    """
+    Rows ordered by group, then by `values` descending, plus each group's slice.
+
+    Returns:
+        order: (n,) row indices
+        slices: {group id: (start, end)} into `order`
+    """
+    order = np.lexsort((-values, groups))
+    keys, starts, counts = np.unique(groups[order], return_index=True, return_counts=True)
+    slices = {int(k): (int(s), int(s + c)) for k, s, c in zip(keys, starts, counts)}
+    return order, slices
+
+
+class ForecastTable:
+    """
+    Latest forecast of every pair, indexed for top-K queries.
+
+    For each ranking (predicted cases, growth ratio) the rows are pre-sorted
+    within every group of each filter combination (all, state, disease,
+    state + disease), so a top-K query is a dict lookup and a slice: O(K).
+    """
+
+    def __init__(self, region_idx, disease_idx, preds, last_cases, prediction_dates,
+                 region_names, model_version=None):
+        """
+        Args:
+            region_idx: (n,) region index of each pair
+            disease_idx: (n,) disease index of each pair
+            preds: (n, 3) predicted cases, lower and upper interval bound
+            last_cases: (n,) newest observed weekly count of each pair
+            prediction_dates: (n,) date of each forecast, datetime64[D]
+            region_names: region vocabulary classes (for the state of each region)
+            model_version: version (registry version or weights fingerprint) that produced the forecasts
+        """
+        self.region_idx = np.asarray(region_idx, dtype=np.int64)
+        self.disease_idx = np.asarray(disease_idx, dtype=np.int64)
+        preds = np.asarray(preds, dtype=np.float32)
+        self.predicted = preds[:, 0]
+        self.lower = preds[:, 1]
+        self.upper = preds[:, 2]
+        self.last_cases = np.asarray(last_cases, dtype=np.float32)
+        # +1 keeps the ratio finite for series at zero
+        self.growth = (self.predicted + 1) / (self.last_cases + 1)
+        self.prediction_dates = np.asarray(prediction_dates, dtype='datetime64[D]')
+        self.model_version = model_version
+        self.computed_at = time.time()
+
+        self.states = sorted({region_state(name) for name in region_names})
+        self._state_ids = {state: i for i, state in enumerate(self.states)}
+        region_state_ids = np.array([self._state_ids[region_state(name)] for name in region_names], dtype=np.int64)
+        row_states = region_state_ids[self.region_idx] if len(self.region_idx) else self.region_idx
+        self._num_diseases = int(self.disease_idx.max()) + 1 if len(self.disease_idx) else 1
+
+        groupings = {
+            "all": np.zeros(len(self.region_idx), dtype=np.int64),
+            "state": row_states,
+            "disease": self.disease_idx,
+            "state_disease": row_states * self._num_diseases + self.disease_idx
+        }
+        self._indexes = {
+            ranking: {name: _group_index(self._values(ranking), groups) for name, groups in groupings.items()}
+            for ranking in RANKINGS
+        }
+
+    def __len__(self):
+        return len(self.region_idx)
+
+    def _values(self, ranking: str) -> np.ndarray:
+        return self.predicted if ranking == "cases" else self.growth
+
+    def has_state(self, state: str) -> bool:
+        return state in self._state_ids
+
+    def top(self, ranking: str, k: int, state: str = None, disease_idx: int = None):
+        """
+        Rows of the K highest forecasts by `ranking`, optionally within a
+        state and/or disease.
+
+        Returns:
+            rows: up to k row indices, highest first
+            total: number of rows matching the filters
+        """
+        if state is not None and disease_idx is not None:
+            grouping = "state_disease"
+            if disease_idx >= self._num_diseases:
+                return np.empty(0, dtype=np.int64), 0
+            key = self._state_ids[state] * self._num_diseases + disease_idx
+        elif state is not None:
+            grouping, key = "state", self._state_ids[state]
+        elif disease_idx is not None:
+            grouping, key = "disease", disease_idx
+        else:
+            grouping, key = "all", 0
+
+        order, slices = self._indexes[ranking][grouping]
+        start, end = slices.get(key, (0, 0))
+        return order[start:min(end, start + k)], end - start
+
+    def stats(self) -> dict:
+        return {
+            "rows": len(self),
+            "model_version": self.model_version,
+            "computed_at": self.computed_at,
+            "age_seconds": time.time() - self.computed_at
+        }
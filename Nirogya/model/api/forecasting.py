@@ -0,0 +1,61 @@
+"""
+Multi-step forecasting by batched autoregressive rollout
+Every step advances all series together with one (chunked) forward pass
+"""
+from typing import Callable, Tuple
+
+import numpy as np
+
+
+def rollout_forecast(
+    predict_fn: Callable[..., np.ndarray],
+    temporal_fn: Callable[[np.ndarray], np.ndarray],
+    cases_log: np.ndarray,
+    region_idx: np.ndarray,
+    disease_idx: np.ndarray,
+    start_dates: np.ndarray,
+    horizon: int,
+    step_days: int = 7
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Forecast `horizon` steps ahead for many series at once.
+
+    At each step the whole batch is scored, the prediction is appended to the
+    end of each 14-value window (dropping the oldest value), and the temporal
+    features are recomputed for the next step's date.
+
+    Args:
+        predict_fn: fn(cases_log, region_idx, disease_idx, temporal) -> (n,) predicted cases,
+            or (n, k) with the predicted cases in column 0 (e.g. plus interval bounds)
+        temporal_fn: fn(dates) -> (n, 5) temporal features for datetime64[D] dates
+        cases_log: (n, 14) log1p case history
+        region_idx: (n,) region indices
+        disease_idx: (n,) disease indices
+        start_dates: (n,) datetime64[D] date of the first forecast step
+        horizon: number of steps to forecast
+        step_days: days between steps (data is weekly)
+
+    Returns:
+        predictions: (n, horizon) predicted cases on the natural scale, or
+            (n, horizon, k) for a predict_fn returning (n, k)
+        dates: (n, horizon) datetime64[D] date of each step
+    """
+    window = np.array(cases_log, dtype=np.float32, copy=True)
+    start_dates = np.asarray(start_dates, dtype='datetime64[D]')
+
+    n = len(window)
+    dates = start_dates[:, None] + np.arange(horizon) * np.timedelta64(step_days, 'D')
+    predictions = None
+
+    for step in range(horizon):
+        preds = predict_fn(window, region_idx, disease_idx, temporal_fn(dates[:, step]))
+        if predictions is None:
+            predictions = np.empty((n, horizon) + preds.shape[1:], dtype=np.float32)
+        predictions[:, step] = preds
+
+        # Shift the window left in place and feed the prediction back in log space
+        point = preds[:, 0] if preds.ndim == 2 else preds
+        window[:, :-1] = window[:, 1:]
+        window[:, -1] = np.log1p(np.maximum(point, 0))
+
+    return predictions, dates
@@ -0,0 +1,90 @@
+"""
+Latest observed case histories per (region, disease) pair
+Read from the processed weekly CSV with the same columns and windowing as
+prepare_training_data.py, so the API can score pairs without the client
+sending their histories.
+"""
+import csv
+from collections import defaultdict
+
+import numpy as np
+
+from preprocessing import SEQUENCE_LENGTH, Vocabulary, encode_history
+
+DEFAULT_HISTORY_CSV = '../data/processed/disease_outbreaks_weekly_clean.csv'
+
+
+class HistoryTable:
+    """
+    Last SEQUENCE_LENGTH weekly values of every observed pair.
+
+    Windows are stored log1p-encoded, one row per pair, with a dense
+    (regions, diseases) -> row index so lookups are a single fancy-index.
+    """
+
+    def __init__(self, region_idx, disease_idx, windows, last_dates, num_regions, num_diseases):
+        """
+        Args:
+            region_idx: (p,) region index of each pair
+            disease_idx: (p,) disease index of each pair
+            windows: (p, SEQUENCE_LENGTH) log1p case history, oldest first
+            last_dates: (p,) date of the newest value, datetime64[D]
+        """
+        self.region_idx = np.asarray(region_idx, dtype=np.int64)
+        self.disease_idx = np.asarray(disease_idx, dtype=np.int64)
+        self.windows = np.asarray(windows, dtype=np.float32)
+        self.last_dates = np.asarray(last_dates, dtype='datetime64[D]')
+
+        self._rows = np.full((num_regions, num_diseases), -1, dtype=np.int32)
+        self._rows[self.region_idx, self.disease_idx] = np.arange(len(self.region_idx), dtype=np.int32)
+
+    def __len__(self):
+        return len(self.region_idx)
+
+    def lookup(self, region_idx, disease_idx):
+        """
+        Windows of many pairs, zeros for pairs never observed.
+
+        Returns:
+            windows: (n, SEQUENCE_LENGTH) log1p case history
+            observed: (n,) bool, False where the pair has no history
+        """
+        rows = self._rows[region_idx, disease_idx]
+        observed = rows >= 0
+        windows = np.zeros((len(rows), SEQUENCE_LENGTH), dtype=np.float32)
+        windows[observed] = self.windows[rows[observed]]
+        return windows, observed
+
+
+def load_history_table(path: str, region_vocab: Vocabulary, disease_vocab: Vocabulary) -> HistoryTable:
+    """
+    Build a `HistoryTable` from the processed weekly CSV.
+
+    Pairs with fewer than SEQUENCE_LENGTH weeks are zero-padded at the start;
+    rows whose region or disease is not in the vocabularies are skipped.
+    """
+    series = defaultdict(list)
+    with open(path, newline='', encoding='utf-8') as f:
+        for row in csv.DictReader(f):
+            region = region_vocab.index(f"{row['state_ut']}_{row['district']}")
+            disease = disease_vocab.index(row['disease_clean'])
+            if region is None or disease is None:
+                continue
+            cases = float(row['num_cases']) if row['num_cases'] else 0.0
+            series[(region, disease)].append((row['date_final'][:10], cases))
+
+    p = len(series)
+    region_idx = np.empty(p, dtype=np.int64)
+    disease_idx = np.empty(p, dtype=np.int64)
+    cases = np.zeros((p, SEQUENCE_LENGTH), dtype=np.float64)
+    last_dates = np.empty(p, dtype='datetime64[D]')
+
+    for i, ((region, disease), values) in enumerate(series.items()):
+        values.sort()
+        recent = [v for _, v in values[-SEQUENCE_LENGTH:]]
+        region_idx[i], disease_idx[i] = region, disease
+        cases[i, SEQUENCE_LENGTH - len(recent):] = recent
+        last_dates[i] = np.datetime64(values[-1][0], 'D')
+
+    return HistoryTable(region_idx, disease_idx, encode_history(cases), last_dates,
+                        len(region_vocab), len(disease_vocab))
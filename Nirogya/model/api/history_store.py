@@ -0,0 +1,392 @@
+"""
+Rolling history store: the latest SEQUENCE_LENGTH weekly values of every
+(region, disease) pair, updated as new weekly counts are ingested
+
+Values live in preallocated numpy ring buffers indexed by the encoded pair,
+so a window is found in O(1) without rebuilding it from the request. The
+store is seeded from the processed CSV (histories.py) and persisted in a
+directory as a snapshot plus an append log shared by all server processes.
+"""
+import json
+import os
+import threading
+from contextlib import contextmanager
+from typing import Callable, Optional
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+from preprocessing import SEQUENCE_LENGTH, Vocabulary, encode_history
+from histories import HistoryTable
+
+try:
+    import fcntl  # POSIX only; without it the store is single-process
+except ImportError:
+    fcntl = None
+
+DEFAULT_HISTORY_STORE = '../data/history_store'
+SNAPSHOT_FILE = 'snapshot.npz'
+LOCK_FILE = 'lock'
+
+
+class HistoryStore:
+    """
+    Ring buffers of log1p weekly values, one per encoded (region, disease) pair.
+
+    Every value is written twice, at slot i and i + SEQUENCE_LENGTH, so the
+    window of a pair is always the contiguous slice starting at its head:
+    `window()` and `lookup()` are a slice and a single fancy-index, with no
+    reordering of the ring. Pairs never observed read as zeros.
+
+    Ingestion may run on a worker thread while requests read on the event
+    loop: writes and reads hold `lock` (only for the in-memory work), so a
+    reader sees a batch of values either fully applied or not at all.
+    """
+
+    def __init__(self, num_regions: int, num_diseases: int):
+        self.num_regions = num_regions
+        self.num_diseases = num_diseases
+        pairs = num_regions * num_diseases
+
+        self._values = np.zeros((pairs, 2 * SEQUENCE_LENGTH), dtype=np.float32)
+        self._head = np.zeros(pairs, dtype=np.int64)
+        # (pairs, SEQUENCE_LENGTH + 1, SEQUENCE_LENGTH) view: row [p, head[p]] is the window of p
+        self._windows = sliding_window_view(self._values, SEQUENCE_LENGTH, axis=1)
+        self.last_dates = np.full(pairs, np.datetime64('NaT'), dtype='datetime64[D]')
+        self.appended = 0
+        self.lock = threading.RLock()
+
+    def pair_ids(self, region_idx, disease_idx) -> np.ndarray:
+        return np.asarray(region_idx, dtype=np.int64) * self.num_diseases + np.asarray(disease_idx, dtype=np.int64)
+
+    def __len__(self):
+        """Number of observed pairs."""
+        return int(np.count_nonzero(~np.isnat(self.last_dates)))
+
+    def window(self, region_idx: int, disease_idx: int) -> np.ndarray:
+        """(SEQUENCE_LENGTH,) log1p history of one pair, oldest first (a copy)."""
+        pair = region_idx * self.num_diseases + disease_idx
+        with self.lock:
+            return self._windows[pair, self._head[pair]].copy()
+
+    def lookup(self, region_idx, disease_idx):
+        """
+        Windows of many pairs (same contract as `HistoryTable.lookup`).
+
+        Returns:
+            windows: (n, SEQUENCE_LENGTH) log1p case history
+            observed: (n,) bool, False where the pair has no history
+        """
+        pairs = self.pair_ids(region_idx, disease_idx)
+        with self.lock:
+            return self._windows[pairs, self._head[pairs]], ~np.isnat(self.last_dates[pairs])
+
+    def stats(self) -> dict:
+        return {"pairs": len(self), "capacity": len(self.last_dates), "appended": self.appended}
+
+    def observed(self, region_idx, disease_idx) -> np.ndarray:
+        with self.lock:
+            return ~np.isnat(self.last_dates[self.pair_ids(region_idx, disease_idx)])
+
+    def observed_pairs(self):
+        """(region_idx, disease_idx) of every observed pair, region-major."""
+        pairs = np.flatnonzero(~np.isnat(self.last_dates))
+        return pairs // self.num_diseases, pairs % self.num_diseases
+
+    def table(self) -> HistoryTable:
+        """Copy of the observed pairs as an immutable `HistoryTable`."""
+        with self.lock:
+            region_idx, disease_idx = self.observed_pairs()
+            windows, _ = self.lookup(region_idx, disease_idx)
+            pairs = self.pair_ids(region_idx, disease_idx)
+            return HistoryTable(region_idx, disease_idx, windows, self.last_dates[pairs],
+                                self.num_regions, self.num_diseases)
+
+    def seed(self, table: HistoryTable):
+        """Replace the windows of the pairs in `table`."""
+        pairs = self.pair_ids(table.region_idx, table.disease_idx)
+        with self.lock:
+            self._values[pairs, :SEQUENCE_LENGTH] = table.windows
+            self._values[pairs, SEQUENCE_LENGTH:] = table.windows
+            self._head[pairs] = 0
+            self.last_dates[pairs] = table.last_dates
+
+    def check(self, region_idx, disease_idx, dates) -> np.ndarray:
+        """
+        Per-record validity of an append: a date must not be older than the
+        pair's newest value, nor than an earlier record of the pair in the batch.
+        """
+        pairs = self.pair_ids(region_idx, disease_idx)
+        dates = np.asarray(dates, dtype='datetime64[D]')
+        if not len(pairs):
+            return np.zeros(0, dtype=bool)
+
+        order = np.lexsort((np.arange(len(pairs)), pairs))
+        sorted_pairs = pairs[order]
+        days = dates[order].astype(np.int64)  # NaT is the int64 minimum, older than any date
+        first = np.r_[True, sorted_pairs[1:] != sorted_pairs[:-1]]
+
+        # Running max of the dates within each pair's records: offset every pair
+        # above the previous one so a single cumulative max does not cross pairs
+        group = np.cumsum(first) - 1
+        span = np.int64(1) << 40
+        shifted = np.clip(days, -span // 2, span // 2 - 1) + span // 2 + group * span
+        running = np.maximum.accumulate(shifted) - group * span - span // 2
+        earlier = np.where(first, np.iinfo(np.int64).min, np.r_[0, running[:-1]])
+
+        newest = np.maximum(self.last_dates[sorted_pairs].astype(np.int64), earlier)
+        ok = np.empty(len(pairs), dtype=bool)
+        ok[order] = ~np.isnat(dates[order]) & (days >= newest)
+        return ok
+
+    def reset(self):
+        """Forget every pair."""
+        with self.lock:
+            self._values[:] = 0
+            self._head[:] = 0
+            self.last_dates[:] = np.datetime64('NaT')
+
+    def append(self, region_idx, disease_idx, dates, cases_log):
+        """
+        Add weekly values in record order.
+
+        A record newer than the pair's newest value pushes out its oldest;
+        one for the same date replaces the newest value (a correction).
+        Callers validate with `check` first: records are applied as given.
+        """
+        pairs = self.pair_ids(region_idx, disease_idx)
+        dates = np.asarray(dates, dtype='datetime64[D]')
+        cases_log = np.asarray(cases_log, dtype=np.float32)
+
+        # Rounds of at most one record per pair, so each round is vectorized
+        order = np.lexsort((np.arange(len(pairs)), pairs))
+        sorted_pairs = pairs[order]
+        starts = np.r_[0, np.flatnonzero(np.diff(sorted_pairs)) + 1]
+        rank = np.arange(len(order)) - np.repeat(starts, np.diff(np.r_[starts, len(order)]))
+
+        with self.lock:
+            for k in range(int(rank.max()) + 1 if len(rank) else 0):
+                chosen = order[rank == k]
+                p, date, value = pairs[chosen], dates[chosen], cases_log[chosen]
+                correction = self.last_dates[p] == date
+
+                slot = np.where(correction, (self._head[p] - 1) % SEQUENCE_LENGTH, self._head[p])
+                self._values[p, slot] = value
+                self._values[p, slot + SEQUENCE_LENGTH] = value
+                self._head[p] = np.where(correction, self._head[p], (self._head[p] + 1) % SEQUENCE_LENGTH)
+                self.last_dates[p] = date
+            self.appended += len(pairs)
+
+
+class HistoryJournal:
+    """
+    Persistence of a `HistoryStore` in a directory shared by server processes.
+
+    `snapshot.npz` holds the full state up to log generation g; appends go to
+    `appends-<generation>.log`, one JSON line per ingested batch. Every
+    process applies the log lines in file order (its own included), so all
+    workers converge on the same state. Appends and compaction (a new
+    snapshot, then removal of the logs it covers) hold an exclusive lock on
+    the directory, processes following the log a shared one.
+
+    Methods block on file locks and fsync: servers call them from a worker
+    thread, one at a time. Each log line is applied to the store at once.
+    """
+
+    def __init__(self, directory: str, store: HistoryStore, region_vocab: Vocabulary,
+                 disease_vocab: Vocabulary, snapshot_every: int = 10000):
+        """
+        Args:
+            directory: store directory (created if missing)
+            snapshot_every: records appended to a log before it is compacted
+        """
+        self.directory = directory
+        self.store = store
+        self.region_vocab = region_vocab
+        self.disease_vocab = disease_vocab
+        self.snapshot_every = snapshot_every
+
+        self.generation = 0  # generation of the log being followed
+        self._log = None
+        self._offset = 0
+        self.log_records = 0  # records in logs newer than the snapshot
+        self.snapshots = 0
+        os.makedirs(directory, exist_ok=True)
+
+    def _log_path(self, generation: int) -> str:
+        return os.path.join(self.directory, f"appends-{generation:06d}.log")
+
+    def _log_generations(self) -> list:
+        return sorted(
+            int(name[len("appends-"):-len(".log")]) for name in os.listdir(self.directory)
+            if name.startswith("appends-") and name.endswith(".log")
+        )
+
+    @contextmanager
+    def _locked(self, exclusive: bool = True):
+        with open(os.path.join(self.directory, LOCK_FILE), 'a') as lock:
+            if fcntl is not None:
+                fcntl.flock(lock, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+            yield
+
+    # --- Loading -------------------------------------------------------------
+
+    def open(self, seed: Optional[Callable[[], Optional[HistoryTable]]] = None):
+        """
+        Load the snapshot and replay the newer logs. Without a snapshot the
+        store is seeded from `seed()` (if given and not None) and a first
+        snapshot is written.
+        """
+        with self._locked():
+            if os.path.exists(os.path.join(self.directory, SNAPSHOT_FILE)):
+                self._load()
+            else:
+                table = seed() if seed is not None else None
+                if table is not None:
+                    self.store.seed(table)
+                self._follow(self._write_snapshot(0) + 1)
+
+    def _load(self):
+        """Snapshot into the store, then the logs after it (caller holds a lock)."""
+        with np.load(os.path.join(self.directory, SNAPSHOT_FILE), allow_pickle=False) as snapshot:
+            generation = int(snapshot["generation"])
+            # Pairs are stored by name: indices are remapped to the current vocabularies
+            region_idx = self.region_vocab.encode(snapshot["regions"].tolist())[snapshot["region_idx"]]
+            disease_idx = self.disease_vocab.encode(snapshot["diseases"].tolist())[snapshot["disease_idx"]]
+            known = (region_idx >= 0) & (disease_idx >= 0)
+            self.store.seed(HistoryTable(
+                region_idx[known], disease_idx[known], snapshot["windows"][known],
+                snapshot["last_dates"][known].astype('datetime64[D]'),
+                self.store.num_regions, self.store.num_diseases
+            ))
+        self.log_records = 0
+        self._follow(generation + 1)
+        self.catch_up()
+
+    def _follow(self, generation: int):
+        if self._log is not None:
+            self._log.close()
+        self.generation = generation
+        self._log = open(self._log_path(generation), 'a+b')
+        self._offset = 0
+
+    def reload(self):
+        """Rebuild the store from disk, after missing a compaction made elsewhere (caller holds a lock)."""
+        with self.store.lock:  # readers wait rather than see the store half rebuilt
+            self.store.reset()
+            self._load()
+
+    # --- Following -----------------------------------------------------------
+
+    def poll(self) -> int:
+        """Apply what other processes appended since the last call; returns records applied."""
+        with self._locked(exclusive=False):
+            return self.catch_up()
+
+    def catch_up(self) -> int:
+        """Apply log lines not applied yet, in file order (caller holds a lock)."""
+        applied = 0
+        while True:
+            self._log.seek(self._offset)
+            data = self._log.read()
+            complete = data[:data.rfind(b'\n') + 1]
+            self._offset += len(complete)
+            for line in complete.splitlines():
+                applied += self._apply(json.loads(line))
+
+            next_log = self._log_path(self.generation + 1)
+            if os.path.exists(next_log):
+                self._follow(self.generation + 1)  # compacted elsewhere: the old log is complete
+            elif any(g > self.generation for g in self._log_generations()):
+                self.reload()  # missed a whole generation
+                return applied
+            else:
+                return applied
+
+    def _apply(self, record: dict) -> int:
+        region_idx = self.region_vocab.encode(record["regions"])
+        disease_idx = self.disease_vocab.encode(record["diseases"])
+        dates = np.array(record["dates"], dtype='datetime64[D]')
+        known = (region_idx >= 0) & (disease_idx >= 0)
+        region_idx, disease_idx, dates = region_idx[known], disease_idx[known], dates[known]
+        cases_log = encode_history(np.maximum(np.asarray(record["cases"], dtype=np.float64)[known], 0))
+
+        ok = self.store.check(region_idx, disease_idx, dates)
+        self.store.append(region_idx[ok], disease_idx[ok], dates[ok], cases_log[ok])
+        self.log_records += int(ok.sum())
+        return int(ok.sum())
+
+    # --- Writing -------------------------------------------------------------
+
+    def append(self, region_idx, disease_idx, dates, cases) -> np.ndarray:
+        """
+        Validate, log and apply weekly values.
+
+        Args:
+            region_idx, disease_idx: (n,) encoded pairs
+            dates: (n,) datetime64[D] week of each value
+            cases: (n,) case counts (natural scale)
+
+        Returns:
+            (n,) bool, False for records rejected as older than the pair's newest value
+        """
+        region_idx = np.asarray(region_idx, dtype=np.int64)
+        disease_idx = np.asarray(disease_idx, dtype=np.int64)
+        dates = np.asarray(dates, dtype='datetime64[D]')
+        cases = np.asarray(cases, dtype=np.float64)
+
+        with self._locked():
+            self.catch_up()
+            ok = self.store.check(region_idx, disease_idx, dates)
+            if ok.any():
+                line = json.dumps({
+                    "regions": [self.region_vocab.classes[i] for i in region_idx[ok].tolist()],
+                    "diseases": [self.disease_vocab.classes[i] for i in disease_idx[ok].tolist()],
+                    "dates": [str(d) for d in dates[ok]],
+                    "cases": cases[ok].tolist()
+                })
+                self._log.write(line.encode() + b'\n')
+                self._log.flush()
+                os.fsync(self._log.fileno())
+                self.catch_up()
+                if self.log_records >= self.snapshot_every:
+                    self.compact()
+        return ok
+
+    def compact(self):
+        """Snapshot the current state and drop the logs it covers (caller holds the lock)."""
+        covered = self.generation
+        self._write_snapshot(covered)
+        self._follow(covered + 1)
+        for generation in self._log_generations():
+            if generation <= covered:
+                os.remove(self._log_path(generation))
+        self.log_records = 0
+
+    def _write_snapshot(self, generation: int) -> int:
+        table = self.store.table()
+        path = os.path.join(self.directory, SNAPSHOT_FILE)
+        tmp = path + '.tmp.npz'
+        np.savez(
+            tmp,
+            generation=np.int64(generation),
+            regions=np.array(self.region_vocab.classes), diseases=np.array(self.disease_vocab.classes),
+            region_idx=table.region_idx, disease_idx=table.disease_idx, windows=table.windows,
+            last_dates=table.last_dates.astype(np.int64)
+        )
+        os.replace(tmp, path)
+        self.snapshots += 1
+        return generation
+
+    def close(self):
+        if self._log is not None:
+            self._log.close()
+            self._log = None
+
+    def stats(self) -> dict:
+        return {
+            "directory": self.directory,
+            "generation": self.generation,
+            "log_records": self.log_records,
+            "snapshots_written": self.snapshots
+        }
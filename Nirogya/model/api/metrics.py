@@ -0,0 +1,250 @@
+"""
+Serving metrics in the Prometheus text exposition format
+Dependency-free counters, fixed-bucket histograms and callback gauges, cheap
+enough to record on every request (one perf_counter, one bisect, one lock)
+"""
+import bisect
+import os
+import resource
+import threading
+import time
+from typing import Callable, Dict, Sequence, Tuple
+
+# Seconds; spans cache hits (sub-millisecond) to large batch forwards
+LATENCY_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025,
+                   0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+# Rows / items per call
+SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128, 256, 512, 1024, 2048, 4096, 8192, 16384)
+
+
+def _escape(value) -> str:
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(names, values, extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _number(value) -> str:
+    if value == float('inf'):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    """Monotonic counter, optionally split by labels."""
+
+    type = "counter"
+
+    def __init__(self, name: str, help: str, label_names: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.label_names = tuple(label_names)
+        self._values: Dict[Tuple, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *label_values, amount: float = 1):
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def collect(self) -> list:
+        with self._lock:
+            values = list(self._values.items())
+        return [f"{self.name}{_labels(self.label_names, labels)} {_number(value)}" for labels, value in values]
+
+
+class Histogram:
+    """Fixed-bucket histogram (cumulative buckets, sum and count per label set)."""
+
+    type = "histogram"
+
+    def __init__(self, name: str, help: str, buckets: Sequence[float] = LATENCY_BUCKETS,
+                 label_names: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.buckets = tuple(buckets)
+        self.label_names = tuple(label_names)
+        self._series: Dict[Tuple, list] = {}  # labels -> [bucket counts..., +Inf count, sum]
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *label_values):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                series = self._series[label_values] = [0] * (len(self.buckets) + 1) + [0.0]
+            series[index] += 1
+            series[-1] += value
+
+    def collect(self) -> list:
+        with self._lock:
+            snapshot = [(labels, list(series)) for labels, series in self._series.items()]
+
+        lines = []
+        for labels, series in snapshot:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float('inf'),), series[:-1]):
+                cumulative += count
+                le = 'le="' + _number(bound) + '"'
+                lines.append(f"{self.name}_bucket{_labels(self.label_names, labels, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(self.label_names, labels)} {_number(series[-1])}")
+            lines.append(f"{self.name}_count{_labels(self.label_names, labels)} {cumulative}")
+        return lines
+
+
+class CallbackMetric:
+    """Gauge or counter whose value is read from `fn` at scrape time."""
+
+    def __init__(self, name: str, help: str, fn: Callable, type: str = "gauge",
+                 label_names: Sequence[str] = ()):
+        """
+        Args:
+            fn: returns a number, or {label values tuple: number} when
+                `label_names` is given; None skips the metric
+        """
+        self.name = name
+        self.help = help
+        self.fn = fn
+        self.type = type
+        self.label_names = tuple(label_names)
+
+    def collect(self) -> list:
+        value = self.fn()
+        if value is None:
+            return []
+        if not self.label_names:
+            return [f"{self.name} {_number(value)}"]
+        return [f"{self.name}{_labels(self.label_names, labels)} {_number(v)}" for labels, v in value.items()]
+
+
+class MetricsRegistry:
+    """Ordered collection of metrics rendered together by `render`."""
+
+    def __init__(self):
+        self._metrics = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def counter(self, name, help, label_names=()) -> Counter:
+        return self.register(Counter(name, help, label_names))
+
+    def histogram(self, name, help, buckets=LATENCY_BUCKETS, label_names=()) -> Histogram:
+        return self.register(Histogram(name, help, buckets, label_names))
+
+    def callback(self, name, help, fn, type="gauge", label_names=()) -> CallbackMetric:
+        return self.register(CallbackMetric(name, help, fn, type, label_names))
+
+    def render(self) -> str:
+        """All metrics in the Prometheus text exposition format (version 0.0.4)."""
+        lines = []
+        for metric in self._metrics:
+            samples = metric.collect()
+            if samples:
+                lines.append(f"# HELP {metric.name} {metric.help}")
+                lines.append(f"# TYPE {metric.name} {metric.type}")
+                lines.extend(samples)
+        return "\n".join(lines) + "\n"
+
+
+class StageTimer:
+    """Records the time since the previous mark under (endpoint, stage)."""
+
+    __slots__ = ('histogram', 'endpoint', 'last')
+
+    def __init__(self, histogram: Histogram, endpoint: str):
+        self.histogram = histogram
+        self.endpoint = endpoint
+        self.last = time.perf_counter()
+
+    def mark(self, stage: str):
+        now = time.perf_counter()
+        self.histogram.observe(now - self.last, self.endpoint, stage)
+        self.last = now
+
+
+def process_memory_bytes() -> int:
+    """Current resident set size (Linux), else the peak RSS from getrusage."""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError):
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if os.uname().sysname == 'Darwin' else peak * 1024
+
+
+class ServingMetrics:
+    """The prediction API's metrics (see README for the list)."""
+
+    def __init__(self):
+        self.registry = MetricsRegistry()
+        registry = self.registry
+
+        self.requests = registry.counter(
+            'nirogya_requests_total', "HTTP requests by endpoint and outcome", ('endpoint', 'outcome'))
+        self.request_seconds = registry.histogram(
+            'nirogya_request_duration_seconds', "End-to-end request latency", label_names=('endpoint',))
+        self.stage_seconds = registry.histogram(
+            'nirogya_stage_duration_seconds', "Latency of each stage inside an endpoint",
+            label_names=('endpoint', 'stage'))
+        self.request_items = registry.histogram(
+            'nirogya_request_items', "Items per batch/forecast request", SIZE_BUCKETS, ('endpoint',))
+        self.items = registry.counter(
+            'nirogya_items_total', "Batch/forecast items by endpoint and outcome", ('endpoint', 'outcome'))
+        self.forward_seconds = registry.histogram(
+            'nirogya_forward_duration_seconds', "Model forward pass latency (one chunk)")
+        self.forward_rows = registry.histogram(
+            'nirogya_forward_batch_size', "Rows per model forward pass", SIZE_BUCKETS)
+        registry.callback(
+            'nirogya_process_resident_memory_bytes', "Resident memory of this worker process",
+            process_memory_bytes)
+
+    def stage_timer(self, endpoint: str) -> StageTimer:
+        return StageTimer(self.stage_seconds, endpoint)
+
+    def render(self) -> str:
+        return self.registry.render()
+
+
+class MetricsMiddleware:
+    """
+    ASGI middleware counting requests by outcome and timing them end to end.
+
+    Plain ASGI (not BaseHTTPMiddleware) to keep the per-request overhead low.
+    Paths not served by the app are reported as endpoint="other" so scans
+    cannot blow up label cardinality.
+    """
+
+    def __init__(self, app, metrics: ServingMetrics):
+        self.app = app
+        self.metrics = metrics
+        self._paths = None  # route paths, read from the app on the first request
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        status = [500]
+
+        async def send_with_status(message):
+            if message['type'] == 'http.response.start':
+                status[0] = message['status']
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            if self._paths is None:
+                self._paths = {getattr(route, 'path', None) for route in scope['app'].routes}
+            path = scope['path']
+            endpoint = path if path in self._paths else "other"
+            code = status[0]
+            outcome = "success" if code < 400 else "client_error" if code < 500 else "server_error"
+            self.metrics.requests.inc(endpoint, outcome)
+            self.metrics.request_seconds.observe(time.perf_counter() - started, endpoint)
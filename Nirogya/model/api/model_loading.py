@@ -0,0 +1,252 @@
+"""
+Model loading and export helpers shared by the API and the export script
+"""
+import hashlib
+import json
+import os
+import warnings
+
+import numpy as np
+import torch
+import torch.nn as nn
+
+from improved_model_v2 import ImprovedDiseaseLSTM
+
+
+# Architecture of the served V2 models
+MODEL_CONFIG = {
+    "embedding_dim": 64,
+    "hidden_size": 256,
+    "num_layers": 5,
+    "num_heads": 4,
+    "dropout": 0.3
+}
+
+
+def build_model(num_regions: int, num_diseases: int, init_weights: bool = True) -> ImprovedDiseaseLSTM:
+    """
+    Create an ImprovedDiseaseLSTM with the serving architecture.
+
+    Pass init_weights=False when trained weights are loaded right after; the
+    orthogonal LSTM initialisation dominates model construction time.
+    """
+    return ImprovedDiseaseLSTM(
+        num_regions=num_regions,
+        num_diseases=num_diseases,
+        init_weights=init_weights,
+        **MODEL_CONFIG
+    )
+
+
+def load_checkpoint_model(path: str, num_regions: int = None, num_diseases: int = None,
+                          device='cpu') -> ImprovedDiseaseLSTM:
+    """
+    Build the eager model and load weights from a training checkpoint (eval mode).
+
+    Vocabulary sizes default to the shapes of the checkpoint's embeddings.
+    """
+    checkpoint = torch.load(path, map_location=device)
+    state_dict = checkpoint.get('model_state_dict', checkpoint)
+
+    if num_regions is None:
+        num_regions = state_dict['region_embedding.weight'].shape[0]
+    if num_diseases is None:
+        num_diseases = state_dict['disease_embedding.weight'].shape[0]
+
+    model = build_model(num_regions, num_diseases, init_weights=False).to(device)
+    model.load_state_dict(state_dict)
+    model.eval()
+    return model
+
+
+def describe_model(model: ImprovedDiseaseLSTM) -> dict:
+    """Vocabulary sizes and weights fingerprint, stored with every exported artifact."""
+    return {
+        "num_regions": model.region_embedding.num_embeddings,
+        "num_diseases": model.disease_embedding.num_embeddings,
+        "weights_fingerprint": weights_fingerprint(model)
+    }
+
+
+def quantize_dynamic_int8(model: ImprovedDiseaseLSTM) -> nn.Module:
+    """
+    Dynamic int8 quantization of the LSTM and Linear layers (CPU only).
+
+    Weights are stored as int8, activations are quantized on the fly;
+    embeddings, LayerNorm and BatchNorm stay in fp32.
+    """
+    return torch.ao.quantization.quantize_dynamic(
+        model.cpu().eval(), {nn.LSTM, nn.Linear}, dtype=torch.qint8
+    )
+
+
+def weights_fingerprint(net) -> str:
+    """Short hash of a model's weights, used to invalidate cached predictions."""
+    h = hashlib.sha1()
+    for name, tensor in net.state_dict().items():
+        h.update(name.encode())
+        h.update(tensor.detach().cpu().numpy().tobytes())
+    return h.hexdigest()[:12]
+
+
+def example_inputs(num_regions: int, num_diseases: int, batch_size: int = 4, device='cpu'):
+    """Random (x, region_idx, disease_idx, temporal) inputs for tracing and parity checks."""
+    generator = torch.Generator().manual_seed(0)
+    return (
+        torch.log1p(torch.rand(batch_size, 14, generator=generator) * 50).to(device),
+        torch.randint(0, num_regions, (batch_size,), generator=generator).to(device),
+        torch.randint(0, num_diseases, (batch_size,), generator=generator).to(device),
+        (torch.rand(batch_size, 5, generator=generator) * 2 - 1).to(device)
+    )
+
+
+def export_torchscript(model: ImprovedDiseaseLSTM, path: str, metadata: dict = None) -> dict:
+    """
+    Trace and freeze an eval-mode model into a TorchScript inference artifact.
+
+    The batch axis stays dynamic. `metadata` (plus vocabulary sizes and the
+    weights fingerprint) is stored inside the artifact as metadata.json.
+
+    Returns:
+        the stored metadata
+    """
+    model.eval()
+    num_regions = model.region_embedding.num_embeddings
+    num_diseases = model.disease_embedding.num_embeddings
+
+    metadata = dict(metadata or {})
+    metadata.update(format="torchscript", **describe_model(model))
+
+    device = next(model.parameters()).device
+    with torch.no_grad():
+        traced = torch.jit.trace(model, example_inputs(num_regions, num_diseases, device=device))
+        frozen = torch.jit.freeze(traced)
+
+    torch.jit.save(frozen, path, _extra_files={"metadata.json": json.dumps(metadata)})
+    return metadata
+
+
+ONNX_INPUT_NAMES = ['x', 'region_idx', 'disease_idx', 'temporal']
+ONNX_OUTPUT_NAMES = ['pred_log']
+
+
+def export_onnx(model: ImprovedDiseaseLSTM, path: str, metadata: dict = None) -> dict:
+    """
+    Export an eval-mode model (embeddings, temporal inputs, dynamic batch axis) to ONNX.
+
+    `metadata` (plus vocabulary sizes and the weights fingerprint) is stored
+    as the `nirogya` entry of the model's metadata_props.
+
+    Returns:
+        the stored metadata
+    """
+    import onnx  # optional dependency, only needed at export time
+
+    model = model.cpu().eval()
+    num_regions = model.region_embedding.num_embeddings
+    num_diseases = model.disease_embedding.num_embeddings
+
+    metadata = dict(metadata or {})
+    metadata.update(format="onnx", **describe_model(model))
+
+    with torch.no_grad():
+        torch.onnx.export(
+            model,
+            example_inputs(num_regions, num_diseases),
+            path,
+            input_names=ONNX_INPUT_NAMES,
+            output_names=ONNX_OUTPUT_NAMES,
+            dynamic_axes={name: {0: 'batch'} for name in ONNX_INPUT_NAMES + ONNX_OUTPUT_NAMES},
+            opset_version=17,
+            dynamo=False
+        )
+
+    onnx_model = onnx.load(path)
+    entry = onnx_model.metadata_props.add()
+    entry.key = "nirogya"
+    entry.value = json.dumps(metadata)
+    onnx.save(onnx_model, path)
+
+    return metadata
+
+
+MMAP_MANIFEST = 'manifest.json'
+
+
+def export_npy_weights(model: ImprovedDiseaseLSTM, directory: str, metadata: dict = None,
+                       fp16: bool = False) -> dict:
+    """
+    Write the model's state_dict as one raw .npy file per tensor plus a manifest.
+
+    Unlike a torch.save checkpoint, the files hold weights only and can be
+    memory-mapped read-only (`load_mmap_model`), so every server process maps
+    the same page-cache pages instead of holding a private copy of the weights.
+    With fp16=True floating point tensors are stored in half precision (half
+    the size on disk, but loading upcasts them into a private fp32 copy).
+
+    Returns:
+        the stored metadata
+    """
+    model = model.cpu().eval()
+    os.makedirs(directory, exist_ok=True)
+
+    metadata = dict(metadata or {})
+    metadata.update(format="npy", dtype="float16" if fp16 else "float32", **describe_model(model))
+    if fp16:
+        metadata["weights_fingerprint"] += "-fp16"
+
+    tensors = {}
+    for name, tensor in model.state_dict().items():
+        array = tensor.numpy()
+        if fp16 and array.dtype == np.float32:
+            array = array.astype(np.float16)
+        filename = f"{name}.npy"
+        np.save(os.path.join(directory, filename), np.ascontiguousarray(array))
+        tensors[name] = filename
+
+    with open(os.path.join(directory, MMAP_MANIFEST), 'w') as f:
+        json.dump({"metadata": metadata, "tensors": tensors}, f, indent=2)
+    return metadata
+
+
+def load_mmap_model(directory: str):
+    """
+    Build the eager model on top of read-only memory-mapped weights (CPU only).
+
+    The mapped arrays are assigned as the module's parameters, so no private
+    copy of the weights is kept (except for fp16 files, which are upcast).
+
+    Returns:
+        (model in eval mode, metadata dict)
+    """
+    with open(os.path.join(directory, MMAP_MANIFEST)) as f:
+        manifest = json.load(f)
+    metadata = manifest["metadata"]
+
+    state_dict = {}
+    with warnings.catch_warnings():
+        # torch warns that the arrays are not writable; inference never writes them
+        warnings.simplefilter("ignore", UserWarning)
+        for name, filename in manifest["tensors"].items():
+            array = np.load(os.path.join(directory, filename), mmap_mode='r')
+            if array.dtype == np.float16:
+                array = array.astype(np.float32)
+            state_dict[name] = torch.from_numpy(array)
+
+    model = build_model(metadata["num_regions"], metadata["num_diseases"], init_weights=False)
+    model.load_state_dict(state_dict, assign=True)
+    model.eval()
+    return model, metadata
+
+
+def load_torchscript(path: str, device):
+    """
+    Load a TorchScript artifact written by `export_torchscript`.
+
+    Returns:
+        (scripted module, metadata dict)
+    """
+    extra_files = {"metadata.json": ""}
+    scripted = torch.jit.load(path, map_location=device, _extra_files=extra_files)
+    scripted.eval()
+    return scripted, json.loads(extra_files["metadata.json"])
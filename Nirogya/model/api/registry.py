@@ -0,0 +1,191 @@
+"""
+Local registry of versioned model artifacts
+
+Each version is a deploy artifact directory (the layout written by
+export_model.py --format npy: .npy weights, manifest.json and
+vocabularies.json) plus version.json with its registration metadata. The
+ACTIVE file names the version the API servers should serve; every worker
+follows it (see NIROGYA_REGISTRY_POLL_SECONDS in app_v2.py).
+
+Usage:
+    cd api
+    python registry.py register --version 2025-11-15 --checkpoint ../models/improved_lstm_v2_model5_best.pt
+    python registry.py register --version 2025-11-22 --checkpoint new.pt --notes "retrained" --activate
+    python registry.py list
+    python registry.py activate 2025-11-15
+"""
+import argparse
+import json
+import os
+import re
+import shutil
+import sys
+from datetime import datetime
+from typing import List, Optional
+
+import torch
+sys.path.append('../notebooks')
+
+from preprocessing import load_vocabularies, save_vocabularies
+from model_loading import MMAP_MANIFEST, export_npy_weights, load_checkpoint_model, load_mmap_model
+
+DEFAULT_REGISTRY = '../models/registry'
+VERSION_FILE = 'version.json'
+ACTIVE_FILE = 'ACTIVE'
+VERSION_PATTERN = re.compile(r'^[A-Za-z0-9][A-Za-z0-9._-]*$')
+
+
+class ModelRegistry:
+    """Versioned deploy artifacts under one root directory."""
+
+    def __init__(self, root: str = DEFAULT_REGISTRY):
+        self.root = root
+
+    def path(self, version: str) -> str:
+        """Artifact directory of `version`; raises ValueError for unsafe names."""
+        if not VERSION_PATTERN.match(version):
+            raise ValueError(f"invalid version name: {version!r}")
+        return os.path.join(self.root, version)
+
+    def exists(self, version: str) -> bool:
+        try:
+            path = self.path(version)
+        except ValueError:
+            return False
+        return os.path.exists(os.path.join(path, VERSION_FILE)) and os.path.exists(os.path.join(path, MMAP_MANIFEST))
+
+    def describe(self, version: str) -> dict:
+        """Registration metadata of `version`; raises KeyError if it is not registered."""
+        if not self.exists(version):
+            raise KeyError(version)
+        with open(os.path.join(self.path(version), VERSION_FILE)) as f:
+            return json.load(f)
+
+    def versions(self) -> List[dict]:
+        """Metadata of every registered version, oldest first."""
+        if not os.path.isdir(self.root):
+            return []
+        infos = [self.describe(name) for name in os.listdir(self.root) if self.exists(name)]
+        return sorted(infos, key=lambda info: info["registered_at"])
+
+    def active(self) -> Optional[str]:
+        """Version named by the ACTIVE file, or None."""
+        try:
+            with open(os.path.join(self.root, ACTIVE_FILE)) as f:
+                return f.read().strip() or None
+        except FileNotFoundError:
+            return None
+
+    def set_active(self, version: Optional[str]):
+        """Point ACTIVE at `version` (atomic rename); None removes the pointer."""
+        path = os.path.join(self.root, ACTIVE_FILE)
+        if version is None:
+            if os.path.exists(path):
+                os.remove(path)
+            return
+        if not self.exists(version):
+            raise KeyError(version)
+
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, 'w') as f:
+            f.write(version + "\n")
+        os.replace(tmp, path)
+
+    def register(self, model, version: str, region_classes, disease_classes,
+                 metadata: dict = None, fp16: bool = False) -> dict:
+        """
+        Store `model` as a new version.
+
+        The artifact is written to a temporary directory and renamed into
+        place, so servers never see a partially written version.
+
+        Returns:
+            the version's metadata (as written to version.json)
+        """
+        path = self.path(version)
+        if os.path.exists(path):
+            raise FileExistsError(f"version {version} is already registered")
+
+        os.makedirs(self.root, exist_ok=True)
+        tmp = f"{path}.{os.getpid()}.tmp"
+        try:
+            manifest = export_npy_weights(model, tmp, metadata, fp16=fp16)
+            save_vocabularies(os.path.join(tmp, 'vocabularies.json'), region_classes, disease_classes)
+            info = {"version": version, "registered_at": datetime.now().isoformat(timespec='seconds'), **manifest}
+            with open(os.path.join(tmp, VERSION_FILE), 'w') as f:
+                json.dump(info, f, indent=2)
+            os.rename(tmp, path)
+        except BaseException:
+            shutil.rmtree(tmp, ignore_errors=True)
+            raise
+        return info
+
+    def load(self, version: str):
+        """
+        Memory-map the weights of `version` (CPU only).
+
+        Returns:
+            (model, metadata, (region_vocab, disease_vocab)); metadata
+            includes the registry version under "registry_version"
+        """
+        info = self.describe(version)
+        path = self.path(version)
+        model, metadata = load_mmap_model(path)
+        vocabularies = load_vocabularies(os.path.join(path, 'vocabularies.json'))
+        return model, {**metadata, "registry_version": info["version"]}, vocabularies
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Manage the local model registry")
+    parser.add_argument('--registry', default=DEFAULT_REGISTRY)
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    register = commands.add_parser('register', help="add a checkpoint as a new version")
+    register.add_argument('--version', required=True)
+    register.add_argument('--checkpoint', default='../models/improved_lstm_v2_model5_best.pt')
+    register.add_argument('--vocab', default='../models/vocabularies.json')
+    register.add_argument('--notes', default='')
+    register.add_argument('--fp16', action='store_true', help="store the weights in half precision")
+    register.add_argument('--activate', action='store_true', help="make it the active version")
+
+    commands.add_parser('list', help="show registered versions")
+
+    activate = commands.add_parser('activate', help="point ACTIVE at a version")
+    activate.add_argument('version')
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    registry = ModelRegistry(args.registry)
+
+    if args.command == 'register':
+        region_vocab, disease_vocab = load_vocabularies(args.vocab)
+        model = load_checkpoint_model(args.checkpoint, len(region_vocab), len(disease_vocab), torch.device('cpu'))
+        metadata = {"checkpoint": os.path.basename(args.checkpoint), "notes": args.notes}
+
+        print(f"📦 Registering {args.checkpoint} as {args.version}")
+        info = registry.register(model, args.version, region_vocab.classes, disease_vocab.classes,
+                                 metadata, fp16=args.fp16)
+        print(f"✅ Registered {info['version']} (weights {info['weights_fingerprint']})")
+        if args.activate:
+            registry.set_active(args.version)
+            print(f"✅ Active version: {args.version}")
+
+    elif args.command == 'list':
+        active = registry.active()
+        versions = registry.versions()
+        if not versions:
+            print(f"No versions registered in {registry.root}")
+        for info in versions:
+            marker = "*" if info["version"] == active else " "
+            print(f" {marker} {info['version']:24s} {info['registered_at']}  {info['weights_fingerprint']}  "
+                  f"{info.get('checkpoint', '')}  {info.get('notes', '')}")
+
+    elif args.command == 'activate':
+        registry.set_active(args.version)
+        print(f"✅ Active version: {args.version}")
+
+
+if __name__ == "__main__":
+    main()
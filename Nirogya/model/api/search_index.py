@@ -0,0 +1,97 @@
+"""
+Case-insensitive autocomplete over region and disease names
+Built once from a vocabulary: every word-suffix of every name goes into a
+sorted key list, so a prefix query is a bisect plus a scan of the matches.
+"""
+import bisect
+import difflib
+import re
+from typing import Callable, List, Optional
+
+
+def normalize(text: str) -> str:
+    """Lower-case, with underscores and runs of whitespace collapsed to one space."""
+    return " ".join(re.split(r'[\s_]+', text.lower())).strip()
+
+
+class _Keys:
+    """Sorted (key, name id) pairs of one search scope."""
+
+    def __init__(self, normalized: List[str], ids: List[int]):
+        entries = sorted(
+            (" ".join(words[start:]), i)
+            for i in ids
+            for words in [normalized[i].split(" ")]
+            for start in range(len(words))
+        )
+        self.keys = [key for key, _ in entries]
+        self.ids = [i for _, i in entries]
+        self.members = sorted(ids, key=lambda i: normalized[i])
+
+
+class NameIndex:
+    """
+    Prefix search over names, optionally scoped (e.g. regions of one state).
+
+    A query matches names where any word starts the query, so "mum" and
+    "maharashtra_mu" both find "Maharashtra_Mumbai". Prefix matches come
+    first, then substring matches, then close spellings (difflib) when
+    nothing else matched.
+    """
+
+    def __init__(self, names, scope: Optional[Callable[[str], str]] = None):
+        """
+        Args:
+            names: names to index (e.g. `Vocabulary.classes`)
+            scope: name -> scope key, enabling `search(..., scope=key)`
+        """
+        self.names = list(names)
+        self._normalized = [normalize(name) for name in self.names]
+        self._all = _Keys(self._normalized, list(range(len(self.names))))
+
+        self._scopes = {}
+        if scope is not None:
+            groups = {}
+            for i, name in enumerate(self.names):
+                groups.setdefault(normalize(scope(name)), []).append(i)
+            self._scopes = {key: _Keys(self._normalized, ids) for key, ids in groups.items()}
+
+    def __len__(self):
+        return len(self.names)
+
+    def scope_size(self, scope: Optional[str] = None) -> int:
+        """Number of names searched for `scope` (0 for an unknown scope)."""
+        if scope is None:
+            return len(self.names)
+        index = self._scopes.get(normalize(scope))
+        return len(index.members) if index is not None else 0
+
+    def search(self, query: str, limit: int = 10, scope: Optional[str] = None) -> List[str]:
+        """Up to `limit` names matching `query`, best first."""
+        index = self._all if scope is None else self._scopes.get(normalize(scope))
+        if index is None:
+            return []
+
+        q = normalize(query)
+        if not q:
+            return [self.names[i] for i in index.members[:limit]]
+
+        found = {}  # insertion-ordered set of name ids
+        start = bisect.bisect_left(index.keys, q)
+        for pos in range(start, len(index.keys)):
+            if not index.keys[pos].startswith(q) or len(found) == limit:
+                break
+            found.setdefault(index.ids[pos])
+
+        if len(found) < limit:
+            for i in index.members:
+                if q in self._normalized[i]:
+                    found.setdefault(i)
+                    if len(found) == limit:
+                        break
+
+        if not found:
+            for key in difflib.get_close_matches(q, index.keys, n=limit, cutoff=0.75):
+                found.setdefault(index.ids[bisect.bisect_left(index.keys, key)])
+
+        return [self.names[i] for i in list(found)[:limit]]
@@ -0,0 +1,77 @@
+"""
+Multi-worker launcher for the V2 API
+
+Starts `app_v2:app` under uvicorn with several worker processes that all
+memory-map the same read-only .npy weights (NIROGYA_WEIGHTS_MMAP=1), so the
+weights are held once in the page cache instead of once per worker.
+
+Usage:
+    cd api
+    python export_model.py --format npy     # once, writes ../models/improved_lstm_v2_model5_weights/
+    python serve.py --workers 4
+    python serve.py --workers 4 --private-weights   # every worker loads its own copy
+    python serve.py --workers 4 --autotune          # measure a serving profile first if there is none
+
+A serving profile written by autotune.py for this worker count supplies the
+backend, thread and batch settings (see NIROGYA_SERVING_PROFILE in app_v2.py).
+"""
+import argparse
+import os
+import sys
+
+import uvicorn
+
+from autotune import DEFAULT_PROFILE, apply_serving_profile, ensure_profile, load_serving_profile
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Run the V2 API with several workers")
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--host', default='0.0.0.0')
+    parser.add_argument('--port', type=int, default=8000)
+    parser.add_argument('--weights', default='../models/improved_lstm_v2_model5_weights',
+                        help="directory written by export_model.py --format npy")
+    parser.add_argument('--private-weights', action='store_true',
+                        help="load a private copy of the checkpoint in every worker")
+    parser.add_argument('--autotune', action='store_true',
+                        help="run autotune.py for this worker count unless a matching serving profile exists")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+
+    if args.private_weights:
+        os.environ['NIROGYA_WEIGHTS_MMAP'] = '0'
+    else:
+        if not os.path.exists(os.path.join(args.weights, 'manifest.json')):
+            print(f"❌ No memory-mapped weights in {args.weights}")
+            print("   Run: python export_model.py --format npy")
+            sys.exit(1)
+        os.environ['NIROGYA_WEIGHTS_MMAP'] = '1'
+        os.environ['NIROGYA_WEIGHTS_MMAP_PATH'] = args.weights
+
+    # Workers apply the profile themselves; applying it here too keeps its thread
+    # count from being replaced by the even split below
+    profile_path = os.environ.get('NIROGYA_SERVING_PROFILE', DEFAULT_PROFILE)
+    if args.autotune and profile_path:
+        profile = ensure_profile(profile_path, server_workers=args.workers, quick=False)
+    else:
+        profile = load_serving_profile(profile_path, server_workers=args.workers)
+    if profile is not None:
+        apply_serving_profile(profile)
+        print(f"🔧 Serving profile {profile_path} ({profile['created_at']})")
+    
+    # Split the cores between workers unless the thread count is set explicitly
+    if 'NIROGYA_INFERENCE_THREADS' not in os.environ:
+        inference_workers = int(os.environ.get('NIROGYA_INFERENCE_WORKERS', 2))
+        threads = max(1, (os.cpu_count() or 1) // (args.workers * inference_workers))
+        os.environ['NIROGYA_INFERENCE_THREADS'] = str(threads)
+
+    mode = "private weights" if args.private_weights else f"shared weights from {args.weights}"
+    print(f"🚀 Starting {args.workers} worker(s) on http://{args.host}:{args.port} ({mode})")
+    uvicorn.run("app_v2:app", host=args.host, port=args.port, workers=args.workers)
+
+
+if __name__ == "__main__":
+    main()
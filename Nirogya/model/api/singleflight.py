@@ -0,0 +1,55 @@
+"""
+Request coalescing ("singleflight") for identical in-flight predictions
+The first caller for a key starts the computation; callers arriving with the
+same key while it runs await the same result instead of starting their own
+"""
+import asyncio
+from typing import Awaitable, Callable, Dict, Hashable
+
+
+class SingleFlight:
+    """
+    Shares one in-flight computation between concurrent callers of a key.
+
+    The computation runs as its own task, so a caller that goes away (client
+    disconnect) does not cancel it for the others. Its exception, if any, is
+    raised in every caller. Keys are forgotten as soon as the computation
+    finishes: this coalesces concurrent calls, it does not cache results.
+    """
+
+    def __init__(self):
+        self._inflight: Dict[Hashable, asyncio.Future] = {}
+        self.leaders = 0
+        self.coalesced = 0
+
+    async def run(self, key: Hashable, fn: Callable[[], Awaitable]):
+        """Await `fn()`, or the already running call for `key`."""
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(fn())
+            self._inflight[key] = task
+            task.add_done_callback(lambda done: self._finished(key, done))
+            self.leaders += 1
+        else:
+            self.coalesced += 1
+        return await asyncio.shield(task)
+
+    def _finished(self, key, task):
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        if not task.cancelled():
+            task.exception()  # retrieved here too, in case every caller went away
+
+    def __len__(self):
+        return len(self._inflight)
+
+    def stats(self) -> dict:
+        """Computations started, callers that joined one, and current flights."""
+        total = self.leaders + self.coalesced
+        return {
+            "enabled": True,
+            "leaders": self.leaders,
+            "coalesced": self.coalesced,
+            "coalesced_ratio": self.coalesced / total if total else 0.0,
+            "in_flight": len(self._inflight)
+        }
@@ -2,7 +2,16 @@
 Test script for Disease Prediction API V2
 """
 import requests
+import datetime
 import json
+import os
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
 
 BASE_URL = "http://localhost:8000"
 
@@ -23,6 +32,7 @@ def test_health():
     print(json.dumps(data, indent=2))
     assert response.status_code == 200
     assert data['model_loaded'] == True
+    assert 'serving_profile' in data
 
 def test_regions():
     """Test regions endpoint."""
@@ -125,6 +135,577 @@ def test_food_poisoning_example():
     
     assert response.status_code == 200 or response.status_code == 400  # 400 if region not in new data
 
+def test_batch_prediction():
+    """Test batch prediction endpoint with one valid and one invalid item."""
+    print("\n7️⃣ Testing Batch Prediction Endpoint...")
+    
+    regions_response = requests.get(f"{BASE_URL}/regions")
+    diseases_response = requests.get(f"{BASE_URL}/diseases")
+    
+    region = regions_response.json()['regions'][0]
+    disease = diseases_response.json()['diseases'][0]
+    
+    payload = {
+        "items": [
+            {
+                "region": region,
+                "disease": disease,
+                "last_14_days_cases": [0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 8],
+                "prediction_date": "2025-11-15"
+            },
+            {
+                "region": "Unknown_Region",
+                "disease": disease,
+                "last_14_days_cases": [0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 8],
+                "prediction_date": "2025-11-15"
+            }
+        ]
+    }
+    
+    response = requests.post(f"{BASE_URL}/predict_batch", json=payload)
+    print(f"Status: {response.status_code}")
+    data = response.json()
+    print(json.dumps(data, indent=2))
+    
+    assert response.status_code == 200
+    assert data['total'] == 2
+    assert data['succeeded'] == 1
+    assert data['results'][0]['error'] is None
+    assert data['results'][1]['error'] is not None
+
+def test_stats():
+    """Test serving statistics endpoint."""
+    print("\n8️⃣ Testing Stats Endpoint...")
+    response = requests.get(f"{BASE_URL}/stats")
+    print(f"Status: {response.status_code}")
+    data = response.json()
+    print(json.dumps(data, indent=2))
+    assert response.status_code == 200
+    assert 'batching' in data
+    assert 'coalescing' in data
+
+def test_forecast():
+    """Test multi-step forecast endpoint."""
+    print("\n9️⃣ Testing Forecast Endpoint...")
+    
+    regions_response = requests.get(f"{BASE_URL}/regions")
+    diseases_response = requests.get(f"{BASE_URL}/diseases")
+    
+    region = regions_response.json()['regions'][0]
+    disease = diseases_response.json()['diseases'][0]
+    
+    payload = {
+        "items": [
+            {
+                "region": region,
+                "disease": disease,
+                "last_14_days_cases": [0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 8],
+                "prediction_date": "2025-11-15"
+            }
+        ],
+        "horizon": 4
+    }
+    
+    response = requests.post(f"{BASE_URL}/forecast", json=payload)
+    print(f"Status: {response.status_code}")
+    data = response.json()
+    print(json.dumps(data, indent=2))
+    
+    assert response.status_code == 200
+    result = data['results'][0]
+    assert result['error'] is None
+    assert len(result['predicted_cases']) == 4
+    assert result['dates'][:2] == ["2025-11-15", "2025-11-22"]
+
+def test_metrics():
+    """Test Prometheus metrics endpoint."""
+    print("\n🔟 Testing Metrics Endpoint...")
+    response = requests.get(f"{BASE_URL}/metrics")
+    print(f"Status: {response.status_code}")
+    print(response.text[:500])
+    
+    assert response.status_code == 200
+    assert response.headers['content-type'].startswith('text/plain')
+    assert 'nirogya_requests_total{endpoint="/predict",outcome="success"}' in response.text
+    assert 'nirogya_forward_duration_seconds_count' in response.text
+
+def test_predict_stream():
+    """Test streaming NDJSON scoring endpoint."""
+    print("\n1️⃣1️⃣ Testing Stream Endpoint...")
+    disease = requests.get(f"{BASE_URL}/diseases").json()['diseases'][0]
+    
+    response = requests.post(
+        f"{BASE_URL}/predict_stream",
+        json={"diseases": [disease], "chunk_size": 64},
+        stream=True
+    )
+    print(f"Status: {response.status_code}")
+    rows = [json.loads(line) for line in response.iter_lines() if line]
+    print(json.dumps(rows[:2], indent=2))
+    
+    assert response.status_code == 200
+    assert len(rows) == int(response.headers['X-Total-Items'])
+    assert all(row['disease'] == disease for row in rows)
+    assert all('predicted_cases' in row for row in rows)
+
+def test_hotspots():
+    """Test hotspot queries on the precomputed forecast table."""
+    print("\n1️⃣2️⃣ Testing Hotspots Endpoint...")
+    response = requests.get(f"{BASE_URL}/hotspots", params={"rank_by": "growth", "k": 5})
+    print(f"Status: {response.status_code}")
+    data = response.json()
+    print(json.dumps(data, indent=2))
+    
+    assert response.status_code == 200
+    growth = [row['growth_ratio'] for row in data['results']]
+    assert growth == sorted(growth, reverse=True)
+    assert len(growth) == min(5, data['total'])
+    assert data['model_version'] == response.headers['X-Model-Version']  # the version that built the table
+
+def test_region_search():
+    """Test region autocomplete and ETag revalidation of /regions."""
+    print("\n1️⃣3️⃣ Testing Region Search...")
+    region = requests.get(f"{BASE_URL}/regions").json()['regions'][0]
+    state = region.split('_')[0]
+    
+    response = requests.get(f"{BASE_URL}/regions/search", params={"q": region[:3].lower(), "state": state})
+    print(f"Status: {response.status_code}")
+    data = response.json()
+    print(json.dumps(data, indent=2))
+    assert response.status_code == 200
+    assert region in data['matches']
+    assert all(match.startswith(state + '_') for match in data['matches'])
+    
+    etag = requests.get(f"{BASE_URL}/regions").headers['ETag']
+    response = requests.get(f"{BASE_URL}/regions", headers={"If-None-Match": etag})
+    assert response.status_code == 304
+
+def test_batch_msgpack():
+    """Test columnar MessagePack bodies on the batch endpoint."""
+    print("\n1️⃣4️⃣ Testing MessagePack Batch Prediction...")
+    try:
+        import msgpack
+        import numpy as np
+    except ImportError:
+        print("⚠️  msgpack not installed, skipping")
+        return
+    
+    region = requests.get(f"{BASE_URL}/regions").json()['regions'][0]
+    disease = requests.get(f"{BASE_URL}/diseases").json()['diseases'][0]
+    histories = np.zeros((2, 14), dtype='<f4')
+    histories[:, -1] = 8
+    body = msgpack.packb({
+        "regions": [region, "Unknown_Region"],
+        "diseases": [disease, disease],
+        "histories": histories.tobytes(),
+        "prediction_dates": "2025-11-15"
+    })
+    
+    response = requests.post(f"{BASE_URL}/predict_batch", data=body, headers={
+        "Content-Type": "application/msgpack", "Accept": "application/msgpack"
+    })
+    print(f"Status: {response.status_code}")
+    assert response.status_code == 200
+    assert response.headers['Content-Type'].startswith("application/msgpack")
+    data = msgpack.unpackb(response.content)
+    predicted = np.frombuffer(data['predicted_cases'], dtype='<f4')
+    print(f"Predicted: {predicted.tolist()}, errors: {data['errors']}")
+    assert data['succeeded'] == 1
+    assert np.isfinite(predicted[0]) and np.isnan(predicted[1])
+    assert np.frombuffer(data['error_indices'], dtype='<i4').tolist() == [1]
+    assert np.frombuffer(data['baseline_indices'], dtype='<i4').tolist() == []  # not a flat history
+    
+    json_response = requests.post(f"{BASE_URL}/predict_batch", json={"items": [{
+        "region": region, "disease": disease, "last_14_days_cases": histories[0].tolist(),
+        "prediction_date": "2025-11-15"
+    }]}).json()
+    assert abs(json_response['results'][0]['predicted_cases'] - float(predicted[0])) < 1e-3
+
+def test_score_file():
+    """Test bulk scoring of an uploaded weekly CSV."""
+    print("\n1️⃣5️⃣ Testing Bulk File Scoring...")
+    region = requests.get(f"{BASE_URL}/regions").json()['regions'][0]
+    disease = requests.get(f"{BASE_URL}/diseases").json()['diseases'][0]
+    state, district = region.split('_', 1)
+    
+    lines = ["state_ut,district,disease_clean,date_final,num_cases"]
+    lines += [f"{state},{district},{disease},2025-{month:02d}-01,{month}" for month in range(1, 13)]
+    lines.append(f"{state},Unknown_District,{disease},2025-01-01,3")
+    response = requests.post(f"{BASE_URL}/score_file", data="\n".join(lines) + "\n",
+                             headers={"Content-Type": "text/csv"})
+    print(f"Status: {response.status_code}")
+    print(response.text)
+    assert response.status_code == 200
+    assert response.headers['X-Total-Items'] == "13"
+    assert response.headers['X-Scored-Items'] == "12"
+    header, *rows = response.text.strip().splitlines()
+    assert header.endswith("prediction_date,predicted_cases,confidence_interval_lower,confidence_interval_upper,history_weeks")
+    assert rows[0].split(',')[5] == "2025-01-08"
+    assert rows[-1].split(',')[5] == ""
+
+def test_stored_history():
+    """Test /predict with the history kept by the server."""
+    print("\n1️⃣6️⃣ Testing Stored Histories...")
+    region = requests.get(f"{BASE_URL}/regions").json()['regions'][0]
+    disease = requests.get(f"{BASE_URL}/diseases").json()['diseases'][0]
+    
+    response = requests.get(f"{BASE_URL}/histories", params={"region": region, "disease": disease})
+    print(f"Status: {response.status_code}")
+    history = response.json()
+    print(json.dumps(history, indent=2))
+    assert response.status_code == 200
+    assert len(history['last_14_days_cases']) == 14
+    
+    stored = requests.post(f"{BASE_URL}/predict", json={
+        "region": region, "disease": disease, "prediction_date": "2025-11-15"
+    })
+    if not history['observed']:
+        assert stored.status_code == 404
+        return
+    sent = requests.post(f"{BASE_URL}/predict", json={
+        "region": region, "disease": disease, "prediction_date": "2025-11-15",
+        "last_14_days_cases": history['last_14_days_cases']
+    })
+    print(f"Stored: {stored.json()['predicted_cases']:.2f}, sent: {sent.json()['predicted_cases']:.2f}")
+    assert stored.status_code == 200
+    assert abs(stored.json()['predicted_cases'] - sent.json()['predicted_cases']) < 1e-2
+
+def test_uncertainty():
+    """Test Monte Carlo dropout quantiles on /predict."""
+    print("\n1️⃣7️⃣ Testing Uncertainty Sampling...")
+    region = requests.get(f"{BASE_URL}/regions").json()['regions'][0]
+    disease = requests.get(f"{BASE_URL}/diseases").json()['diseases'][0]
+    
+    response = requests.post(f"{BASE_URL}/predict", json={
+        "region": region, "disease": disease, "prediction_date": "2025-11-15",
+        "last_14_days_cases": [10, 12, 15, 18, 20, 25, 30, 35, 40, 45, 50, 55, 60, 65],
+        "uncertainty": {"samples": 100, "quantiles": [0.1, 0.5, 0.9]}
+    })
+    print(f"Status: {response.status_code}")
+    data = response.json()
+    print(json.dumps(data, indent=2))
+    if response.status_code == 501:  # int8 or ensemble backend
+        return
+    assert response.status_code == 200
+    assert data['uncertainty_samples'] == 100
+    q10, q50, q90 = (data['quantiles'][level] for level in ("0.1", "0.5", "0.9"))
+    assert data['confidence_interval_lower'] <= q10 <= q50 <= q90 <= data['confidence_interval_upper']
+    
+    response = requests.post(f"{BASE_URL}/predict", json={
+        "region": region, "disease": disease, "uncertainty": {"quantiles": [1.5]}
+    })
+    assert response.status_code == 422
+
+def test_cascade():
+    """Test that flat histories are answered by the cascade's baseline tier."""
+    print("\n1️⃣8️⃣ Testing Cascade Inference...")
+    region = requests.get(f"{BASE_URL}/regions").json()['regions'][0]
+    disease = requests.get(f"{BASE_URL}/diseases").json()['diseases'][0]
+    before = requests.get(f"{BASE_URL}/stats").json()['cascade']
+    
+    response = requests.post(f"{BASE_URL}/predict", json={
+        "region": region, "disease": disease, "prediction_date": "2025-11-15",
+        "last_14_days_cases": [0] * 14
+    })
+    print(f"Status: {response.status_code}, tier: {response.json()['tier']}")
+    assert response.status_code == 200
+    
+    after = requests.get(f"{BASE_URL}/stats").json()['cascade']
+    print(json.dumps(after, indent=2))
+    if after['enabled']:
+        assert response.json()['tier'] == "baseline"
+        assert after['baseline_rows'] == before['baseline_rows'] + 1
+        assert after['model_rows'] == before['model_rows']
+    else:
+        assert response.json()['tier'] == "model"
+    
+    batch = {"items": [
+        {"region": region, "disease": disease, "last_14_days_cases": [0] * 14},
+        {"region": region, "disease": disease, "last_14_days_cases": list(range(14))}
+    ]}
+    response = requests.post(f"{BASE_URL}/predict_batch", json=batch)
+    tiers = [result['tier'] for result in response.json()['results']]
+    print(f"Batch tiers: {tiers}")
+    assert tiers == ["baseline" if after['enabled'] else "model", "model"]
+    
+    # A repeat comes from the result cache: same tiers, still counted per tier
+    before = requests.get(f"{BASE_URL}/stats").json()['cascade']
+    response = requests.post(f"{BASE_URL}/predict_batch", json=batch)
+    assert [result['tier'] for result in response.json()['results']] == tiers
+    if after['enabled']:
+        after = requests.get(f"{BASE_URL}/stats").json()['cascade']
+        assert after['baseline_rows'] == before['baseline_rows'] + 1
+        assert after['model_rows'] == before['model_rows'] + 1
+
+def test_invalid_history():
+    """Test that negative or NaN case values are rejected, per item in batches."""
+    print("\n1️⃣9️⃣ Testing Invalid Case Values...")
+    region = requests.get(f"{BASE_URL}/regions").json()['regions'][0]
+    disease = requests.get(f"{BASE_URL}/diseases").json()['diseases'][0]
+    
+    response = requests.post(f"{BASE_URL}/predict", json={
+        "region": region, "disease": disease,
+        "last_14_days_cases": [45, 52, -10, 55, 60, 58, 62, 65, 70, 68, 72, 75, 78, 80]
+    })
+    print(f"Status: {response.status_code}, {response.json()}")
+    assert response.status_code == 400
+    
+    # NaN is not valid JSON for json.dumps(allow_nan=False) clients, so send the body as text
+    item = '{"region": "%s", "disease": "%s", "last_14_days_cases": %s}'
+    body = '{"items": [%s]}' % ", ".join([
+        item % (region, disease, "[1, 2, 3, 4, 5, 6, 7, 8, 9, 10, 11, 12, 13, 14]"),
+        item % (region, disease, "[1, 2, 3, 4, 5, 6, 7, 8, 9, 10, 11, 12, 13, -14]"),
+        item % (region, disease, "[1, 2, 3, 4, 5, 6, 7, 8, 9, 10, 11, 12, 13, NaN]")
+    ])
+    response = requests.post(f"{BASE_URL}/predict_batch", data=body, headers={"Content-Type": "application/json"})
+    data = response.json()
+    print(json.dumps(data, indent=2))
+    assert response.status_code == 200
+    assert data['succeeded'] == 1 and data['failed'] == 2
+    assert data['results'][0]['predicted_cases'] is not None
+    for result in data['results'][1:]:
+        assert result['error'] is not None and result['predicted_cases'] is None
+
+def post_concurrently(url, payloads):
+    """POST every payload from its own thread, released together; responses in payload order."""
+    barrier = threading.Barrier(len(payloads))
+    
+    def post(payload):
+        barrier.wait()
+        return requests.post(url, json=payload)
+    
+    with ThreadPoolExecutor(max_workers=len(payloads)) as pool:
+        return list(pool.map(post, payloads))
+
+def test_micro_batching():
+    """Test that concurrent /predict calls are merged and each caller gets its own result."""
+    print("\n2️⃣0️⃣ Testing Micro-Batching...")
+    region = requests.get(f"{BASE_URL}/regions").json()['regions'][0]
+    disease = requests.get(f"{BASE_URL}/diseases").json()['diseases'][0]
+    
+    # Distinct, never-seen histories: no cache hits, no coalescing, no baseline tier
+    base = random.randint(1000, 100000)
+    items = [
+        {"region": region, "disease": disease, "prediction_date": "2025-11-15",
+         "last_14_days_cases": [base + 7 * i + day for day in range(14)]}
+        for i in range(24)
+    ]
+    # One-step forecasts skip the cache and the micro-batcher: the expected results
+    expected = requests.post(f"{BASE_URL}/forecast", json={"items": items, "horizon": 1}).json()['results']
+    
+    before = requests.get(f"{BASE_URL}/stats").json()['batching']
+    responses = post_concurrently(f"{BASE_URL}/predict", items)
+    after = requests.get(f"{BASE_URL}/stats").json()['batching']
+    requests_delta = after['total_requests'] - before['total_requests']
+    batches_delta = after['total_batches'] - before['total_batches']
+    print(f"{requests_delta} requests in {batches_delta} forward passes")
+    
+    assert all(response.status_code == 200 for response in responses)
+    assert requests_delta == len(items)
+    assert batches_delta < requests_delta
+    for response, reference in zip(responses, expected):
+        predicted = response.json()['predicted_cases']
+        assert abs(predicted - reference['predicted_cases'][0]) <= 1e-3 * max(1.0, predicted)
+
+def test_cache_key():
+    """Test that the result cache tells large counts one case apart and merges float noise."""
+    print("\n2️⃣1️⃣ Testing Cache Key Resolution...")
+    region = requests.get(f"{BASE_URL}/regions").json()['regions'][0]
+    disease = requests.get(f"{BASE_URL}/diseases").json()['diseases'][0]
+    
+    base = random.randint(5000, 500000)
+    history = [base + 100 * day for day in range(14)]
+    
+    def predict(cases):
+        """(prediction, cache hits delta, cache misses delta) of one /predict call."""
+        before = requests.get(f"{BASE_URL}/stats").json()['cache']
+        response = requests.post(f"{BASE_URL}/predict", json={
+            "region": region, "disease": disease, "last_14_days_cases": cases, "prediction_date": "2025-11-15"
+        })
+        after = requests.get(f"{BASE_URL}/stats").json()['cache']
+        assert response.status_code == 200
+        return response.json()['predicted_cases'], after['hits'] - before['hits'], after['misses'] - before['misses']
+    
+    _, hits, misses = predict(history)
+    print(f"First call: {hits} hits, {misses} misses")
+    assert (hits, misses) == (0, 1)
+    _, hits, misses = predict(history[:-1] + [history[-1] + 0.001])
+    print(f"Within 0.005 cases: {hits} hits, {misses} misses")
+    assert (hits, misses) == (1, 0)
+    _, hits, misses = predict(history[:-1] + [history[-1] + 1])
+    print(f"One case more: {hits} hits, {misses} misses")
+    assert (hits, misses) == (0, 1)
+
+def test_model_versions():
+    """Test that register -> activate -> rollback reports the version that actually answered."""
+    print("\n2️⃣2️⃣ Testing Model Version Swaps...")
+    token = os.environ.get('NIROGYA_ADMIN_TOKEN')
+    if not token:
+        print("Skipped: set NIROGYA_ADMIN_TOKEN (same as the server's) to run it")
+        return
+    admin = {"X-Admin-Token": token}
+    registry = os.environ.get('NIROGYA_REGISTRY_PATH', '../models/registry')
+    version = f"test-{random.randint(0, 10**9)}"
+    
+    region = requests.get(f"{BASE_URL}/regions").json()['regions'][0]
+    disease = requests.get(f"{BASE_URL}/diseases").json()['diseases'][0]
+    payload = {"region": region, "disease": disease,
+               "last_14_days_cases": [45, 52, 48, 55, 60, 58, 62, 65, 70, 68, 72, 75, 78, 80]}
+    
+    def served():
+        response = requests.post(f"{BASE_URL}/predict", json=payload)
+        assert response.status_code == 200
+        print(f"   body {response.json()['model_version']}, header {response.headers['X-Model-Version']}")
+        assert response.json()['model_version'] == response.headers['X-Model-Version']
+        return response.json()['model_version']
+    
+    def scored():
+        # Streams and files are scored on one version, named in the header (and on every stream line)
+        response = requests.post(f"{BASE_URL}/predict_stream", json={"diseases": [disease], "chunk_size": 64})
+        assert response.status_code == 200
+        versions = {json.loads(line)['model_version'] for line in response.iter_lines() if line}
+        assert versions == {response.headers['X-Model-Version']}
+        
+        state, district = region.split('_', 1)
+        csv = "state_ut,district,disease_clean,date_final,num_cases\n" + f"{state},{district},{disease},2025-01-01,3\n"
+        file_response = requests.post(f"{BASE_URL}/score_file", data=csv, headers={"Content-Type": "text/csv"})
+        assert file_response.status_code == 200
+        assert file_response.headers['X-Model-Version'] == response.headers['X-Model-Version']
+        return response.headers['X-Model-Version']
+    
+    original = requests.get(f"{BASE_URL}/admin/models", headers=admin).json()['serving']
+    assert served() == original
+    subprocess.run([
+        sys.executable, "registry.py", "--registry", registry, "register", "--version", version,
+        "--checkpoint", "../models/improved_lstm_v2_model4_best.pt"
+    ], check=True)
+    try:
+        response = requests.post(f"{BASE_URL}/admin/models/{version}/activate", headers=admin)
+        print(f"Activate: {response.status_code}, {response.json()}")
+        assert response.status_code == 200 and response.json()['serving'] == version
+        assert served() == version
+        assert scored() == version
+        
+        response = requests.post(f"{BASE_URL}/admin/models/rollback", headers=admin)
+        print(f"Rollback: {response.status_code}, {response.json()}")
+        assert response.status_code == 200 and response.json()['serving'] == original
+        assert served() == original
+    finally:
+        shutil.rmtree(os.path.join(registry, version), ignore_errors=True)
+
+def test_import_footprint():
+    """Test that importing the app does not load pandas (only /score_file and the CLIs need it)."""
+    print("\n2️⃣3️⃣ Testing App Import Footprint...")
+    result = subprocess.run(
+        [sys.executable, "-c", "import sys, app_v2; print('pandas loaded:', 'pandas' in sys.modules)"],
+        capture_output=True, text=True, env={**os.environ, "NIROGYA_SERVING_PROFILE": ""}
+    )
+    print(result.stdout.strip().splitlines()[-1] if result.stdout.strip() else result.stderr[-500:])
+    assert result.returncode == 0
+    assert "pandas loaded: False" in result.stdout
+
+def test_coalescing():
+    """Test that identical concurrent /predict calls share one forward pass."""
+    print("\n2️⃣4️⃣ Testing Request Coalescing...")
+    region = requests.get(f"{BASE_URL}/regions").json()['regions'][0]
+    disease = requests.get(f"{BASE_URL}/diseases").json()['diseases'][0]
+    
+    base = random.randint(1000, 100000)
+    payload = {"region": region, "disease": disease, "prediction_date": "2025-11-15",
+               "last_14_days_cases": [base + 3 * day for day in range(14)]}
+    callers = 16
+    
+    before = requests.get(f"{BASE_URL}/stats").json()
+    responses = post_concurrently(f"{BASE_URL}/predict", [payload] * callers)
+    after = requests.get(f"{BASE_URL}/stats").json()
+    
+    def delta(section, counter):
+        return after[section][counter] - before[section][counter]
+    
+    leaders, coalesced = delta('coalescing', 'leaders'), delta('coalescing', 'coalesced')
+    forwards, cache_hits = delta('batching', 'total_requests'), delta('cache', 'hits')
+    print(f"{callers} callers: {leaders} computation(s), {coalesced} coalesced, "
+          f"{cache_hits} cache hits, {forwards} scored row(s)")
+    
+    assert all(response.status_code == 200 for response in responses)
+    assert len({response.json()['predicted_cases'] for response in responses}) == 1
+    # One caller scores; the others join it in flight or, arriving later, hit the cache it filled
+    assert leaders == 1 and forwards == 1
+    assert coalesced >= 1
+    assert coalesced + cache_hits == callers - 1
+
+def test_history_ingestion():
+    """Test that values POSTed to /histories are what /predict then uses."""
+    print("\n2️⃣5️⃣ Testing History Ingestion...")
+    token = os.environ.get('NIROGYA_ADMIN_TOKEN')
+    if not token:
+        print("Skipped: set NIROGYA_ADMIN_TOKEN (same as the server's) to run it")
+        return
+    region = requests.get(f"{BASE_URL}/regions").json()['regions'][0]
+    disease = requests.get(f"{BASE_URL}/diseases").json()['diseases'][0]
+    params = {"region": region, "disease": disease}
+    
+    before = requests.get(f"{BASE_URL}/histories", params=params).json()
+    last_date = before['last_date'] or "2025-11-01"
+    week = str(datetime.date.fromisoformat(last_date) + datetime.timedelta(days=7))
+    cases = random.randint(100, 10000)
+    response = requests.post(f"{BASE_URL}/histories", headers={"X-Admin-Token": token}, json={"records": [
+        {"region": region, "disease": disease, "date": week, "cases": cases},
+        {"region": region, "disease": disease, "date": last_date, "cases": 1}
+    ]})
+    print(f"Status: {response.status_code}, {response.json()}")
+    assert response.status_code == 200
+    assert response.json()['accepted'] == 1 and response.json()['errors'][0]['index'] == 1
+    
+    after = requests.get(f"{BASE_URL}/histories", params=params).json()
+    print(json.dumps(after, indent=2))
+    assert after['last_date'] == week
+    # Stored as float32 log1p: equal to the counts up to rounding
+    assert abs(after['last_14_days_cases'][-1] - cases) < 1e-2
+    assert all(abs(a - b) < 1e-2 for a, b in zip(after['last_14_days_cases'][:-1], before['last_14_days_cases'][1:]))
+    
+    stored = requests.post(f"{BASE_URL}/predict", json={**params, "prediction_date": "2025-11-15"})
+    sent = requests.post(f"{BASE_URL}/predict", json={
+        **params, "prediction_date": "2025-11-15", "last_14_days_cases": after['last_14_days_cases']
+    })
+    print(f"Stored: {stored.json()['predicted_cases']:.2f}, sent: {sent.json()['predicted_cases']:.2f}")
+    assert stored.status_code == 200
+    assert abs(stored.json()['predicted_cases'] - sent.json()['predicted_cases']) < 1e-2
+
+def test_history_restore():
+    """Test that a restarted process rebuilds the history store from its snapshot plus log."""
+    print("\n2️⃣6️⃣ Testing History Store Restore...")
+    sys.path.append('../notebooks')
+    import numpy as np
+    from history_store import HistoryJournal, HistoryStore
+    from preprocessing import Vocabulary
+    
+    regions, diseases = Vocabulary(["A_North", "B_South"]), Vocabulary(["Cholera", "Dengue"])
+    directory = tempfile.mkdtemp(prefix='nirogya-history-')
+    try:
+        store = HistoryStore(len(regions), len(diseases))
+        journal = HistoryJournal(directory, store, regions, diseases, snapshot_every=3)
+        journal.open()
+        weeks = np.arange('2025-01-06', '2025-03-03', 7, dtype='datetime64[D]')
+        # Three records reach snapshot_every (compacted into the snapshot), the rest stay in the log
+        journal.append([0, 0, 0], [0, 0, 0], weeks[:3], [5, 7, 9])
+        journal.append([0], [0], [weeks[3]], [11])
+        journal.append([1], [1], [weeks[4]], [42])
+        print(f"Snapshots written: {journal.snapshots}, records only in the log: {journal.log_records}")
+        assert journal.snapshots == 2 and journal.log_records == 2
+        journal.close()
+        
+        restarted = HistoryStore(len(regions), len(diseases))
+        HistoryJournal(directory, restarted, regions, diseases, snapshot_every=3).open()
+        pairs = ([0, 0, 1, 1], [0, 1, 0, 1])
+        windows, observed = restarted.lookup(*pairs)
+        expected_windows, expected_observed = store.lookup(*pairs)
+        print(f"Restored pairs: {len(restarted)}, last weeks: {np.round(np.expm1(windows[:, -2:]), 3).tolist()}")
+        assert np.array_equal(windows, expected_windows) and np.array_equal(observed, expected_observed)
+        assert np.array_equal(restarted.last_dates.astype(np.int64), store.last_dates.astype(np.int64))
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
 if __name__ == "__main__":
     print("🧪 Testing Disease Prediction API V2")
     print("=" * 60)
@@ -136,6 +717,26 @@ if __name__ == "__main__":
         test_diseases()
         test_prediction()
         test_food_poisoning_example()
+        test_batch_prediction()
+        test_stats()
+        test_forecast()
+        test_metrics()
+        test_predict_stream()
+        test_hotspots()
+        test_region_search()
+        test_batch_msgpack()
+        test_score_file()
+        test_stored_history()
+        test_uncertainty()
+        test_cascade()
+        test_invalid_history()
+        test_micro_batching()
+        test_cache_key()
+        test_model_versions()
+        test_import_footprint()
+        test_coalescing()
+        test_history_ingestion()
+        test_history_restore()
         
         print("\n" + "=" * 60)
         print("✅ ALL TESTS PASSED!")
@@ -0,0 +1,162 @@
+"""
+Parity tests: every inference backend must match the eager model
+
+Run:
+    cd api
+    python test_parity.py
+"""
+import os
+import sys
+import tempfile
+
+import numpy as np
+import torch
+sys.path.append('../notebooks')
+
+from model_loading import (
+    build_model, example_inputs, export_torchscript, export_onnx, export_npy_weights,
+    load_torchscript, load_mmap_model, quantize_dynamic_int8, weights_fingerprint
+)
+from backends import TorchBackend, OnnxBackend, EnsembleBackend
+from ensemble import StackedEnsemble, SequentialEnsemble
+
+NUM_REGIONS = 20
+NUM_DISEASES = 7
+BATCH_SIZES = [1, 32, 1024]
+TOLERANCE = 1e-4  # max abs difference on the log1p output
+INT8_TOLERANCE = 0.1  # int8 is approximate; bound the drift, not exact parity
+FP16_TOLERANCE = 0.05
+
+
+def make_eager_model():
+    """Randomly initialised eval-mode model (no trained checkpoint needed)."""
+    torch.manual_seed(0)
+    model = build_model(NUM_REGIONS, NUM_DISEASES)
+    model.eval()
+    return model
+
+
+def check_backend_parity(candidate, tolerance):
+    """Shared check: `candidate` backend vs the eager PyTorch backend across batch sizes."""
+    reference = TorchBackend(make_eager_model(), 'cpu')
+
+    for batch_size in BATCH_SIZES:
+        inputs = [t.numpy() for t in example_inputs(NUM_REGIONS, NUM_DISEASES, batch_size=batch_size)]
+        expected = reference.predict_log(*inputs)
+        actual = candidate.predict_log(*inputs)
+
+        assert actual.shape == (batch_size,)
+        diff = float(np.abs(expected - actual).max())
+        print(f"   batch {batch_size:5d}: max diff {diff:.2e}")
+        assert diff < tolerance
+
+
+def test_torchscript_parity():
+    """TorchScript artifact matches eager outputs across batch sizes."""
+    print("\n1️⃣ Testing TorchScript parity...")
+    model = make_eager_model()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'model.torchscript.pt')
+        metadata = export_torchscript(model, path)
+        scripted, loaded_metadata = load_torchscript(path, 'cpu')
+
+    assert loaded_metadata == metadata
+    assert loaded_metadata['num_regions'] == NUM_REGIONS
+
+    check_backend_parity(TorchBackend(scripted, 'cpu', "torchscript"), TOLERANCE)
+
+
+def test_int8_drift():
+    """Dynamic int8 model stays close to fp32 outputs."""
+    print("\n2️⃣ Testing int8 quantization drift...")
+    quantized = quantize_dynamic_int8(make_eager_model())
+
+    check_backend_parity(TorchBackend(quantized, 'cpu', "eager-int8"), INT8_TOLERANCE)
+
+
+def test_onnx_parity():
+    """ONNX Runtime backend matches eager outputs across batch sizes."""
+    print("\n3️⃣ Testing ONNX Runtime parity...")
+    try:
+        import onnx, onnxruntime  # noqa: F401
+    except ImportError:
+        print("   ⚠️  onnx/onnxruntime not installed, skipping")
+        return
+
+    model = make_eager_model()
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'model.onnx')
+        metadata = export_onnx(model, path)
+        onnx_backend = OnnxBackend(path)
+
+        assert onnx_backend.metadata == metadata
+        assert onnx_backend.fingerprint == metadata['weights_fingerprint']
+
+        check_backend_parity(onnx_backend, TOLERANCE)
+
+
+def test_mmap_parity():
+    """Memory-mapped .npy weights match eager outputs (fp16 files within tolerance)."""
+    print("\n4️⃣ Testing memory-mapped weights parity...")
+    model = make_eager_model()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        metadata = export_npy_weights(model, tmp)
+        mapped, loaded_metadata = load_mmap_model(tmp)
+
+        assert loaded_metadata == metadata
+        assert weights_fingerprint(mapped) == metadata['weights_fingerprint']
+
+        check_backend_parity(TorchBackend(mapped, 'cpu', "eager-mmap"), TOLERANCE)
+        del mapped
+
+    with tempfile.TemporaryDirectory() as tmp:
+        metadata = export_npy_weights(model, tmp, fp16=True)
+        upcast, _ = load_mmap_model(tmp)
+
+        assert metadata['dtype'] == "float16"
+        assert upcast.fc1.weight.dtype == torch.float32
+        check_backend_parity(TorchBackend(upcast, 'cpu', "eager-fp16"), FP16_TOLERANCE)
+
+
+def test_stacked_ensemble_parity():
+    """Stacked ensemble (one vectorized pass) matches the sequential member loop."""
+    print("\n5️⃣ Testing stacked ensemble parity...")
+    members = []
+    for seed in range(3):
+        torch.manual_seed(seed)
+        model = build_model(NUM_REGIONS, NUM_DISEASES)
+        for i in range(1, 5):  # non-trivial BatchNorm statistics to exercise the folding
+            bn = getattr(model, f'bn{i}')
+            bn.running_mean.normal_()
+            bn.running_var.uniform_(0.5, 2.0)
+        members.append(model.eval())
+
+    sequential = EnsembleBackend(SequentialEnsemble(members), 'cpu')
+    stacked = EnsembleBackend(StackedEnsemble(members), 'cpu')
+
+    for batch_size in BATCH_SIZES:
+        inputs = [t.numpy() for t in example_inputs(NUM_REGIONS, NUM_DISEASES, batch_size=batch_size)]
+        expected = sequential.predict_members_log(*inputs)
+        actual = stacked.predict_members_log(*inputs)
+
+        assert actual.shape == (len(members), batch_size)
+        diff = float(np.abs(expected - actual).max())
+        print(f"   batch {batch_size:5d}: max diff {diff:.2e}")
+        assert diff < TOLERANCE
+
+
+if __name__ == "__main__":
+    print("🧪 Testing inference backend parity")
+    print("=" * 60)
+
+    test_torchscript_parity()
+    test_int8_drift()
+    test_onnx_parity()
+    test_mmap_parity()
+    test_stacked_ensemble_parity()
+
+    print("\n" + "=" * 60)
+    print("✅ ALL PARITY TESTS PASSED!")
+    print("=" * 60)
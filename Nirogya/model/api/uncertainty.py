@@ -0,0 +1,109 @@
+"""
+Monte Carlo dropout uncertainty
+Dropout stays active at inference while BatchNorm keeps its running
+statistics; every input is repeated N times along the batch axis, so one
+forward pass returns N stochastic predictions per item
+"""
+from typing import Optional, Sequence
+
+import numpy as np
+import torch
+import torch.nn as nn
+
+from improved_model_v2 import ImprovedDiseaseLSTM
+from model_loading import build_model, describe_model, load_checkpoint_model
+
+DEFAULT_QUANTILES = (0.05, 0.5, 0.95)
+INTERVAL_QUANTILES = (0.05, 0.95)  # confidence interval, as ENSEMBLE_INTERVAL_PERCENTILES
+
+
+def mc_dropout_module(model: ImprovedDiseaseLSTM) -> ImprovedDiseaseLSTM:
+    """
+    Copy of an eager model sharing its weights, with only dropout in training mode.
+
+    The LSTM is switched too (its inter-layer dropout is the only thing its
+    training mode changes). BatchNorm stays in eval mode: it normalizes with
+    the frozen running statistics, so the samples of an item do not depend
+    on the rest of the batch. The served module itself is left untouched.
+    """
+    clone = build_model(
+        model.region_embedding.num_embeddings, model.disease_embedding.num_embeddings, init_weights=False
+    )
+    clone.load_state_dict(model.state_dict(), assign=True)
+    clone.eval()
+    for module in clone.modules():
+        if isinstance(module, (nn.Dropout, nn.LSTM)):
+            module.train()
+    return clone
+
+
+class MCDropoutSampler:
+    """Draws N dropout samples per item with one forward over the expanded batch."""
+
+    def __init__(self, module: ImprovedDiseaseLSTM, device, fingerprint: Optional[str] = None):
+        """
+        Args:
+            module: eager model with trained weights (not modified)
+            device: torch device the module lives on
+            fingerprint: weights fingerprint of the backend these samples stand for
+        """
+        self.module = mc_dropout_module(module).to(device)
+        self.device = device
+        self.fingerprint = fingerprint
+
+    def sample_log(self, cases_log, region_idx, disease_idx, temporal, samples: int) -> np.ndarray:
+        """
+        Args:
+            cases_log: (n, 14) float32 log1p case history
+            region_idx: (n,) int64 region indices
+            disease_idx: (n,) int64 disease indices
+            temporal: (n, 5) float32 temporal features
+            samples: stochastic samples per item
+
+        Returns:
+            (n, samples) float32 log1p predictions
+        """
+        inputs = [
+            torch.from_numpy(array).to(self.device).repeat_interleave(samples, dim=0)
+            for array in (cases_log, region_idx, disease_idx, temporal)
+        ]
+        with torch.no_grad():
+            out = self.module(*inputs)
+        return out[:, 0].cpu().numpy().reshape(len(cases_log), samples)
+
+
+def load_sampler(backend, checkpoint_path: str, device) -> MCDropoutSampler:
+    """
+    Sampler over the weights served by `backend`.
+
+    Eager backends (plain or memory-mapped) share their module. Runtimes that
+    drop dropout from the graph (TorchScript, ONNX Runtime) use the eager
+    checkpoint when its fingerprint matches the one they serve; anything else
+    (int8, ensembles, other weights) raises ValueError.
+    """
+    module = getattr(backend, 'module', None)
+    if isinstance(module, ImprovedDiseaseLSTM) and isinstance(module.lstm, nn.LSTM):
+        return MCDropoutSampler(module, device, backend.fingerprint)
+
+    eager = load_checkpoint_model(checkpoint_path, device=device)
+    if describe_model(eager)['weights_fingerprint'] != backend.fingerprint:
+        raise ValueError(f"no eager weights matching the {backend.name} backend for dropout sampling")
+    return MCDropoutSampler(eager, device, backend.fingerprint)
+
+
+def summarize_samples(samples_log: np.ndarray, quantiles: Sequence[float] = DEFAULT_QUANTILES) -> tuple:
+    """
+    Point prediction, interval and quantiles of (n, samples) log1p samples.
+
+    As for ensemble members, the point prediction is the mean in log space
+    and quantiles are taken in log space (expm1 is monotonic, so they are the
+    quantiles of the natural-scale samples too).
+
+    Returns:
+        ((n, 3) predicted cases, lower and upper bound, (n, len(quantiles)) quantiles)
+    """
+    levels = np.quantile(samples_log, list(INTERVAL_QUANTILES) + list(quantiles), axis=1)
+    pred = np.expm1(samples_log.mean(axis=1))
+    lower, upper = np.maximum(0, np.expm1(levels[:2]))
+    interval = np.stack([pred, lower, upper], axis=1).astype(np.float32)
+    return interval, np.maximum(0, np.expm1(levels[2:].T)).astype(np.float32)
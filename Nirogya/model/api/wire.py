@@ -0,0 +1,205 @@
+"""
+Columnar MessagePack wire format for /predict_batch
+For bulk machine-to-machine scoring: one array per field instead of one JSON
+object per item, so decoding is a few `np.frombuffer` calls instead of
+parsing and validating every item. Requires the optional `msgpack` package.
+
+Request (Content-Type: application/msgpack), a map of:
+    regions / region_idx     region names (array of str), or indices into
+                             /regions (bin of little-endian int32)
+    diseases / disease_idx   same for diseases and /diseases
+    histories                n x 14 weekly case counts, row-major
+                             (bin of little-endian float32); optional,
+                             omitted = the server's stored histories
+    prediction_dates         optional: one "YYYY-MM-DD" for all items, an
+                             array of them, or days since 1970-01-01
+                             (bin of little-endian int32); default today
+
+Plain msgpack arrays of numbers are accepted wherever a bin is expected.
+
+Response (Accept: application/msgpack), a map of:
+    total, succeeded, failed, model_version
+    predicted_cases, confidence_interval_lower, confidence_interval_upper
+                             bin of little-endian float32, NaN for failed items
+    prediction_dates         bin of little-endian int32 days since 1970-01-01,
+                             int32 minimum for failed items
+    error_indices            bin of little-endian int32, the failed items
+    errors                   array of their error messages
+    baseline_indices         bin of little-endian int32, the items answered
+                             by the cascade's baseline tier (the rest of the
+                             scored items by the model)
+"""
+import numpy as np
+
+from preprocessing import HISTORY_VALUE_ERROR, SEQUENCE_LENGTH, parse_date, valid_history
+
+MSGPACK_MEDIA_TYPE = 'application/msgpack'
+MSGPACK_MEDIA_TYPES = (MSGPACK_MEDIA_TYPE, 'application/x-msgpack', 'application/vnd.msgpack')
+NO_DATE = np.iinfo(np.int32).min
+
+
+def _msgpack():
+    import msgpack  # optional dependency
+    return msgpack
+
+
+def msgpack_available() -> bool:
+    try:
+        _msgpack()
+    except ImportError:
+        return False
+    return True
+
+
+def is_msgpack(media_type) -> bool:
+    """True if a Content-Type / Accept header value names MessagePack."""
+    return bool(media_type) and any(t in media_type.lower() for t in MSGPACK_MEDIA_TYPES)
+
+
+def _column(payload: dict, name: str, dtype) -> np.ndarray:
+    value = payload[name]
+    if isinstance(value, (bytes, bytearray, memoryview)):
+        if len(value) % np.dtype(dtype).itemsize:
+            raise ValueError(f"'{name}' is not a whole number of {np.dtype(dtype).name} values")
+        return np.frombuffer(value, dtype=dtype)
+    if isinstance(value, (list, tuple)):
+        try:
+            return np.asarray(value, dtype=dtype)
+        except (TypeError, ValueError):
+            raise ValueError(f"'{name}' must contain numbers")
+    raise ValueError(f"'{name}' must be binary or an array")
+
+
+def _names_or_indices(payload: dict, names_key: str, index_key: str, vocab):
+    """(indices, names or None) of one categorical column; unknown names are -1."""
+    if names_key in payload:
+        names = payload[names_key]
+        if not isinstance(names, (list, tuple)) or not all(isinstance(name, str) for name in names):
+            raise ValueError(f"'{names_key}' must be an array of strings")
+        return vocab.encode(names), list(names)
+    if index_key in payload:
+        return _column(payload, index_key, '<i4').astype(np.int64), None
+    raise ValueError(f"'{names_key}' or '{index_key}' is required")
+
+
+def _dates(payload: dict, n: int):
+    """(dates datetime64[D], per-item invalid mask)."""
+    value = payload.get('prediction_dates')
+    if value is None or isinstance(value, str):
+        try:
+            return np.full(n, parse_date(value), dtype='datetime64[D]'), np.zeros(n, dtype=bool)
+        except ValueError:
+            return np.full(n, np.datetime64('NaT'), dtype='datetime64[D]'), np.ones(n, dtype=bool)
+
+    if isinstance(value, (list, tuple)) and all(isinstance(v, str) for v in value):
+        if len(value) != n:
+            raise ValueError(f"'prediction_dates' has {len(value)} entries for {n} items")
+        # Parse each distinct date once
+        unique, inverse = np.unique(np.asarray(value, dtype=object), return_inverse=True)
+        parsed = []
+        for date_str in unique:
+            try:
+                parsed.append(parse_date(date_str))
+            except ValueError:
+                parsed.append(np.datetime64('NaT'))
+        dates = np.array(parsed, dtype='datetime64[D]')[inverse]
+        return dates, np.isnat(dates)
+
+    days = _column(payload, 'prediction_dates', '<i4')
+    if len(days) != n:
+        raise ValueError(f"'prediction_dates' has {len(days)} entries for {n} items")
+    return days.astype('datetime64[D]'), np.zeros(n, dtype=bool)
+
+
+def decode_batch_request(body: bytes, region_vocab, disease_vocab, max_items: int) -> dict:
+    """
+    Decode and validate a columnar MessagePack batch.
+
+    Malformed payloads (wrong types, mismatched lengths) raise ValueError;
+    per-item problems (unknown names, bad dates) are reported in `errors`.
+
+    Returns:
+        {"n", "region_idx", "disease_idx", "cases" (n, 14) float32 or None, "dates",
+         "regions", "diseases" (names for the response, may be None),
+         "errors": {item index: message}}
+    """
+    msgpack = _msgpack()
+    try:
+        payload = msgpack.unpackb(body, raw=False)
+    except Exception as e:
+        raise ValueError(f"invalid MessagePack body ({e!r})")
+    if not isinstance(payload, dict):
+        raise ValueError("body must be a MessagePack map")
+
+    region_idx, regions = _names_or_indices(payload, 'regions', 'region_idx', region_vocab)
+    disease_idx, diseases = _names_or_indices(payload, 'diseases', 'disease_idx', disease_vocab)
+    n = len(region_idx)
+    if n == 0 or n > max_items:
+        raise ValueError(f"expected 1 to {max_items} items, got {n}")
+    if len(disease_idx) != n:
+        raise ValueError(f"{n} regions but {len(disease_idx)} diseases")
+
+    cases = None
+    if 'histories' in payload:
+        cases = _column(payload, 'histories', '<f4')
+        if cases.size != n * SEQUENCE_LENGTH:
+            raise ValueError(f"'histories' must hold {n} x {SEQUENCE_LENGTH} values, got {cases.size}")
+        cases = cases.reshape(n, SEQUENCE_LENGTH)
+
+    dates, bad_dates = _dates(payload, n)
+
+    unknown_regions = (region_idx < 0) | (region_idx >= len(region_vocab))
+    unknown_diseases = (disease_idx < 0) | (disease_idx >= len(disease_vocab))
+    bad_histories = ~valid_history(cases) if cases is not None else np.zeros(n, dtype=bool)
+    errors = {}
+    for i in np.flatnonzero(unknown_regions | unknown_diseases | bad_dates | bad_histories).tolist():
+        if unknown_regions[i]:
+            name = regions[i] if regions is not None else f"index {region_idx[i]}"
+            errors[i] = f"Unknown region: {name}. Use /regions to see available options."
+        elif unknown_diseases[i]:
+            name = diseases[i] if diseases is not None else f"index {disease_idx[i]}"
+            errors[i] = f"Unknown disease: {name}. Use /diseases to see available options."
+        elif bad_histories[i]:
+            errors[i] = HISTORY_VALUE_ERROR
+        else:
+            value = payload['prediction_dates']
+            errors[i] = f"Invalid prediction_date: {value if isinstance(value, str) else value[i]}"
+
+    return {
+        "n": n, "region_idx": region_idx, "disease_idx": disease_idx, "cases": cases, "dates": dates,
+        "regions": regions, "diseases": diseases, "errors": errors
+    }
+
+
+def encode_batch_response(n: int, valid, preds, dates, errors: dict, model_version: str,
+                          baseline=None) -> bytes:
+    """
+    Pack batch results as columns.
+
+    Args:
+        valid: (m,) indices of the scored items
+        preds: (m, 3) predicted cases, lower and upper bound of the valid items
+        dates: (m,) prediction dates of the valid items, datetime64[D]
+        baseline: (m,) bool, valid items answered by the baseline tier (default: none)
+    """
+    columns = np.full((3, n), np.nan, dtype='<f4')
+    days = np.full(n, NO_DATE, dtype='<i4')
+    if len(valid):
+        columns[:, valid] = np.asarray(preds, dtype=np.float32).T
+        days[valid] = np.asarray(dates, dtype='datetime64[D]').astype(np.int64)
+
+    return _msgpack().packb({
+        "total": n,
+        "succeeded": len(valid),
+        "failed": n - len(valid),
+        "model_version": model_version,
+        "predicted_cases": columns[0].tobytes(),
+        "confidence_interval_lower": columns[1].tobytes(),
+        "confidence_interval_upper": columns[2].tobytes(),
+        "prediction_dates": days.tobytes(),
+        "error_indices": np.array(list(errors), dtype='<i4').tobytes(),
+        "errors": list(errors.values()),
+        "baseline_indices": (
+            np.asarray(valid)[np.asarray(baseline, dtype=bool)] if baseline is not None else np.zeros(0)
+        ).astype('<i4').tobytes()
+    }, use_bin_type=True)
@@ -0,0 +1,75 @@
+"""
+CPU latency benchmark of the serving model variants across batch sizes
+
+Usage:
+    cd benchmarks
+    python bench_backends.py
+    python bench_backends.py --threads 4 --batch-sizes 1 32 1024
+"""
+import argparse
+import os
+import tempfile
+
+import torch
+
+from bench_utils import load_eager, time_forward, DEFAULT_CHECKPOINT, DEFAULT_VOCAB
+from model_loading import (
+    example_inputs, export_torchscript, export_onnx, load_torchscript, quantize_dynamic_int8
+)
+from backends import TorchBackend, OnnxBackend
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Compare serving model variants on CPU")
+    parser.add_argument('--checkpoint', default=DEFAULT_CHECKPOINT)
+    parser.add_argument('--vocab', default=DEFAULT_VOCAB)
+    parser.add_argument('--batch-sizes', type=int, nargs='+', default=[1, 32, 1024])
+    parser.add_argument('--threads', type=int, default=None, help="torch intra-op threads")
+    parser.add_argument('--repeats', type=int, default=5)
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    if args.threads:
+        torch.set_num_threads(args.threads)
+
+    eager = load_eager(args.checkpoint, args.vocab)
+    num_regions = eager.region_embedding.num_embeddings
+    num_diseases = eager.disease_embedding.num_embeddings
+
+    with tempfile.TemporaryDirectory() as tmp:
+        variants = {"eager": TorchBackend(eager, 'cpu')}
+
+        path = os.path.join(tmp, 'model.torchscript.pt')
+        export_torchscript(eager, path)
+        variants["torchscript"] = TorchBackend(load_torchscript(path, 'cpu')[0], 'cpu')
+
+        variants["int8"] = TorchBackend(quantize_dynamic_int8(load_eager(args.checkpoint, args.vocab)), 'cpu')
+
+        try:
+            path = os.path.join(tmp, 'model.onnx')
+            export_onnx(eager, path)
+            variants["onnxruntime"] = OnnxBackend(path, intra_op_threads=torch.get_num_threads())
+        except ImportError:
+            print("⚠️  onnx/onnxruntime not installed, skipping ONNX Runtime")
+
+        run_benchmark(variants, num_regions, num_diseases, args)
+
+
+def run_benchmark(variants, num_regions, num_diseases, args):
+    """Print a latency table, one column per backend."""
+    print(f"⏱️  CPU forward latency (threads: {torch.get_num_threads()})")
+    header = f"   {'batch':>6s}" + "".join(f"{name:>16s}" for name in variants)
+    print(header)
+
+    for batch_size in args.batch_sizes:
+        inputs = [t.numpy() for t in example_inputs(num_regions, num_diseases, batch_size=batch_size)]
+        row = f"   {batch_size:6d}"
+        for backend in variants.values():
+            row += f"{time_forward(backend.predict_log, inputs, args.repeats):13.2f} ms"
+        print(row)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+"""
+Ensemble serving cost: stacked (one vectorized pass) vs sequential member loop
+
+Times the 5-member ensemble both ways against a single member across batch
+sizes and checks that both produce the same member outputs.
+
+Usage:
+    cd benchmarks
+    python bench_ensemble.py
+    python bench_ensemble.py --threads 4 --batch-sizes 1 32 256 --output ../results/ensemble_benchmark.json
+"""
+import argparse
+import json
+
+import torch
+
+from bench_utils import load_eager, time_forward, DEFAULT_VOCAB
+from model_loading import example_inputs
+from ensemble import StackedEnsemble, SequentialEnsemble
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Stacked vs sequential ensemble latency")
+    parser.add_argument('--checkpoints', nargs='+',
+                        default=[f'../models/improved_lstm_v2_model{i}_best.pt' for i in range(1, 6)])
+    parser.add_argument('--vocab', default=DEFAULT_VOCAB)
+    parser.add_argument('--batch-sizes', type=int, nargs='+', default=[1, 32, 256])
+    parser.add_argument('--threads', type=int, default=None, help="torch intra-op threads")
+    parser.add_argument('--repeats', type=int, default=5)
+    parser.add_argument('--output', default=None, help="write the results as JSON")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    if args.threads:
+        torch.set_num_threads(args.threads)
+
+    members = [load_eager(path, args.vocab) for path in args.checkpoints]
+    num_regions = members[0].region_embedding.num_embeddings
+    num_diseases = members[0].disease_embedding.num_embeddings
+
+    variants = {
+        "single": members[0],
+        "sequential": SequentialEnsemble(members),
+        "stacked": StackedEnsemble(members)
+    }
+
+    print(f"⏱️  {len(members)}-member ensemble latency (threads: {torch.get_num_threads()})")
+    print(f"   {'batch':>6s}" + "".join(f"{name:>14s}" for name in variants) + f"{'speedup':>10s}{'max diff':>11s}")
+
+    results = {}
+    for batch_size in args.batch_sizes:
+        inputs = example_inputs(num_regions, num_diseases, batch_size=batch_size)
+        with torch.no_grad():
+            max_diff = float((variants["sequential"](*inputs) - variants["stacked"](*inputs)).abs().max())
+
+        latency = {name: time_forward(model, inputs, args.repeats) for name, model in variants.items()}
+        results[str(batch_size)] = {"latency_ms": latency, "max_member_diff": max_diff}
+
+        print(f"   {batch_size:6d}" + "".join(f"{ms:11.2f} ms" for ms in latency.values())
+              + f"{latency['sequential'] / latency['stacked']:9.2f}x{max_diff:11.1e}")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({"threads": torch.get_num_threads(), "batch_sizes": results}, f, indent=2)
+        print(f"\n✅ Results saved to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
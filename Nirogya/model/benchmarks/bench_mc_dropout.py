@@ -0,0 +1,135 @@
+"""
+Monte Carlo dropout cost: one expanded-batch forward vs N sequential forwards
+
+For each sample count N, times drawing N dropout samples for --rows items
+both ways (the batched form is what /predict does for `uncertainty`
+requests) against the plain deterministic forward. With --coverage, also
+scores a validation subset and compares how often the 90% interval contains
+the actual value: MC dropout quantiles vs the fixed ±30% band.
+
+Usage:
+    cd benchmarks
+    python bench_mc_dropout.py
+    python bench_mc_dropout.py --samples 10 50 200 --rows 1 32 --coverage 2000
+    python bench_mc_dropout.py --output ../results/mc_dropout.json
+"""
+import argparse
+import json
+import time
+
+import numpy as np
+import torch
+
+from bench_utils import load_eager, load_validation_set, time_forward, DEFAULT_CHECKPOINT, DEFAULT_VOCAB
+from model_loading import example_inputs
+from uncertainty import MCDropoutSampler, summarize_samples
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Batched vs sequential Monte Carlo dropout latency")
+    parser.add_argument('--checkpoint', default=DEFAULT_CHECKPOINT)
+    parser.add_argument('--vocab', default=DEFAULT_VOCAB)
+    parser.add_argument('--samples', type=int, nargs='+', default=[2, 10, 50, 100, 200])
+    parser.add_argument('--rows', type=int, nargs='+', default=[1], help="items per request")
+    parser.add_argument('--threads', type=int, default=None, help="torch intra-op threads")
+    parser.add_argument('--repeats', type=int, default=5)
+    parser.add_argument('--coverage', type=int, default=0, metavar='N',
+                        help="also measure interval coverage on N validation rows")
+    parser.add_argument('--coverage-samples', type=int, default=50)
+    parser.add_argument('--output', default=None, help="write the results as JSON")
+    return parser.parse_args()
+
+
+def median_ms(fn, repeats) -> float:
+    fn()  # warm-up
+    times = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return float(np.median(times)) * 1000
+
+
+def coverage(sampler, model, num_rows, samples) -> dict:
+    """Share of validation targets inside the MC dropout and ±30% intervals (90% nominal)."""
+    x, region, disease, temporal, y = load_validation_set()
+    rows = np.random.default_rng(0).choice(len(x), size=min(num_rows, len(x)), replace=False)
+    inputs = (
+        np.ascontiguousarray(x[rows], dtype=np.float32),
+        np.ascontiguousarray(region[rows], dtype=np.int64),
+        np.ascontiguousarray(disease[rows], dtype=np.int64),
+        np.ascontiguousarray(temporal[rows], dtype=np.float32)
+    )
+    actual = np.expm1(np.asarray(y[rows], dtype=np.float32).reshape(-1))
+
+    chunk = max(1, 1024 // samples)
+    samples_log = np.concatenate([
+        sampler.sample_log(*(array[start:start + chunk] for array in inputs), samples)
+        for start in range(0, len(rows), chunk)
+    ])
+    interval, _ = summarize_samples(samples_log)
+    with torch.no_grad():
+        point = np.expm1(model(*(torch.from_numpy(array) for array in inputs)).numpy()[:, 0])
+
+    def share(lower, upper):
+        return float(np.mean((actual >= lower) & (actual <= upper)))
+
+    return {
+        "rows": len(rows),
+        "samples": samples,
+        "mc_dropout": {
+            "coverage": share(interval[:, 1], interval[:, 2]),
+            "mean_width": float(np.mean(interval[:, 2] - interval[:, 1]))
+        },
+        "fixed_band": {"coverage": share(point * 0.7, point * 1.3), "mean_width": float(np.mean(point * 0.6))}
+    }
+
+
+def main():
+    args = parse_args()
+    if args.threads:
+        torch.set_num_threads(args.threads)
+
+    model = load_eager(args.checkpoint, args.vocab)
+    sampler = MCDropoutSampler(model, 'cpu')
+    num_regions = model.region_embedding.num_embeddings
+    num_diseases = model.disease_embedding.num_embeddings
+
+    print(f"⏱️  Monte Carlo dropout latency (threads: {torch.get_num_threads()}, median of {args.repeats})")
+    print(f"   {'rows':>5s} {'N':>5s} {'single':>11s} {'batched':>11s} {'sequential':>12s} {'speedup':>8s}")
+
+    results = {}
+    for rows in args.rows:
+        inputs = tuple(t.numpy() for t in example_inputs(num_regions, num_diseases, batch_size=rows))
+        single_ms = time_forward(model, tuple(torch.from_numpy(a) for a in inputs), args.repeats)
+        results[str(rows)] = {"single_forward_ms": single_ms, "samples": {}}
+
+        for samples in args.samples:
+            batched_ms = median_ms(lambda: sampler.sample_log(*inputs, samples), args.repeats)
+            sequential_ms = median_ms(
+                lambda: [sampler.sample_log(*inputs, 1) for _ in range(samples)], args.repeats
+            )
+            results[str(rows)]["samples"][str(samples)] = {
+                "batched_ms": batched_ms,
+                "sequential_ms": sequential_ms,
+                "speedup": sequential_ms / batched_ms
+            }
+            print(f"   {rows:5d} {samples:5d} {single_ms:8.2f} ms {batched_ms:8.2f} ms {sequential_ms:9.2f} ms"
+                  f" {sequential_ms / batched_ms:7.1f}x")
+
+    report = {"threads": torch.get_num_threads(), "rows": results}
+    if args.coverage:
+        report["coverage"] = coverage(sampler, model, args.coverage, args.coverage_samples)
+        c = report["coverage"]
+        print(f"\n🎯 90% interval coverage on {c['rows']} validation rows ({c['samples']} samples)")
+        for name in ("mc_dropout", "fixed_band"):
+            print(f"   {name:>10s}: {c[name]['coverage'] * 100:5.1f}% covered, mean width {c[name]['mean_width']:.2f} cases")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"\n✅ Results saved to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
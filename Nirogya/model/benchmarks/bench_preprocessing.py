@@ -0,0 +1,100 @@
+"""
+Microbenchmark: per-request preprocessing cost before/after the shared
+lookup-table preprocessing layer
+
+Usage:
+    cd benchmarks
+    python bench_preprocessing.py
+"""
+import sys
+import pickle
+import timeit
+import numpy as np
+import pandas as pd
+sys.path.append('../notebooks')
+
+from preprocessing import Vocabulary, temporal_features, parse_date, encode_history
+
+REPEATS = 5
+NUMBER = 2000
+
+
+def legacy_preprocess(region_encoder, disease_encoder, region, disease, cases, prediction_date):
+    """Original /predict preprocessing (LabelEncoder + pandas + scalar numpy)."""
+    if region not in region_encoder.classes_:
+        raise ValueError(region)
+    if disease not in disease_encoder.classes_:
+        raise ValueError(disease)
+
+    region_idx = region_encoder.transform([region])[0]
+    disease_idx = disease_encoder.transform([disease])[0]
+
+    pred_date = pd.to_datetime(prediction_date)
+    month = pred_date.month
+    day_of_year = pred_date.dayofyear
+    year = pred_date.year
+
+    temporal = np.array([
+        np.sin(2 * np.pi * month / 12),
+        np.cos(2 * np.pi * month / 12),
+        np.sin(2 * np.pi * day_of_year / 365),
+        np.cos(2 * np.pi * day_of_year / 365),
+        (year - 2009) / 16
+    ], dtype=np.float32)
+
+    cases_log = np.log1p(cases)
+    return region_idx, disease_idx, temporal, cases_log
+
+
+def fast_preprocess(region_vocab, disease_vocab, region, disease, cases, prediction_date):
+    """Current /predict preprocessing (dict vocabularies + temporal table)."""
+    region_idx = region_vocab.index(region)
+    disease_idx = disease_vocab.index(disease)
+    if region_idx is None or disease_idx is None:
+        raise ValueError(region if region_idx is None else disease)
+
+    temporal = temporal_features(parse_date(prediction_date))
+    cases_log = encode_history(cases)
+    return region_idx, disease_idx, temporal, cases_log
+
+
+def main():
+    with open('../models/feature_encoders.pkl', 'rb') as f:
+        encoders = pickle.load(f)
+
+    region_encoder = encoders['region']
+    disease_encoder = encoders['disease']
+    region_vocab = Vocabulary(region_encoder.classes_)
+    disease_vocab = Vocabulary(disease_encoder.classes_)
+
+    # Last class = worst case for the linear `in classes_` scan
+    args = (
+        region_encoder.classes_[-1],
+        disease_encoder.classes_[-1],
+        [10, 12, 15, 18, 20, 25, 30, 35, 40, 45, 50, 55, 60, 65],
+        "2025-11-15"
+    )
+
+    legacy = legacy_preprocess(region_encoder, disease_encoder, *args)
+    fast = fast_preprocess(region_vocab, disease_vocab, *args)
+    assert legacy[0] == fast[0] and legacy[1] == fast[1]
+    assert np.allclose(legacy[2], fast[2][0]) and np.allclose(legacy[3], fast[3])
+
+    print("⏱️  Per-request preprocessing cost")
+    print(f"   Regions: {len(region_vocab)}, Diseases: {len(disease_vocab)}")
+
+    results = {}
+    for name, fn, state in [
+        ("before (LabelEncoder + pandas)", legacy_preprocess, (region_encoder, disease_encoder)),
+        ("after (dict + temporal table)", fast_preprocess, (region_vocab, disease_vocab)),
+    ]:
+        times = timeit.repeat(lambda: fn(*state, *args), repeat=REPEATS, number=NUMBER)
+        results[name] = min(times) / NUMBER * 1e6
+        print(f"   {name:32s} {results[name]:8.1f} µs/request")
+
+    before, after = results.values()
+    print(f"✅ Speedup: {before / after:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
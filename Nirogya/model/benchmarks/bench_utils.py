@@ -0,0 +1,83 @@
+"""
+Helpers shared by the benchmark scripts
+"""
+import os
+import pickle
+import sys
+import time
+
+import numpy as np
+import torch
+sys.path.append('../notebooks')
+sys.path.append('../api')
+
+from preprocessing import load_vocabularies
+from model_loading import build_model, load_checkpoint_model
+
+DEFAULT_CHECKPOINT = '../models/improved_lstm_v2_model5_best.pt'
+DEFAULT_VOCAB = '../models/vocabularies.json'
+DEFAULT_TRAINING_DATA = '../models/training_data.pkl'
+
+
+def load_eager(checkpoint=DEFAULT_CHECKPOINT, vocab=DEFAULT_VOCAB):
+    """Trained model when available, otherwise a random model of the same size."""
+    if os.path.exists(checkpoint) and os.path.exists(vocab):
+        region_vocab, disease_vocab = load_vocabularies(vocab)
+        return load_checkpoint_model(checkpoint, len(region_vocab), len(disease_vocab), 'cpu')
+
+    print("⚠️  Checkpoint not found, benchmarking a randomly initialised model")
+    model = build_model(985, 129)
+    model.eval()
+    return model
+
+
+def time_forward(model, inputs, repeats):
+    """Median wall time of `model(*inputs)` (module or backend.predict_log), in milliseconds."""
+    with torch.no_grad():
+        model(*inputs)  # warm-up
+        times = []
+        for _ in range(repeats):
+            start = time.perf_counter()
+            model(*inputs)
+            times.append(time.perf_counter() - start)
+    return float(np.median(times)) * 1000
+
+
+def load_validation_set(path=DEFAULT_TRAINING_DATA):
+    """Validation arrays (x, region, disease, temporal, y) from training_data.pkl."""
+    with open(path, 'rb') as f:
+        data = pickle.load(f)
+    return (
+        data['X_val'], data['region_val'], data['disease_val'],
+        data['temporal_val'], data['y_val']
+    )
+
+
+def predict_log(model, x, region, disease, temporal, batch_size=1024):
+    """Log-scale predictions of `model` over numpy inputs, in chunks."""
+    outputs = []
+    with torch.no_grad():
+        for start in range(0, len(x), batch_size):
+            end = start + batch_size
+            outputs.append(model(
+                torch.from_numpy(np.ascontiguousarray(x[start:end], dtype=np.float32)),
+                torch.from_numpy(np.ascontiguousarray(region[start:end], dtype=np.int64)),
+                torch.from_numpy(np.ascontiguousarray(disease[start:end], dtype=np.int64)),
+                torch.from_numpy(np.ascontiguousarray(temporal[start:end], dtype=np.float32))
+            ).numpy()[:, 0])
+    return np.concatenate(outputs)
+
+
+def validation_metrics(pred_log, target_log) -> dict:
+    """MAE / RMSE / median % error on the natural scale (as in train_improved_model.py)."""
+    predictions = np.expm1(pred_log)
+    actuals = np.expm1(target_log)
+
+    non_zero = actuals > 0
+    percentage_errors = np.abs(predictions[non_zero] - actuals[non_zero]) / actuals[non_zero] * 100
+
+    return {
+        "mae": float(np.mean(np.abs(predictions - actuals))),
+        "rmse": float(np.sqrt(np.mean((predictions - actuals) ** 2))),
+        "median_pct_error": float(np.median(percentage_errors)) if non_zero.any() else None
+    }
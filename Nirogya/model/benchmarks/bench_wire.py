@@ -0,0 +1,167 @@
+"""
+Benchmark: JSON vs columnar MessagePack bodies on /predict_batch
+
+Serves app_v2 in-process and compares, for one batch of --items items:
+body sizes, client encode/decode time, the server's parse + validate step
+on its own and the full request round trip. The result cache is off, so
+both formats pay the same inference; with --warm-cache it stays on and the
+warm-up request fills it, so the round trip measures everything but the model.
+
+Usage:
+    cd benchmarks
+    python bench_wire.py
+    python bench_wire.py --warm-cache
+    python bench_wire.py --items 10000 --repeats 5 --output ../results/wire.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import time
+
+import numpy as np
+
+import bench_utils  # noqa: F401  (adds ../notebooks and ../api to sys.path)
+from preprocessing import SEQUENCE_LENGTH, encode_history
+
+API_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'api')
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="JSON vs MessagePack on /predict_batch")
+    parser.add_argument('--items', type=int, default=10000)
+    parser.add_argument('--repeats', type=int, default=5)
+    parser.add_argument('--warm-cache', action='store_true', help="answer the timed requests from the result cache")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', default=None, help="write the report as JSON")
+    return parser.parse_args()
+
+
+def median_ms(fn, repeats) -> tuple:
+    """(median wall time of fn() in ms, last result)."""
+    times = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        result = fn()
+        times.append(time.perf_counter() - start)
+    return float(np.median(times)) * 1000, result
+
+
+async def median_ms_async(fn, repeats) -> tuple:
+    times = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        result = await fn()
+        times.append(time.perf_counter() - start)
+    return float(np.median(times)) * 1000, result
+
+
+async def run(args) -> dict:
+    import httpx
+    import msgpack
+
+    # app_v2 resolves its artifact paths relative to api/ and reads its config at import
+    os.chdir(API_DIR)
+    os.environ['NIROGYA_CACHE'] = '1' if args.warm_cache else '0'
+    os.environ.setdefault('NIROGYA_FORECAST_TABLE', '0')
+    import app_v2
+    from wire import decode_batch_request
+
+    await app_v2.load_model()
+    rng = np.random.default_rng(args.seed)
+    regions = [app_v2.region_vocab.classes[i] for i in rng.integers(app_v2.num_regions, size=args.items)]
+    diseases = [app_v2.disease_vocab.classes[i] for i in rng.integers(app_v2.num_diseases, size=args.items)]
+    histories = rng.poisson(rng.lognormal(1.5, 1.2, (args.items, 1)), (args.items, SEQUENCE_LENGTH)).astype(np.float32)
+    prediction_date = "2025-06-01"
+
+    def encode_json():
+        items = [
+            {"region": r, "disease": d, "last_14_days_cases": h, "prediction_date": prediction_date}
+            for r, d, h in zip(regions, diseases, histories.tolist())
+        ]
+        return json.dumps({"items": items}).encode()
+
+    def encode_msgpack():
+        return msgpack.packb({
+            "regions": regions, "diseases": diseases,
+            "histories": histories.astype('<f4').tobytes(), "prediction_dates": prediction_date
+        })
+
+    def decode_json(content):
+        results = json.loads(content)["results"]
+        return np.array([r["predicted_cases"] for r in results], dtype=np.float32)
+
+    def decode_msgpack(content):
+        return np.frombuffer(msgpack.unpackb(content)["predicted_cases"], dtype='<f4')
+
+    def parse_json(body):
+        items = app_v2.parse_batch_json(body)
+        return app_v2.encode_batch_items(items)
+
+    def parse_msgpack(body):
+        batch = decode_batch_request(body, app_v2.region_vocab, app_v2.disease_vocab, app_v2.MAX_BATCH_ITEMS)
+        return encode_history(batch["cases"])
+
+    formats = {
+        "json": (encode_json, decode_json, parse_json, {"content-type": "application/json"}),
+        "msgpack": (encode_msgpack, decode_msgpack, parse_msgpack,
+                    {"content-type": "application/msgpack", "accept": "application/msgpack"})
+    }
+
+    report = {"items": args.items, "backend": app_v2.backend.name, "warm_cache": args.warm_cache, "formats": {}}
+    predictions = {}
+    transport = httpx.ASGITransport(app=app_v2.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=300) as client:
+        for name, (encode, decode, parse, headers) in formats.items():
+            print(f"🚀 {name}: {args.items} items x {args.repeats}")
+            encode_ms, body = median_ms(encode, args.repeats)
+            parse_ms, _ = median_ms(lambda: parse(body), args.repeats)
+
+            async def post():
+                response = await client.post("/predict_batch", content=body, headers=headers)
+                response.raise_for_status()
+                return response.content
+            await post()  # warm-up
+            round_trip_ms, content = await median_ms_async(post, args.repeats)
+            decode_ms, predictions[name] = median_ms(lambda: decode(content), args.repeats)
+
+            report["formats"][name] = {
+                "request_bytes": len(body),
+                "response_bytes": len(content),
+                "client_encode_ms": encode_ms,
+                "server_parse_ms": parse_ms,
+                "round_trip_ms": round_trip_ms,
+                "client_decode_ms": decode_ms
+            }
+    await app_v2.shutdown()
+
+    report["max_abs_diff"] = float(np.abs(predictions["json"] - predictions["msgpack"]).max())
+    return report
+
+
+def main():
+    args = parse_args()
+    output = os.path.abspath(args.output) if args.output else None
+    report = asyncio.run(run(args))
+
+    json_result, msgpack_result = report["formats"]["json"], report["formats"]["msgpack"]
+    print(f"\n📦 /predict_batch, {report['items']} items ({report['backend']}, median of {args.repeats})")
+    print(f"   {'':>18s} {'json':>10s} {'msgpack':>10s} {'ratio':>7s}")
+    for key, unit in (("request_bytes", "B"), ("response_bytes", "B"), ("client_encode_ms", "ms"),
+                      ("server_parse_ms", "ms"), ("round_trip_ms", "ms"), ("client_decode_ms", "ms")):
+        a, b = json_result[key], msgpack_result[key]
+        label = key.replace('_ms', '').replace('_bytes', '_size').replace('_', ' ')
+        if unit == "B":
+            print(f"   {label:>18s} {a / 1024:7.0f} kB {b / 1024:7.0f} kB {a / b:6.1f}x")
+        else:
+            print(f"   {label:>18s} {a:7.1f} ms {b:7.1f} ms {a / b:6.1f}x")
+    print(f"   max |json - msgpack| prediction: {report['max_abs_diff']:.2e}")
+
+    if output:
+        with open(output, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"\n✅ Report saved to {output}")
+
+
+if __name__ == "__main__":
+    main()
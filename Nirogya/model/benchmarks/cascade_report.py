@@ -0,0 +1,135 @@
+"""
+Cascade inference report: tier hit rates, latency and accuracy per gate setting
+
+For each --max-spreads value, fits the baseline tier on the CSV windows of
+the first 80% of the weeks (as `cascade.py` does) and scores two sets with
+the LSTM alone and with the cascade:
+  - the validation split of training_data.pkl (the model's own validation set)
+  - every window of the remaining weeks of the processed CSV, including the
+    all-zero windows prepare_training_data.py leaves out of training
+
+Usage:
+    cd benchmarks
+    python cascade_report.py
+    python cascade_report.py --max-spreads 0 0.5 1 2 --output ../results/cascade_report.json
+"""
+import argparse
+import json
+import time
+
+import numpy as np
+
+from bench_utils import (
+    load_eager, load_validation_set, predict_log, validation_metrics,
+    DEFAULT_CHECKPOINT, DEFAULT_VOCAB, DEFAULT_TRAINING_DATA
+)
+from cascade import CascadeBaseline, csv_windows, fit_baseline, split_date
+from histories import DEFAULT_HISTORY_CSV
+from preprocessing import load_vocabularies, temporal_features
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Cascade tier hit rates, latency and accuracy")
+    parser.add_argument('--checkpoint', default=DEFAULT_CHECKPOINT)
+    parser.add_argument('--vocab', default=DEFAULT_VOCAB)
+    parser.add_argument('--data', default=DEFAULT_TRAINING_DATA)
+    parser.add_argument('--csv', default=DEFAULT_HISTORY_CSV, help="processed weekly CSV")
+    parser.add_argument('--max-spreads', type=float, nargs='+', default=[0.0, 0.5, 1.0, 1.5, 2.0])
+    parser.add_argument('--repeats', type=int, default=3)
+    parser.add_argument('--output', default=None, help="write the report as JSON")
+    return parser.parse_args()
+
+
+def median_ms(fn, repeats) -> tuple:
+    """(median wall time of fn() in ms, last result)."""
+    times = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        result = fn()
+        times.append(time.perf_counter() - start)
+    return float(np.median(times)) * 1000, result
+
+
+def cascade_predict_log(model, baseline, x, region, disease, temporal) -> np.ndarray:
+    """Log-scale predictions as served with the cascade: baseline for gated rows, LSTM for the rest."""
+    out = np.empty(len(x), dtype=np.float32)
+    trivial = baseline.gate(x)
+    out[trivial] = baseline.predict_log(x[trivial])
+    rest = ~trivial
+    if rest.any():
+        out[rest] = predict_log(model, x[rest], region[rest], disease[rest], temporal[rest])
+    return out
+
+
+def score_set(model, baseline, inputs, target, repeats) -> dict:
+    """Hit rate, LSTM-only vs cascade latency and accuracy on one set of windows."""
+    trivial = baseline.gate(inputs[0])
+    model_ms, model_log = median_ms(lambda: predict_log(model, *inputs), repeats)
+    cascade_ms, cascade_log = median_ms(lambda: cascade_predict_log(model, baseline, *inputs), repeats)
+
+    def mae(pred_log, rows):
+        return float(np.mean(np.abs(np.expm1(pred_log[rows]) - np.expm1(target[rows])))) if rows.any() else None
+
+    return {
+        "rows": len(target),
+        "baseline_hit_rate": float(trivial.mean()),
+        "latency_ms": {"model_only": model_ms, "cascade": cascade_ms},
+        "model_only": validation_metrics(model_log, target),
+        "cascade": validation_metrics(cascade_log, target),
+        "gated_rows_mae": {"model": mae(model_log, trivial), "baseline": mae(cascade_log, trivial)}
+    }
+
+
+def main():
+    args = parse_args()
+    model = load_eager(args.checkpoint, args.vocab)
+    region_vocab, disease_vocab = load_vocabularies(args.vocab)
+
+    x_val, region_val, disease_val, temporal_val, y_val = load_validation_set(args.data)
+    validation = (
+        (np.ascontiguousarray(x_val, dtype=np.float32), np.ascontiguousarray(region_val, dtype=np.int64),
+         np.ascontiguousarray(disease_val, dtype=np.int64), np.ascontiguousarray(temporal_val, dtype=np.float32)),
+        np.asarray(y_val, dtype=np.float32).reshape(-1)
+    )
+
+    until = split_date(args.csv)
+    fit = csv_windows(args.csv, until=until)
+    held_out = csv_windows(args.csv, after=until)
+    region_idx = np.array([region_vocab.index(name) for name in held_out["regions"]])
+    disease_idx = np.array([disease_vocab.index(name) for name in held_out["diseases"]])
+    known = np.array([r is not None and d is not None for r, d in zip(region_idx, disease_idx)], dtype=bool)
+    recent = (
+        (held_out["windows"][known], region_idx[known].astype(np.int64), disease_idx[known].astype(np.int64),
+         temporal_features(held_out["target_dates"][known])),
+        held_out["targets"][known]
+    )
+
+    sets = {"validation": validation, f"csv_after_{until}": recent}
+    print(f"🪜 Cascade report: baseline fitted on {len(fit['windows'])} CSV windows before {until}")
+    report = {"fitted_until": until, "gates": {}}
+    for max_spread in args.max_spreads:
+        coefficients, fitted_rows = fit_baseline(fit["windows"], fit["targets"], max_spread)
+        baseline = CascadeBaseline(coefficients, max_spread)
+        entry = {"coefficients": list(coefficients), "fitted_rows": fitted_rows, "sets": {}}
+
+        print(f"\n🚦 max spread {max_spread:g} (baseline fitted on {fitted_rows} windows)")
+        print(f"   {'set':>22s} {'hits':>6s} {'model ms':>9s} {'cascade ms':>11s}"
+              f" {'MAE model':>10s} {'MAE cascade':>12s} {'gated MAE model/baseline':>25s}")
+        for name, (inputs, target) in sets.items():
+            result = score_set(model, baseline, inputs, target, args.repeats)
+            entry["sets"][name] = result
+            gated = result["gated_rows_mae"]
+            gated_text = "-" if gated["model"] is None else f"{gated['model']:.3f} / {gated['baseline']:.3f}"
+            print(f"   {name:>22s} {result['baseline_hit_rate'] * 100:5.1f}%"
+                  f" {result['latency_ms']['model_only']:9.1f} {result['latency_ms']['cascade']:11.1f}"
+                  f" {result['model_only']['mae']:10.3f} {result['cascade']['mae']:12.3f} {gated_text:>25s}")
+        report["gates"][f"{max_spread:g}"] = entry
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"\n✅ Report saved to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
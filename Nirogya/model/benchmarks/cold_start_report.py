@@ -0,0 +1,144 @@
+"""
+Cold start: time to first prediction per model artifact
+
+Starts the API (`api/serve.py --workers 1`) in a fresh process for each
+artifact, polls /predict until the first successful answer and reads the
+per-phase startup timings from /health. Artifacts are exported from the
+checkpoint into a temporary directory first.
+
+Usage:
+    cd benchmarks
+    python cold_start_report.py
+    python cold_start_report.py --runs 5 --output ../results/cold_start.json
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.error
+import urllib.request
+
+import numpy as np
+
+from bench_utils import load_eager, DEFAULT_CHECKPOINT, DEFAULT_VOCAB
+from preprocessing import load_vocabularies, save_vocabularies
+from model_loading import export_torchscript, export_npy_weights
+
+API_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'api')
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Time to first prediction per artifact")
+    parser.add_argument('--checkpoint', default=DEFAULT_CHECKPOINT)
+    parser.add_argument('--vocab', default=DEFAULT_VOCAB)
+    parser.add_argument('--runs', type=int, default=3)
+    parser.add_argument('--port', type=int, default=8766)
+    parser.add_argument('--timeout', type=float, default=120.0)
+    parser.add_argument('--output', default=None, help="write the report as JSON")
+    return parser.parse_args()
+
+
+def export_artifacts(args, directory) -> dict:
+    """serve.py arguments and environment for every artifact under test."""
+    model = load_eager(args.checkpoint, args.vocab)
+    region_vocab, disease_vocab = load_vocabularies(args.vocab)
+
+    torchscript_path = os.path.join(directory, 'model.torchscript.pt')
+    export_torchscript(model, torchscript_path)
+
+    modes = {
+        "checkpoint": (['--private-weights'], {'NIROGYA_TORCHSCRIPT': '0'}),
+        "torchscript": (['--private-weights'], {'NIROGYA_TORCHSCRIPT_PATH': os.path.abspath(torchscript_path)})
+    }
+    for name, fp16 in (("deploy", False), ("deploy-fp16", True)):
+        path = os.path.join(directory, name)
+        export_npy_weights(model, path, fp16=fp16)
+        save_vocabularies(os.path.join(path, 'vocabularies.json'), region_vocab.classes, disease_vocab.classes)
+        modes[name] = (['--weights', os.path.abspath(path)], {})
+
+    return modes
+
+
+def post_json(url, payload, timeout=5):
+    """POST a JSON body and return the decoded JSON response."""
+    request = urllib.request.Request(url, data=json.dumps(payload).encode(),
+                                     headers={'Content-Type': 'application/json'})
+    with urllib.request.urlopen(request, timeout=timeout) as response:
+        return json.loads(response.read())
+
+
+def time_to_first_prediction(extra_args, extra_env, payload, args) -> dict:
+    """Start one server process and time spawn → first successful /predict."""
+    command = [sys.executable, 'serve.py', '--workers', '1', '--port', str(args.port)] + extra_args
+    env = dict(os.environ, NIROGYA_CACHE='0', **extra_env)
+
+    started = time.perf_counter()
+    process = subprocess.Popen(command, cwd=API_DIR, env=env,
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        while True:
+            if process.poll() is not None:
+                raise RuntimeError("server exited during startup")
+            if time.perf_counter() - started > args.timeout:
+                raise RuntimeError(f"no prediction after {args.timeout:.0f}s")
+            try:
+                post_json(f'http://127.0.0.1:{args.port}/predict', payload)
+                break
+            except urllib.error.HTTPError:
+                raise
+            except (urllib.error.URLError, ConnectionError):
+                time.sleep(0.02)
+        elapsed = time.perf_counter() - started
+
+        with urllib.request.urlopen(f'http://127.0.0.1:{args.port}/health', timeout=5) as response:
+            health = json.loads(response.read())
+    finally:
+        process.terminate()
+        process.wait(timeout=30)
+
+    return {"time_to_first_prediction_ms": elapsed * 1000, "backend": health['backend'],
+            "startup_timings_ms": health['startup_timings_ms']}
+
+
+def main():
+    args = parse_args()
+    region_vocab, disease_vocab = load_vocabularies(args.vocab)
+    payload = {
+        "region": region_vocab.classes[0],
+        "disease": disease_vocab.classes[0],
+        "last_14_days_cases": [1.0] * 14
+    }
+
+    report = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        modes = export_artifacts(args, tmp)
+        for name, (extra_args, extra_env) in modes.items():
+            print(f"🚀 {name}: {args.runs} cold start(s)...")
+            runs = [time_to_first_prediction(extra_args, extra_env, payload, args) for _ in range(args.runs)]
+            phases = runs[0]['startup_timings_ms'].keys()
+            report[name] = {
+                "backend": runs[0]['backend'],
+                "time_to_first_prediction_ms": float(np.median([r['time_to_first_prediction_ms'] for r in runs])),
+                "startup_timings_ms": {
+                    phase: float(np.median([r['startup_timings_ms'][phase] for r in runs])) for phase in phases
+                }
+            }
+
+    print(f"\n⏱️  Cold start (median of {args.runs})")
+    print(f"   {'artifact':>12s} {'first prediction':>17s} {'imports':>9s} {'model load':>11s} {'warmup':>8s}")
+    for name, result in report.items():
+        timings = result['startup_timings_ms']
+        print(f"   {name:>12s} {result['time_to_first_prediction_ms']:14.0f} ms "
+              f"{timings['imports']:6.0f} ms {timings['backend']:8.0f} ms {timings['warmup']:5.0f} ms")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"\n✅ Report saved to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,291 @@
+"""
+Load test: throughput and latency percentiles of the prediction API
+
+Drives the API with a fixed number of concurrent clients (closed loop: each
+client sends its next request as soon as the previous one returns) and a
+configurable mix of /predict, /predict_batch and /forecast calls. By default
+the app is served in-process through httpx's ASGI transport, so no network
+or uvicorn is involved; pass --url to load a running server instead.
+
+Request bodies come from a seeded pool per request type. --history sets the
+distribution of the 14-week histories and --popularity how often the same
+body is sent again (zipf repeats popular bodies, which exercises the result
+cache; uniform over a large pool mostly misses it). In-process runs read the
+usual NIROGYA_* environment variables, so serving options can be compared
+with e.g. `NIROGYA_CACHE=0 python load_test.py ...`.
+
+Usage:
+    cd benchmarks
+    python load_test.py
+    python load_test.py --concurrency 32 --requests 5000 --mix single=0.7,batch=0.2,forecast=0.1
+    python load_test.py --duration 30 --history zeros=0.5,poisson=0.5 --popularity zipf
+    python load_test.py --url http://127.0.0.1:8000 --output ../results/load_test.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import time
+
+import numpy as np
+
+from bench_utils import DEFAULT_VOCAB
+from preprocessing import SEQUENCE_LENGTH, load_vocabularies
+
+API_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'api')
+
+ENDPOINTS = {"single": "/predict", "batch": "/predict_batch", "forecast": "/forecast"}
+HISTORIES = ("poisson", "zeros", "spiky")
+
+
+def parse_weights(text: str, names) -> dict:
+    """'a=0.7,b=0.3' -> {'a': 0.7, 'b': 0.3}, normalised to sum to 1."""
+    weights = {}
+    for part in text.split(','):
+        name, _, value = part.partition('=')
+        name = name.strip()
+        if name not in names:
+            raise argparse.ArgumentTypeError(f"unknown name {name!r} (expected one of {', '.join(names)})")
+        weights[name] = float(value) if value else 1.0
+    total = sum(weights.values())
+    if total <= 0:
+        raise argparse.ArgumentTypeError(f"weights must sum to a positive number: {text!r}")
+    return {name: value / total for name, value in weights.items()}
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Throughput and p50/p95/p99 latency of the prediction API")
+    parser.add_argument('--url', default=None, help="running server to load (default: serve app_v2 in-process)")
+    parser.add_argument('--vocab', default=DEFAULT_VOCAB, help="vocabularies for request bodies")
+    parser.add_argument('--concurrency', type=int, default=8, help="concurrent clients")
+    parser.add_argument('--requests', type=int, default=2000, help="measured requests (ignored with --duration)")
+    parser.add_argument('--duration', type=float, default=None, help="measure for this many seconds instead")
+    parser.add_argument('--warmup', type=int, default=50, help="unmeasured requests sent first")
+    parser.add_argument('--mix', default='single=0.8,batch=0.15,forecast=0.05',
+                        type=lambda text: parse_weights(text, tuple(ENDPOINTS)))
+    parser.add_argument('--batch-size', type=int, default=64, help="items per /predict_batch request")
+    parser.add_argument('--forecast-items', type=int, default=8, help="series per /forecast request")
+    parser.add_argument('--horizon', type=int, default=4, help="/forecast steps")
+    parser.add_argument('--history', default='poisson=0.6,zeros=0.3,spiky=0.1',
+                        type=lambda text: parse_weights(text, HISTORIES),
+                        help="distribution of the case histories")
+    parser.add_argument('--pool', type=int, default=1000, help="distinct request bodies per request type")
+    parser.add_argument('--popularity', choices=('uniform', 'zipf'), default='uniform',
+                        help="how bodies are drawn from the pool")
+    parser.add_argument('--zipf-exponent', type=float, default=1.1)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', default=None, help="write the report as JSON")
+    return parser.parse_args()
+
+
+def sample_history(rng, kind: str) -> list:
+    """One 14-week case history of the given distribution."""
+    if kind == "zeros":
+        return [0.0] * SEQUENCE_LENGTH
+    if kind == "spiky":
+        cases = np.zeros(SEQUENCE_LENGTH)
+        spikes = rng.random(SEQUENCE_LENGTH) < 0.15
+        cases[spikes] = rng.integers(5, 200, spikes.sum())
+        return cases.tolist()
+    rate = rng.lognormal(mean=1.5, sigma=1.2)
+    return rng.poisson(rate, SEQUENCE_LENGTH).astype(float).tolist()
+
+
+class RequestPool:
+    """Seeded request bodies per request type and the order they are sent in."""
+
+    def __init__(self, args, regions, diseases):
+        self.rng = np.random.default_rng(args.seed)
+        self.args = args
+        self.regions = regions
+        self.diseases = diseases
+        self.history_kinds = list(args.history)
+        self.history_weights = list(args.history.values())
+
+        self.bodies = {kind: [self._body(kind) for _ in range(args.pool)] for kind in args.mix}
+        self.kinds = list(args.mix)
+        self.kind_weights = list(args.mix.values())
+
+        ranks = np.arange(1, args.pool + 1, dtype=np.float64)
+        popularity = ranks ** -args.zipf_exponent if args.popularity == 'zipf' else np.ones(args.pool)
+        self.body_weights = popularity / popularity.sum()
+
+    def _item(self) -> dict:
+        kind = self.history_kinds[self.rng.choice(len(self.history_kinds), p=self.history_weights)]
+        return {
+            "region": self.regions[self.rng.integers(len(self.regions))],
+            "disease": self.diseases[self.rng.integers(len(self.diseases))],
+            "last_14_days_cases": sample_history(self.rng, kind)
+        }
+
+    def _body(self, kind: str) -> dict:
+        if kind == "single":
+            return self._item()
+        if kind == "batch":
+            return {"items": [self._item() for _ in range(self.args.batch_size)]}
+        return {"items": [self._item() for _ in range(self.args.forecast_items)], "horizon": self.args.horizon}
+
+    def next(self):
+        """(request type, body, items) of the next request in the schedule."""
+        kind = self.kinds[self.rng.choice(len(self.kinds), p=self.kind_weights)]
+        body = self.bodies[kind][self.rng.choice(self.args.pool, p=self.body_weights)]
+        return kind, body, len(body.get("items", (None,)))
+
+
+def summarize(samples, wall_seconds: float) -> dict:
+    """Throughput and latency percentiles of (latency seconds, items, status) samples."""
+    latencies = np.array([latency for latency, _, _ in samples]) * 1000
+    errors = [status for _, _, status in samples if status is None or status >= 400]
+    statuses = {}
+    for _, _, status in samples:
+        key = str(status) if status is not None else "exception"
+        statuses[key] = statuses.get(key, 0) + 1
+    return {
+        "requests": len(samples),
+        "errors": len(errors),
+        "status_codes": statuses,
+        "throughput_rps": len(samples) / wall_seconds if wall_seconds else 0.0,
+        "items_per_second": sum(items for _, items, _ in samples) / wall_seconds if wall_seconds else 0.0,
+        "latency_ms": {
+            "mean": float(latencies.mean()),
+            "p50": float(np.percentile(latencies, 50)),
+            "p95": float(np.percentile(latencies, 95)),
+            "p99": float(np.percentile(latencies, 99)),
+            "max": float(latencies.max())
+        } if len(samples) else None
+    }
+
+
+async def run_clients(client, pool: RequestPool, concurrency: int, count=None, duration=None) -> tuple:
+    """
+    Send requests from `concurrency` clients until `count` requests were sent
+    or `duration` seconds passed.
+
+    Returns:
+        ({request type: [(latency seconds, items, status)]}, wall seconds)
+    """
+    samples = {kind: [] for kind in pool.kinds}
+    sent = 0
+    started = time.perf_counter()
+    deadline = started + duration if duration is not None else None
+
+    async def client_loop():
+        nonlocal sent
+        while True:
+            if deadline is not None:
+                if time.perf_counter() >= deadline:
+                    return
+            elif sent >= count:
+                return
+            sent += 1
+            kind, body, items = pool.next()
+
+            request_started = time.perf_counter()
+            try:
+                response = await client.post(ENDPOINTS[kind], json=body)
+                status = response.status_code
+            except Exception:
+                status = None
+            samples[kind].append((time.perf_counter() - request_started, items, status))
+            # In-process cache hits never suspend; yield so every client gets a turn
+            await asyncio.sleep(0)
+
+    await asyncio.gather(*(client_loop() for _ in range(concurrency)))
+    return samples, time.perf_counter() - started
+
+
+async def load_test(args, regions, diseases) -> dict:
+    try:
+        import httpx
+    except ImportError:
+        raise SystemExit("❌ The load test needs httpx: pip install httpx")
+
+    app_v2 = None
+    if args.url is None:
+        # app_v2 resolves its artifact paths relative to api/
+        os.chdir(API_DIR)
+        import app_v2
+        await app_v2.load_model()
+        transport = httpx.ASGITransport(app=app_v2.app)
+        client = httpx.AsyncClient(transport=transport, base_url="http://loadtest", timeout=120)
+    else:
+        limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+        client = httpx.AsyncClient(base_url=args.url, timeout=120, limits=limits)
+
+    try:
+        health = (await client.get("/health")).json()
+        if not regions:
+            regions = (await client.get("/regions")).json()["regions"]
+            diseases = (await client.get("/diseases")).json()["diseases"]
+        pool = RequestPool(args, regions, diseases)
+
+        if args.warmup:
+            print(f"🔥 Warm-up: {args.warmup} requests")
+            await run_clients(client, pool, args.concurrency, count=args.warmup)
+
+        target = f"{args.duration:.0f}s" if args.duration else f"{args.requests} requests"
+        print(f"🚀 Load: {args.concurrency} clients, {target}")
+        samples, wall_seconds = await run_clients(client, pool, args.concurrency,
+                                                  count=args.requests, duration=args.duration)
+    finally:
+        await client.aclose()
+        if app_v2 is not None:
+            await app_v2.shutdown()
+
+    everything = [sample for kind_samples in samples.values() for sample in kind_samples]
+    return {
+        "target": args.url or "in-process",
+        "backend": health.get("backend"),
+        "model_version_served": health.get("model_version_served"),
+        "config": {
+            "concurrency": args.concurrency,
+            "requests": None if args.duration else args.requests,
+            "duration_seconds": args.duration,
+            "mix": args.mix,
+            "batch_size": args.batch_size,
+            "forecast_items": args.forecast_items,
+            "horizon": args.horizon,
+            "history": args.history,
+            "pool": args.pool,
+            "popularity": args.popularity,
+            "zipf_exponent": args.zipf_exponent if args.popularity == 'zipf' else None,
+            "seed": args.seed,
+            "cpu_count": os.cpu_count(),
+            "env": {key: value for key, value in os.environ.items() if key.startswith('NIROGYA_')}
+        },
+        "wall_seconds": wall_seconds,
+        "overall": summarize(everything, wall_seconds),
+        "by_type": {kind: summarize(kind_samples, wall_seconds) for kind, kind_samples in samples.items()}
+    }
+
+
+def main():
+    args = parse_args()
+    output = os.path.abspath(args.output) if args.output else None  # in-process runs chdir to api/
+
+    regions, diseases = [], []
+    if args.url is None and os.path.exists(args.vocab):
+        region_vocab, disease_vocab = load_vocabularies(args.vocab)
+        regions, diseases = region_vocab.classes, disease_vocab.classes
+
+    report = asyncio.run(load_test(args, regions, diseases))
+
+    print(f"\n⏱️  {report['target']} ({report['backend']}), {report['wall_seconds']:.1f}s")
+    print(f"   {'type':>8s} {'requests':>9s} {'errors':>7s} {'req/s':>9s} {'items/s':>10s} "
+          f"{'p50':>9s} {'p95':>9s} {'p99':>9s}")
+    for name, result in [*report['by_type'].items(), ("overall", report['overall'])]:
+        latency = result['latency_ms']
+        if latency is None:
+            continue
+        print(f"   {name:>8s} {result['requests']:9d} {result['errors']:7d} {result['throughput_rps']:9.1f} "
+              f"{result['items_per_second']:10.1f} {latency['p50']:6.2f} ms {latency['p95']:6.2f} ms "
+              f"{latency['p99']:6.2f} ms")
+
+    if output:
+        with open(output, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"\n✅ Report saved to {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+"""
+Accuracy drift, latency and memory of dynamic int8 serving vs fp32
+
+Scores the validation split of training_data.pkl with both models and reports
+MAE / median % error, forward latency and serialized model size.
+
+Usage:
+    cd benchmarks
+    python quantization_report.py
+    python quantization_report.py --output ../results/quantization_report.json
+"""
+import argparse
+import io
+import json
+
+import numpy as np
+import torch
+
+from bench_utils import (
+    load_eager, time_forward, load_validation_set, predict_log, validation_metrics,
+    DEFAULT_CHECKPOINT, DEFAULT_VOCAB, DEFAULT_TRAINING_DATA
+)
+from model_loading import example_inputs, quantize_dynamic_int8
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="fp32 vs dynamic int8 report")
+    parser.add_argument('--checkpoint', default=DEFAULT_CHECKPOINT)
+    parser.add_argument('--vocab', default=DEFAULT_VOCAB)
+    parser.add_argument('--data', default=DEFAULT_TRAINING_DATA)
+    parser.add_argument('--batch-sizes', type=int, nargs='+', default=[1, 32, 256])
+    parser.add_argument('--repeats', type=int, default=5)
+    parser.add_argument('--output', default=None, help="write the report as JSON")
+    return parser.parse_args()
+
+
+def serialized_size_mb(model) -> float:
+    """Size of the model's state_dict as written by torch.save."""
+    buffer = io.BytesIO()
+    torch.save(model.state_dict(), buffer)
+    return buffer.tell() / (1024 * 1024)
+
+
+def main():
+    args = parse_args()
+
+    fp32 = load_eager(args.checkpoint, args.vocab)
+    int8 = quantize_dynamic_int8(load_eager(args.checkpoint, args.vocab))
+    num_regions = fp32.region_embedding.num_embeddings
+    num_diseases = fp32.disease_embedding.num_embeddings
+
+    x, region, disease, temporal, y = load_validation_set(args.data)
+    print(f"📂 Validation set: {len(x):,} sequences")
+
+    pred_fp32 = predict_log(fp32, x, region, disease, temporal)
+    pred_int8 = predict_log(int8, x, region, disease, temporal)
+
+    report = {
+        "validation_size": int(len(x)),
+        "accuracy": {
+            "fp32": validation_metrics(pred_fp32, y),
+            "int8": validation_metrics(pred_int8, y)
+        },
+        "drift": {
+            "mean_abs_diff_cases": float(np.mean(np.abs(np.expm1(pred_fp32) - np.expm1(pred_int8)))),
+            "max_abs_diff_log": float(np.max(np.abs(pred_fp32 - pred_int8)))
+        },
+        "latency_ms": {},
+        "model_size_mb": {
+            "fp32": serialized_size_mb(fp32),
+            "int8": serialized_size_mb(int8)
+        }
+    }
+
+    for batch_size in args.batch_sizes:
+        inputs = example_inputs(num_regions, num_diseases, batch_size=batch_size)
+        report["latency_ms"][str(batch_size)] = {
+            "fp32": time_forward(fp32, inputs, args.repeats),
+            "int8": time_forward(int8, inputs, args.repeats)
+        }
+
+    print("\n📊 Accuracy (validation set)")
+    for name, metrics in report["accuracy"].items():
+        median = metrics['median_pct_error']
+        median_str = f"{median:.1f}%" if median is not None else "n/a"
+        print(f"   {name}: MAE {metrics['mae']:.2f} cases, "
+              f"RMSE {metrics['rmse']:.2f}, Median Error {median_str}")
+    print(f"   Drift: mean |fp32 - int8| = {report['drift']['mean_abs_diff_cases']:.3f} cases")
+
+    print("\n⏱️  Forward latency")
+    for batch_size, latency in report["latency_ms"].items():
+        print(f"   batch {batch_size:>5s}: fp32 {latency['fp32']:8.2f} ms | "
+              f"int8 {latency['int8']:8.2f} ms ({latency['fp32'] / latency['int8']:.2f}x)")
+
+    sizes = report["model_size_mb"]
+    print(f"\n💾 Model size: fp32 {sizes['fp32']:.1f} MB | int8 {sizes['int8']:.1f} MB")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"\n✅ Report saved to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,135 @@
+"""
+Per-worker memory of a multi-worker API: private checkpoint copies vs
+memory-mapped shared weights
+
+Launches `api/serve.py` in both modes, waits until every worker has loaded
+the model and reads RSS / PSS from /proc/<pid>/smaps_rollup (Linux only).
+RSS counts shared pages in every worker; PSS splits them between the
+processes that map them, so the PSS sum is what the node actually pays.
+
+Usage:
+    cd benchmarks
+    python worker_memory_report.py --workers 4
+    python worker_memory_report.py --workers 4 --output ../results/worker_memory.json
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+import urllib.request
+
+API_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'api')
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Per-worker RSS/PSS of private vs shared weights")
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--timeout', type=float, default=180.0, help="seconds to wait for startup")
+    parser.add_argument('--output', default=None, help="write the report as JSON")
+    return parser.parse_args()
+
+
+def memory_kb(pid) -> dict:
+    """Rss / Pss / Shared_Clean / Private_Dirty of a process, in kB."""
+    fields = {}
+    with open(f'/proc/{pid}/smaps_rollup') as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) == 3 and parts[2] == 'kB':
+                fields[parts[0].rstrip(':')] = int(parts[1])
+    return {key: fields.get(key, 0) for key in ('Rss', 'Pss', 'Shared_Clean', 'Private_Dirty')}
+
+
+def worker_pids(parent_pid) -> list:
+    """Uvicorn worker processes (children of the supervisor running app_v2)."""
+    pids = []
+    for entry in os.listdir('/proc'):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f'/proc/{entry}/stat') as f:
+                ppid = int(f.read().rsplit(')', 1)[1].split()[1])
+            with open(f'/proc/{entry}/cmdline', 'rb') as f:
+                cmdline = f.read()
+        except (OSError, IndexError, ValueError):
+            continue
+        if ppid == parent_pid and b'resource_tracker' not in cmdline:
+            pids.append(int(entry))
+    return sorted(pids)
+
+
+def wait_until_loaded(process, port, workers, timeout):
+    """Block until `workers` distinct worker pids have answered /health with a loaded model."""
+    deadline = time.monotonic() + timeout
+    seen = set()
+    while len(seen) < workers:
+        if process.poll() is not None:
+            raise RuntimeError("server exited during startup")
+        if time.monotonic() > deadline:
+            raise RuntimeError(f"only {len(seen)}/{workers} workers ready after {timeout:.0f}s")
+        try:
+            # New connection per request so the kernel spreads them across workers
+            with urllib.request.urlopen(f'http://127.0.0.1:{port}/health', timeout=5) as response:
+                health = json.loads(response.read())
+            if health['model_loaded']:
+                seen.add(health['worker_pid'])
+        except OSError:
+            time.sleep(0.5)
+
+
+def measure(mode, args) -> dict:
+    """Start serve.py in `mode` ('private' or 'shared') and collect per-worker memory."""
+    command = [sys.executable, 'serve.py', '--workers', str(args.workers), '--port', str(args.port)]
+    if mode == 'private':
+        command.append('--private-weights')
+
+    env = dict(os.environ, NIROGYA_TORCHSCRIPT='0', NIROGYA_CACHE='0')
+    process = subprocess.Popen(command, cwd=API_DIR, env=env,
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        wait_until_loaded(process, args.port, args.workers, args.timeout)
+        time.sleep(1.0)
+        workers = [dict(pid=pid, **memory_kb(pid)) for pid in worker_pids(process.pid)]
+    finally:
+        process.terminate()
+        process.wait(timeout=30)
+
+    return {
+        "workers": workers,
+        "rss_mb_per_worker": sum(w['Rss'] for w in workers) / len(workers) / 1024,
+        "pss_mb_total": sum(w['Pss'] for w in workers) / 1024,
+        "private_dirty_mb_per_worker": sum(w['Private_Dirty'] for w in workers) / len(workers) / 1024
+    }
+
+
+def main():
+    args = parse_args()
+    if not os.path.exists('/proc/self/smaps_rollup'):
+        print("❌ /proc/<pid>/smaps_rollup not available (Linux 4.14+ required)")
+        sys.exit(1)
+
+    report = {"num_workers": args.workers}
+    for mode in ('private', 'shared'):
+        print(f"🚀 Starting {args.workers} workers ({mode} weights)...")
+        report[mode] = measure(mode, args)
+
+    print(f"\n💾 Memory with {args.workers} workers")
+    print(f"   {'mode':>8s} {'RSS/worker':>12s} {'private/worker':>16s} {'PSS total':>12s}")
+    for mode in ('private', 'shared'):
+        result = report[mode]
+        print(f"   {mode:>8s} {result['rss_mb_per_worker']:9.1f} MB "
+              f"{result['private_dirty_mb_per_worker']:13.1f} MB {result['pss_mb_total']:9.1f} MB")
+    saved = report['private']['pss_mb_total'] - report['shared']['pss_mb_total']
+    print(f"   Shared weights save {saved:.1f} MB across the node")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"\n✅ Report saved to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -26,5 +26,8 @@ def main():
 	except Exception as e:
 		print("Error while querying CUDA devices:", e)
 
+	print("CPU threads (intra-op / inter-op):", torch.get_num_threads(), "/", torch.get_num_interop_threads())
+	print("To measure the best serving settings on this machine: cd api && python autotune.py")
+
 if __name__ == '__main__':
 	main()
@@ -81,7 +81,8 @@ class ImprovedDiseaseLSTM(nn.Module):
         num_layers: int = 5,      # Increased from 3
         num_heads: int = 4,       # Multi-head attention
         dropout: float = 0.3,
-        temporal_dim: int = 5
+        temporal_dim: int = 5,
+        init_weights: bool = True  # False when trained weights are loaded right after
     ):
         super().__init__()
         
@@ -137,7 +138,8 @@ class ImprovedDiseaseLSTM(nn.Module):
         self.activation = nn.LeakyReLU(0.1)
         
         # Initialize weights
-        self._init_weights()
+        if init_weights:
+            self._init_weights()
     
     def _init_weights(self):
         """Xavier/Glorot initialization for better convergence."""
@@ -11,6 +11,8 @@ from datetime import datetime
 import warnings
 warnings.filterwarnings('ignore')
 
+from preprocessing import SEQUENCE_LENGTH, temporal_features, encode_history, save_vocabularies
+
 print("📂 Loading processed data...")
 
 # Load the cleaned weekly data
@@ -36,18 +38,18 @@ disease_encoder = LabelEncoder()
 df['region_idx'] = region_encoder.fit_transform(df['region'])
 df['disease_idx'] = disease_encoder.fit_transform(df['disease'])
 
-# Log transform cases
-df['cases_log'] = np.log1p(df['num_cases'].fillna(0))
+# Log transform cases (same transform as the API)
+df['cases_log'] = encode_history(df['num_cases'].fillna(0).values)
 
 print("\n🔧 Creating sequences...")
 
 # Create sequences
-sequence_length = 14
+sequence_length = SEQUENCE_LENGTH
 sequences = []
 targets = []
 regions = []
 diseases = []
-temporal_features = []
+target_dates = []
 
 # Group by region and disease
 grouped = df.groupby(['region_idx', 'disease_idx'])
@@ -70,34 +72,19 @@ for (region_idx, disease_idx), group in grouped:
         if np.sum(seq) == 0 and target == 0:
             continue
         
-        # Extract temporal features from target date
-        target_date = pd.Timestamp(dates[i+sequence_length])
-        
-        month = target_date.month
-        day_of_year = target_date.dayofyear
-        year = target_date.year
-        
-        # Cyclical encoding
-        month_sin = np.sin(2 * np.pi * month / 12)
-        month_cos = np.cos(2 * np.pi * month / 12)
-        day_sin = np.sin(2 * np.pi * day_of_year / 365)
-        day_cos = np.cos(2 * np.pi * day_of_year / 365)
-        year_norm = (year - 2009) / 16  # Normalize to 0-1
-        
-        temporal = np.array([month_sin, month_cos, day_sin, day_cos, year_norm])
-        
         sequences.append(seq)
         targets.append(target)
         regions.append(region_idx)
         diseases.append(disease_idx)
-        temporal_features.append(temporal)
+        target_dates.append(dates[i+sequence_length])
 
 # Convert to arrays
 X = np.array(sequences, dtype=np.float32)
 y = np.array(targets, dtype=np.float32)
 region_idx_arr = np.array(regions, dtype=np.int64)
 disease_idx_arr = np.array(diseases, dtype=np.int64)
-temporal_arr = np.array(temporal_features, dtype=np.float32)
+# Temporal features of the target dates from the shared per-date table
+temporal_arr = temporal_features(np.array(target_dates, dtype='datetime64[D]'))
 
 print(f"✅ Created {len(X):,} sequences")
 print(f"   Sequence shape: {X.shape}")
@@ -156,6 +143,11 @@ with open('../models/feature_encoders.pkl', 'wb') as f:
 
 print("✅ Saved to models/feature_encoders.pkl")
 
+# Plain JSON vocabularies for serving (loads without sklearn/pandas)
+save_vocabularies('../models/vocabularies.json', region_encoder.classes_, disease_encoder.classes_)
+
+print("✅ Saved to models/vocabularies.json")
+
 print("\n🎉 Data preparation complete!")
 print(f"📊 Summary:")
 print(f"   Total sequences: {len(X):,}")
@@ -0,0 +1,158 @@
+"""
+Shared preprocessing for training and serving
+Dict-based vocabularies, a precomputed table of temporal features per calendar
+date and a vectorized history transform. Used by prepare_training_data.py and
+the API so both encode inputs exactly the same way (no pandas needed).
+"""
+
+import json
+import numpy as np
+from datetime import date, datetime
+from typing import Iterable, Optional, Tuple
+
+
+SEQUENCE_LENGTH = 14
+TEMPORAL_DIM = 5
+
+# Year normalization: (year - 2009) / 16 maps the IDSP data range to ~0-1
+BASE_YEAR = 2009
+YEAR_SPAN = 16
+
+# Date range covered by the precomputed temporal table
+TABLE_START = np.datetime64('2000-01-01', 'D')
+TABLE_END = np.datetime64('2051-01-01', 'D')
+
+
+def compute_temporal_features(months, days_of_year, years) -> np.ndarray:
+    """
+    Cyclical month/day-of-year encoding plus normalized year.
+
+    Accepts scalars or arrays and returns an array of shape (n, 5):
+    [month_sin, month_cos, day_sin, day_cos, year_norm].
+    """
+    months = np.atleast_1d(np.asarray(months, dtype=np.float64))
+    days_of_year = np.atleast_1d(np.asarray(days_of_year, dtype=np.float64))
+    years = np.atleast_1d(np.asarray(years, dtype=np.float64))
+
+    return np.stack([
+        np.sin(2 * np.pi * months / 12),
+        np.cos(2 * np.pi * months / 12),
+        np.sin(2 * np.pi * days_of_year / 365),
+        np.cos(2 * np.pi * days_of_year / 365),
+        (years - BASE_YEAR) / YEAR_SPAN
+    ], axis=1).astype(np.float32)
+
+
+def compute_temporal_features_for_dates(dates) -> np.ndarray:
+    """Temporal features computed directly from datetime64 dates, shape (n, 5)."""
+    dates = np.atleast_1d(np.asarray(dates, dtype='datetime64[D]'))
+    years = dates.astype('datetime64[Y]')
+    months = dates.astype('datetime64[M]').astype(np.int64) % 12 + 1
+    days_of_year = (dates - years).astype(np.int64) + 1
+
+    return compute_temporal_features(months, days_of_year, years.astype(np.int64) + 1970)
+
+
+class TemporalFeatureTable:
+    """
+    Temporal features precomputed for every calendar date in [start, end).
+
+    Lookups are a single fancy-index into the table; dates outside the range
+    fall back to direct computation.
+    """
+
+    def __init__(self, start=TABLE_START, end=TABLE_END):
+        self.start = np.datetime64(start, 'D')
+        self.end = np.datetime64(end, 'D')
+        self.table = compute_temporal_features_for_dates(np.arange(self.start, self.end))
+
+    def __call__(self, dates) -> np.ndarray:
+        """Temporal features for datetime64 dates, shape (n, 5)."""
+        dates = np.atleast_1d(np.asarray(dates, dtype='datetime64[D]'))
+        offsets = (dates - self.start).astype(np.int64)
+        in_range = (offsets >= 0) & (offsets < len(self.table))
+
+        if in_range.all():
+            return self.table[offsets]
+
+        features = compute_temporal_features_for_dates(dates)
+        features[in_range] = self.table[offsets[in_range]]
+        return features
+
+
+# Default table shared by training and serving
+temporal_features = TemporalFeatureTable()
+
+
+class Vocabulary:
+    """
+    Name -> index mapping backed by a dict.
+
+    Built from a sorted class list (e.g. `LabelEncoder.classes_`), so indices
+    match the encoder's `transform`.
+    """
+
+    def __init__(self, classes: Iterable[str]):
+        self.classes = [str(c) for c in classes]
+        self._index = {name: i for i, name in enumerate(self.classes)}
+
+    def __len__(self):
+        return len(self.classes)
+
+    def __contains__(self, name):
+        return name in self._index
+
+    def index(self, name: str) -> Optional[int]:
+        """Index of `name`, or None if unknown."""
+        return self._index.get(name)
+
+    def encode(self, names) -> np.ndarray:
+        """Indices for many names, -1 where unknown."""
+        lookup = self._index.get
+        return np.fromiter((lookup(name, -1) for name in names), dtype=np.int64, count=len(names))
+
+
+def region_state(region: str) -> str:
+    """State part of a `State_District` region name."""
+    return region.split('_', 1)[0]
+
+
+def save_vocabularies(path: str, region_classes, disease_classes):
+    """Write region/disease class lists as JSON (no pickle, no sklearn needed to read)."""
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump({
+            'region': [str(c) for c in region_classes],
+            'disease': [str(c) for c in disease_classes]
+        }, f, ensure_ascii=False)
+
+
+def load_vocabularies(path: str) -> Tuple[Vocabulary, Vocabulary]:
+    """Read region and disease vocabularies written by `save_vocabularies`."""
+    with open(path, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    return Vocabulary(data['region']), Vocabulary(data['disease'])
+
+
+def parse_date(value: Optional[str]) -> np.datetime64:
+    """
+    Parse an ISO date (YYYY-MM-DD, a time part is ignored) to datetime64[D].
+
+    Returns today's date when `value` is empty; raises ValueError if invalid.
+    """
+    if not value:
+        return np.datetime64(date.today(), 'D')
+    return np.datetime64(datetime.fromisoformat(value).date(), 'D')
+
+
+def encode_history(cases) -> np.ndarray:
+    """log1p transform of case counts (any shape), returned as float32."""
+    return np.log1p(np.asarray(cases, dtype=np.float64)).astype(np.float32)
+
+
+HISTORY_VALUE_ERROR = "Historical cases must be non-negative numbers"
+
+
+def valid_history(cases) -> np.ndarray:
+    """True where a history (last axis) holds only finite, non-negative counts."""
+    cases = np.asarray(cases, dtype=np.float64)
+    return (np.isfinite(cases) & (cases >= 0)).all(axis=-1)